@@ -3,7 +3,9 @@ from fastapi import APIRouter, HTTPException, status
 from shared_utils import messages
 
 from app.core.conf import settings
+from app.utils import is_model_loaded
 from app.schemas.health import Health
+from app.celery.backends import build_backends
 
 
 health_router = APIRouter(
@@ -14,26 +16,27 @@ health_router = APIRouter(
 
 @health_router.get("/", response_model=Health)
 async def health_check():
-    try:
-        async with httpx.AsyncClient(timeout=settings.OLLAMA_REQUEST_TIMEOUT) as client:
-            response = await client.get(f"{settings.OLLAMA_API_URL}/tags")
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                model_exists = any(model["name"] == settings.OLLAMA_MODEL_NAME for model in models)
-                if not model_exists:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=messages.OLLAMA_MODEL_IS_NOT_LOADED
-                    )
+    error = None
+
+    # The service is healthy as long as one of the Ollama backends can generate with the model
+    async with httpx.AsyncClient(timeout=settings.OLLAMA_REQUEST_TIMEOUT) as client:
+        for backend in build_backends(urls=settings.OLLAMA_API_URLS):
+            try:
+                response = await client.get(f"{backend.url}/tags")
+            except httpx.RequestError:
+                error = messages.CANNOT_CONNECT_TO_OLLAMA_SERVICE
+                continue
+
+            if response.status_code != 200:
+                error = messages.OLLAMA_SERVICE_RETURNED_UNEXPECTED_RESPONSE
+            elif not is_model_loaded(tags=response.json(), model_name=settings.OLLAMA_MODEL_NAME):
+                error = messages.OLLAMA_MODEL_IS_NOT_LOADED
+            else:
                 return Health(
                     message=messages.OLLAMA_SERVICE_IS_RUNNING
                 )
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=messages.OLLAMA_SERVICE_RETURNED_UNEXPECTED_RESPONSE
-            )
-    except httpx.RequestError:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=messages.CANNOT_CONNECT_TO_OLLAMA_SERVICE
-        )
+
+    raise HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=error or messages.CANNOT_CONNECT_TO_OLLAMA_SERVICE
+    )
@@ -0,0 +1,364 @@
+import time
+import logging
+from uuid import UUID
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple, Type
+
+import redis
+import pydantic
+from prometheus_client import Counter
+from shared_utils.schemas.status import TaskStatus
+
+from app.core.conf import settings
+from app.schemas.task import TaskRetrieve
+from app.core.redis import get_async_redis_client, get_redis_client
+
+
+logger = logging.getLogger(__name__)
+
+
+# Tasks in these statuses are not updated anymore by the workers
+TERMINAL_STATUSES = frozenset({TaskStatus.COMPLETED, TaskStatus.FAILED})
+
+
+TASK_DETAIL_CACHE_HITS = Counter(
+    'task_detail_cache_hits',
+    'Number of task detail lookups served from the cache, by cache tier.',
+    ['tier']
+)
+
+TASK_DETAIL_CACHE_MISSES = Counter(
+    'task_detail_cache_misses',
+    'Number of task detail lookups that were not found in the cache.'
+)
+
+
+class LocalCache:
+    """
+    In process least recently used cache, whose entries expire after their own time to live.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            - max_size (int): Maximum number of entries, the least recently used entry is evicted beyond it.
+        """
+        self.max_size = max_size
+        self._entries: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached value.
+
+        Args:
+            - key (str): Key of the value.
+
+        Returns:
+            - str | None: The cached value, or None if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        """
+        Cache a value.
+
+        Args:
+            - key (str): Key of the value.
+            - value (str): The value.
+            - ttl (float): Time to live of the value in seconds.
+        """
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """
+        Delete a cached value, if any.
+
+        Args:
+            - key (str): Key of the value.
+        """
+        self._entries.pop(key, None)
+
+
+class TaskDetailCache:
+    """
+    Read through cache of the task details, polled by the clients waiting for their tasks to complete.
+
+    Tasks are cached in redis, shared by all the API processes, in front of which every process keeps a local tier.
+    Tasks still processed by the workers are cached for a few seconds, while completed and failed tasks, which do not
+    change anymore, are cached for long. Task updates refresh or invalidate the cached task as they are applied, and
+    the local tier keeps tasks for a bounded time, since the updates applied by other processes do not reach it.
+    """
+
+    def __init__(
+            self,
+            schema: Type[pydantic.BaseModel],
+            prefix: str = 'task',
+            terminal_ttl: int = 3600,
+            active_ttl: int = 2,
+            local_max_size: int = 1024,
+            local_ttl: float = 30,
+            enabled: bool = True
+        ) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            - schema (Type[pydantic.BaseModel]): Schema of the cached tasks, with their `task_id` and `status`.
+            - prefix (str): Prefix of the redis keys, which tells the tasks of every service apart.
+            - terminal_ttl (int): Time to live in seconds of the completed and failed tasks.
+            - active_ttl (int): Time to live in seconds of the other tasks.
+            - local_max_size (int): Maximum number of tasks in the local tier.
+            - local_ttl (float): Maximum time to live in seconds of the tasks in the local tier.
+            - enabled (bool): Whether the cache is enabled, a disabled cache always misses.
+        """
+        self.schema = schema
+        self.prefix = prefix
+        self.terminal_ttl = terminal_ttl
+        self.active_ttl = active_ttl
+        self.local_ttl = local_ttl
+        self.enabled = enabled
+        self.local_cache = LocalCache(max_size=local_max_size)
+
+    def get_key(self, task_id: UUID | str) -> str:
+        """
+        Get the redis key of a task.
+
+        Args:
+            - task_id (UUID | str): Unique id of the task.
+
+        Returns:
+            - str: The redis key.
+        """
+        return f'{self.prefix}:{task_id}'
+
+    def get_ttl(self, task: pydantic.BaseModel) -> int:
+        """
+        Get the time to live of a cached task based on its status.
+
+        Args:
+            - task (pydantic.BaseModel): The task.
+
+        Returns:
+            - int: The time to live in seconds.
+        """
+        return self.terminal_ttl if task.status in TERMINAL_STATUSES else self.active_ttl
+
+    async def get(self, task_id: UUID | str) -> Optional[pydantic.BaseModel]:
+        """
+        Get a cached task, from the local tier first.
+
+        Args:
+            - task_id (UUID | str): Unique id of the task.
+
+        Returns:
+            - pydantic.BaseModel | None: The cached task, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+
+        key = self.get_key(task_id)
+
+        payload = self.local_cache.get(key)
+        if payload is not None:
+            TASK_DETAIL_CACHE_HITS.labels(tier='local').inc()
+            return self.schema.model_validate_json(payload)
+
+        try:
+            payload, ttl = await get_async_redis_client().pipeline().get(key).ttl(key).execute()
+        except redis.RedisError:
+            logger.warning("Failed to read the task detail cache", exc_info=True)
+            payload = None
+
+        if payload is None:
+            TASK_DETAIL_CACHE_MISSES.inc()
+            return None
+
+        TASK_DETAIL_CACHE_HITS.labels(tier='redis').inc()
+        self.local_cache.set(key, payload, ttl=min(max(ttl, 0), self.local_ttl))
+        return self.schema.model_validate_json(payload)
+
+    async def set(self, task: pydantic.BaseModel) -> None:
+        """
+        Cache a task for a time to live that depends on its status.
+
+        Args:
+            - task (pydantic.BaseModel): The task.
+        """
+        if not self.enabled:
+            return
+
+        key, payload, ttl = self.get_key(task.task_id), task.model_dump_json(), self.get_ttl(task)
+        self.local_cache.set(key, payload, ttl=min(ttl, self.local_ttl))
+
+        try:
+            await get_async_redis_client().set(key, payload, ex=ttl)
+        except redis.RedisError:
+            logger.warning("Failed to write the task detail cache", exc_info=True)
+
+    async def invalidate(self, task_ids: Iterable[UUID | str]) -> None:
+        """
+        Remove tasks from the cache.
+
+        Args:
+            - task_ids (Iterable[UUID | str]): Unique ids of the tasks.
+        """
+        if not self.enabled:
+            return
+
+        keys = [self.get_key(task_id) for task_id in task_ids]
+        if not keys:
+            return
+
+        for key in keys:
+            self.local_cache.delete(key)
+
+        try:
+            await get_async_redis_client().delete(*keys)
+        except redis.RedisError:
+            logger.warning("Failed to invalidate the task detail cache", exc_info=True)
+
+    def discard(self, task_ids: Iterable[UUID | str]) -> None:
+        """
+        Remove tasks from the redis tier, from synchronous code such as the celery workers, which have no local tier.
+
+        Args:
+            - task_ids (Iterable[UUID | str]): Unique ids of the tasks.
+        """
+        if not self.enabled:
+            return
+
+        keys = [self.get_key(task_id) for task_id in task_ids]
+        if not keys:
+            return
+
+        try:
+            get_redis_client().delete(*keys)
+        except redis.RedisError:
+            logger.warning("Failed to invalidate the task detail cache", exc_info=True)
+
+
+class IdempotencyCache:
+    """
+    Cache of the responses of the requests sent with an idempotency key, so a request sent again, once its response
+    was lost, is answered with the response of the first one instead of being applied twice.
+
+    The key is claimed before the request is applied, and holds its response once it is, for a time to live. The key
+    is released if the request fails, so it can be sent again.
+    """
+
+    def __init__(self, prefix: str = 'idempotency', ttl: int = 3600, enabled: bool = True) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            - prefix (str): Prefix of the redis keys, which tells the requests of every service apart.
+            - ttl (int): Time to live in seconds of the responses.
+            - enabled (bool): Whether the cache is enabled, every request is applied by a disabled cache.
+        """
+        self.prefix = prefix
+        self.ttl = ttl
+        self.enabled = enabled
+
+    def get_key(self, key: str) -> str:
+        """
+        Get the redis key of an idempotency key.
+
+        Args:
+            - key (str): The idempotency key.
+
+        Returns:
+            - str: The redis key.
+        """
+        return f'{self.prefix}:{key}'
+
+    async def claim(self, key: str) -> Tuple[bool, Optional[str]]:
+        """
+        Claim an idempotency key, to apply its request.
+
+        Args:
+            - key (str): The idempotency key.
+
+        Returns:
+            - Tuple[bool, str | None]: Whether the key was claimed, and the response of the request if it was applied
+              already, which is None while it is being applied.
+        """
+        if not self.enabled:
+            return True, None
+
+        try:
+            client = get_async_redis_client()
+            if await client.set(self.get_key(key), '', nx=True, ex=self.ttl):
+                return True, None
+            response = await client.get(self.get_key(key))
+        except redis.RedisError:
+            logger.warning("Failed to claim the idempotency key, applying the request", exc_info=True)
+            return True, None
+
+        # The key expired in between
+        if response is None:
+            return True, None
+
+        return False, response or None
+
+    async def complete(self, key: str, response: str) -> None:
+        """
+        Store the response of the request of a claimed idempotency key.
+
+        Args:
+            - key (str): The idempotency key.
+            - response (str): The response of the request.
+        """
+        if not self.enabled:
+            return
+
+        try:
+            await get_async_redis_client().set(self.get_key(key), response, ex=self.ttl)
+        except redis.RedisError:
+            logger.warning("Failed to store the response of the idempotency key", exc_info=True)
+
+    async def release(self, key: str) -> None:
+        """
+        Release a claimed idempotency key, whose request failed.
+
+        Args:
+            - key (str): The idempotency key.
+        """
+        if not self.enabled:
+            return
+
+        try:
+            await get_async_redis_client().delete(self.get_key(key))
+        except redis.RedisError:
+            logger.warning("Failed to release the idempotency key", exc_info=True)
+
+
+task_detail_cache = TaskDetailCache(
+    schema=TaskRetrieve,
+    prefix='thinker:task',
+    terminal_ttl=settings.TASK_DETAIL_CACHE_TERMINAL_TTL,
+    active_ttl=settings.TASK_DETAIL_CACHE_ACTIVE_TTL,
+    local_max_size=settings.TASK_DETAIL_CACHE_LOCAL_MAX_SIZE,
+    local_ttl=settings.TASK_DETAIL_CACHE_LOCAL_TTL,
+    enabled=settings.TASK_DETAIL_CACHE_ENABLED
+)
+
+callback_idempotency_cache = IdempotencyCache(
+    prefix='thinker:idempotency',
+    ttl=settings.TASK_CALLBACK_IDEMPOTENCY_TTL
+)
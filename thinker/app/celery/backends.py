@@ -0,0 +1,366 @@
+import time
+import uuid
+import random
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+import redis
+import httpx
+
+from app.core.conf import settings
+from app.core.redis import get_redis_client
+from app.exceptions import OllamaRequestFailed
+from app.utils import is_model_loaded
+from app.celery.ollama import OllamaClient, ollama_client
+from app.core.metrics import (THINK_OLLAMA_BACKENDS_AVAILABLE, THINK_OLLAMA_BACKEND_FAILURES,
+                              THINK_OLLAMA_BACKEND_CIRCUITS_OPENED, increment_metric, set_metric)
+
+
+logger = logging.getLogger(__name__)
+
+
+# Lease a generation on a backend, so the in flight generations of a worker that dies expire with their lease.
+START_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2])))
+"""
+
+# Update the health of a backend with the outcome of a request, ending its lease if any: exponentially weighted
+# latency, the consecutive failures, and the circuit breaker, which opens once the consecutive failures reach the
+# threshold. A request to a half open backend that fails again reopens its circuit for twice as long, up to 16
+# cooldowns. Returns 1 if the circuit was closed, or half open, before this request.
+RECORD_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+redis.call('ZREM', KEYS[2], ARGV[1])
+
+local state = redis.call('HMGET', KEYS[1], 'latency', 'failures', 'open_until')
+local outcome = ARGV[2]
+local alpha = tonumber(ARGV[4])
+local threshold = tonumber(ARGV[5])
+local latency = tonumber(state[1])
+local failures = tonumber(state[2]) or 0
+local opened = 0
+
+if outcome == 'success' then
+    if ARGV[3] ~= '' then
+        latency = latency and latency * (1 - alpha) + tonumber(ARGV[3]) * alpha or tonumber(ARGV[3])
+        redis.call('HSET', KEYS[1], 'latency', latency)
+    end
+    failures = 0
+else
+    failures = failures + 1
+    if failures >= threshold then
+        local cooldown = tonumber(ARGV[6]) * math.pow(2, math.min(failures - threshold, 4))
+        if (tonumber(state[3]) or 0) <= now then
+            opened = 1
+        end
+        redis.call('HSET', KEYS[1], 'open_until', now + cooldown)
+    end
+end
+
+redis.call('HSET', KEYS[1], 'failures', failures)
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+return opened
+"""
+
+
+class OllamaBackend(NamedTuple):
+    name: str
+    url: str
+
+
+def build_backends(urls: str) -> List[OllamaBackend]:
+    """
+    Build the backends of the pool from the configured Ollama API URLs.
+
+    Backends are named after a digest of their URL, so credentials in the URL never end up in redis keys.
+
+    Args:
+        - urls (str): Comma separated Ollama API URLs.
+
+    Returns:
+        - List[OllamaBackend]: The backends of the pool.
+    """
+    return [
+        OllamaBackend(name=f'backend-{hashlib.sha1(url.encode()).hexdigest()[:12]}', url=url)
+        for url in filter(None, map(str.strip, urls.split(',')))
+    ]
+
+
+class OllamaBackendPool:
+    """
+    Pool of the Ollama backends the think generations are spread over, with a health per backend shared by all the
+    thinker workers in redis.
+
+    Every generation is routed to the least loaded backend whose circuit is closed and which has the model loaded,
+    scored by its in flight generations weighted by its average latency, so a slower backend is sent fewer of them.
+    The models of every backend are probed through its `/tags` endpoint, at most once per interval for all the workers.
+    A backend whose requests keep failing has its circuit opened for a cooldown, and the generation fails over to the
+    next backend of the ranking.
+    """
+
+    def __init__(
+            self,
+            backends: List[OllamaBackend],
+            client: OllamaClient,
+            prefix: str = 'thinker:ollama:backend',
+            alpha: float = 0.2,
+            failure_threshold: int = 3,
+            cooldown: float = 30,
+            probe_interval: float = 30,
+            lease_ttl: float = 900,
+            stats_ttl: int = 86400
+        ) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            - backends (List[OllamaBackend]): The backends of the pool.
+            - client (OllamaClient): Client the backends are probed with.
+            - prefix (str): Prefix of the redis keys.
+            - alpha (float): Weight of the latest request in the latency average.
+            - failure_threshold (int): Consecutive failures after which the circuit of a backend opens.
+            - cooldown (float): Seconds the circuit of a backend stays open before a request is let through again.
+            - probe_interval (float): Seconds between two probes of the models of a backend.
+            - lease_ttl (float): Seconds a generation counts as in flight at most, in case its worker died.
+            - stats_ttl (int): Seconds the health of an unused backend is kept.
+        """
+        if not backends:
+            raise ValueError("The Ollama backend pool requires at least one backend")
+
+        self.backends = backends
+        self.client = client
+        self.prefix = prefix
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self.lease_ttl = lease_ttl
+        self.stats_ttl = stats_ttl
+
+    def _get_key(self, backend: OllamaBackend) -> str:
+        return f'{self.prefix}:{backend.name}'
+
+    def _get_in_flight_key(self, backend: OllamaBackend) -> str:
+        return f'{self.prefix}:{backend.name}:in_flight'
+
+    def _get_probe_key(self, backend: OllamaBackend, model: str) -> str:
+        return f'{self.prefix}:{backend.name}:probed:{model}'
+
+    def probe(self, backend: OllamaBackend, model: str) -> Optional[bool]:
+        """
+        Probe whether a backend has the model loaded, recording a failure if it cannot be reached.
+
+        Args:
+            - backend (OllamaBackend): The probed backend.
+            - model (str): Name of the model.
+
+        Returns:
+            - bool | None: Whether the backend has the model loaded, None if the probe failed.
+        """
+        try:
+            response = self.client.tags(base_url=backend.url)
+            response.raise_for_status()
+            loaded = is_model_loaded(tags=response.json(), model_name=model)
+        except (httpx.HTTPError, ValueError):
+            logger.warning("Probe of Ollama backend %s failed", backend.name, exc_info=True)
+            self.record(backend=backend, token=None, outcome='failure', latency=None)
+            return None
+
+        try:
+            key = self._get_key(backend)
+            get_redis_client().pipeline().hset(key, f'model:{model}', int(loaded)).expire(key, self.stats_ttl).execute()
+        except redis.RedisError:
+            logger.warning("Failed to record the models of Ollama backend %s", backend.name, exc_info=True)
+
+        if not loaded:
+            logger.warning("Ollama backend %s does not have the model %s loaded", backend.name, model)
+        return loaded
+
+    def _probe_due(self, model: str) -> None:
+        # The probe of every backend is locked for the interval, so a single worker probes it
+        pipeline = get_redis_client().pipeline()
+        for backend in self.backends:
+            pipeline.set(self._get_probe_key(backend, model), 1, nx=True, ex=max(1, int(self.probe_interval)))
+
+        for backend, due in zip(self.backends, pipeline.execute()):
+            if due:
+                self.probe(backend=backend, model=model)
+
+    def get_health(self, model: str) -> Dict[OllamaBackend, Dict[str, Any]]:
+        """
+        Get the health of every backend for a model, along with the current redis time.
+        """
+        client = get_redis_client()
+        now = time.time()
+
+        pipeline = client.pipeline()
+        for backend in self.backends:
+            pipeline.hgetall(self._get_key(backend))
+            pipeline.zcount(self._get_in_flight_key(backend), now, '+inf')
+        pipeline.time()
+        *results, (seconds, microseconds) = pipeline.execute()
+
+        now = seconds + microseconds / 1_000_000
+        return {
+            backend: {
+                # None until a generation succeeded on the backend
+                'latency': float(state['latency']) if 'latency' in state else None,
+                'in_flight': in_flight,
+                'open_for': max(0.0, float(state.get('open_until', 0)) - now),
+                # Backends not probed yet are assumed to have the model
+                'model_loaded': state.get(f'model:{model}') != '0'
+            }
+            for backend, state, in_flight in zip(self.backends, results[::2], results[1::2])
+        }
+
+    @staticmethod
+    def _score(health: Dict[str, Any], default_latency: float) -> float:
+        latency = health['latency'] if health['latency'] is not None else default_latency
+        return (health['in_flight'] + 1) * latency
+
+    def rank(self, model: str) -> List[OllamaBackend]:
+        """
+        Rank the backends a generation is sent to, in the order it fails over.
+
+        Args:
+            - model (str): Name of the model of the generation.
+
+        Returns:
+            - List[OllamaBackend]: The backends with a closed circuit and the model loaded, least loaded first, or
+              every backend by when its circuit closes if none is.
+        """
+        if len(self.backends) == 1:
+            return list(self.backends)
+
+        try:
+            self._probe_due(model=model)
+            health = self.get_health(model=model)
+        except redis.RedisError:
+            logger.warning("Ollama backend health is unavailable, ranking the backends randomly", exc_info=True)
+            return random.sample(self.backends, len(self.backends))
+
+        available = [
+            backend for backend in self.backends
+            if health[backend]['open_for'] == 0 and health[backend]['model_loaded']
+        ]
+        set_metric(THINK_OLLAMA_BACKENDS_AVAILABLE, len(available))
+
+        if not available:
+            return sorted(self.backends, key=lambda backend: health[backend]['open_for'])
+
+        # Backends without any latency recorded yet are scored with the average latency of the others, so they are
+        # ranked by their in flight generations instead of getting all of them
+        latencies = [health[backend]['latency'] for backend in available if health[backend]['latency'] is not None]
+        default_latency = sum(latencies) / len(latencies) if latencies else 1
+
+        # Shuffled first, so the backends with the same score share the generations
+        return sorted(
+            random.sample(available, len(available)),
+            key=lambda backend: self._score(health[backend], default_latency=default_latency)
+        )
+
+    def start(self, backend: OllamaBackend) -> Optional[str]:
+        """
+        Count a generation as in flight on a backend.
+
+        Args:
+            - backend (OllamaBackend): The backend of the generation.
+
+        Returns:
+            - str | None: Token of the generation, None if it could not be counted.
+        """
+        token = uuid.uuid4().hex
+
+        try:
+            get_redis_client().eval(START_SCRIPT, 1, self._get_in_flight_key(backend), token, self.lease_ttl)
+        except redis.RedisError:
+            logger.warning("Failed to count the generation on Ollama backend %s", backend.name, exc_info=True)
+            return None
+
+        return token
+
+    def record(self, backend: OllamaBackend, token: Optional[str], outcome: str, latency: Optional[float]) -> None:
+        """
+        Record the outcome of a request to a backend.
+
+        Args:
+            - backend (OllamaBackend): The backend of the request.
+            - token (str | None): Token of the generation to stop counting as in flight, None if there is none.
+            - outcome (str): Either 'success' or 'failure'.
+            - latency (float | None): Seconds the request took, None if unknown.
+        """
+        if outcome != 'success':
+            increment_metric(THINK_OLLAMA_BACKEND_FAILURES)
+
+        try:
+            opened = get_redis_client().eval(
+                RECORD_SCRIPT,
+                2,
+                self._get_key(backend),
+                self._get_in_flight_key(backend),
+                token or '',
+                outcome,
+                '' if latency is None else latency,
+                self.alpha,
+                self.failure_threshold,
+                self.cooldown,
+                self.stats_ttl
+            )
+        except redis.RedisError:
+            logger.warning("Failed to record the health of Ollama backend %s", backend.name, exc_info=True)
+            return
+
+        if int(opened):
+            increment_metric(THINK_OLLAMA_BACKEND_CIRCUITS_OPENED)
+            logger.warning("Circuit of Ollama backend %s opened", backend.name)
+
+    @contextmanager
+    def track(self, backend: OllamaBackend) -> Iterator[OllamaBackend]:
+        """
+        Track the load and health of a backend over a generation sent to it.
+
+        Args:
+            - backend (OllamaBackend): The backend of the generation.
+
+        Yields:
+            - OllamaBackend: The tracked backend.
+        """
+        if len(self.backends) == 1:
+            # A single backend is never ranked, so its health is not worth recording
+            yield backend
+            return
+
+        token, started = self.start(backend), time.monotonic()
+
+        try:
+            yield backend
+        except (httpx.HTTPError, OllamaRequestFailed):
+            self.record(backend=backend, token=token, outcome='failure', latency=None)
+            raise
+        except BaseException:
+            # Errors other than the ones of Ollama say nothing of the health of the backend
+            if token is not None:
+                try:
+                    get_redis_client().zrem(self._get_in_flight_key(backend), token)
+                except redis.RedisError:
+                    logger.warning("Failed to end the generation on Ollama backend %s", backend.name, exc_info=True)
+            raise
+        else:
+            self.record(backend=backend, token=token, outcome='success', latency=time.monotonic() - started)
+
+
+thinker_ollama_backends = OllamaBackendPool(
+    backends=build_backends(urls=settings.OLLAMA_API_URLS),
+    client=ollama_client,
+    failure_threshold=settings.OLLAMA_BACKEND_FAILURE_THRESHOLD,
+    cooldown=settings.OLLAMA_BACKEND_COOLDOWN,
+    probe_interval=settings.OLLAMA_BACKEND_PROBE_INTERVAL,
+    lease_ttl=settings.OLLAMA_GOVERNOR_LEASE_TTL
+)
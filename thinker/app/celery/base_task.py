@@ -1,46 +1,45 @@
 import traceback
 from typing import Any, Dict
 
-import requests
 from celery import Task
 from billiard.einfo import ExceptionInfo
 from shared_utils.schemas.status import TaskStatus
 
 from app.core.conf import settings
-from app.core.security import create_task_signature
+from app.celery.callbacks import thinker_callback_dispatcher
+from app.celery.persistence import thinker_result_store
 
 
 class ThinkTask(Task):
 
-    @staticmethod
-    def _get_request_headers(task_id: str) -> Dict[str, str]:
+    def _send_request(self, task_id: str, pyload: Dict[str, Any]) -> None:
         """
-        Helper method to get the headers for the request.
-        
+        Helper method to queue a callback to the task service, which is sent off the task thread, or to write it
+        straight to the database of the task service when direct persistence is enabled.
+
         Args:
             - task_id (str): Unique id of the task.
-        
-        Returns:
-            - Dict: Headers for the request.
+            - pyload (Dict): Data to be sent in the request.
         """
-        signature = create_task_signature(message=task_id)
-        return {
-            "Content-Type": "application/json",
-            "X-Signature": signature
-        }
+        if settings.TASK_DIRECT_PERSISTENCE_ENABLED:
+            thinker_result_store.persist(task_id=task_id, payload=pyload)
+        else:
+            thinker_callback_dispatcher.dispatch(task_id=task_id, payload=pyload)
 
-    def _send_request(self, task_id: str, pyload: Dict[str, Any]) -> None:
+    def send_partial_result(self, task_id: str, result: Dict[str, Any]) -> None:
         """
-        Helper method to send a request to the task service.
+        Update the result of a task in progress with the partial result generated so far.
 
         Args:
             - task_id (str): Unique id of the task.
-            - pyload (Dict): Data to be sent in the request.
+            - result (Dict): The partial result.
         """
-        requests.put(
-            f'{settings.TASK_CALLBACK_URL}/task/{task_id}/callback/',
-            headers=self._get_request_headers(task_id),
-            json=pyload
+        self._send_request(
+            task_id=task_id,
+            pyload={
+                'status': TaskStatus.IN_PROGRESS.value,
+                'result_data': result
+            }
         )
 
     def before_start(self, task_id: str, args: tuple, kwargs: dict) -> None:
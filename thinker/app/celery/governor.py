@@ -0,0 +1,300 @@
+import time
+import uuid
+import random
+import logging
+import contextlib
+from typing import Iterator, Optional, Tuple
+
+import redis
+import httpx
+
+from app.core.conf import settings
+from app.core.redis import get_redis_client
+from app.exceptions import OllamaBusy
+from app.core.metrics import (THINK_OLLAMA_CONCURRENCY_LIMIT, THINK_OLLAMA_IN_FLIGHT, THINK_OLLAMA_QUEUE_DEPTH,
+                              THINK_OLLAMA_GENERATIONS, THINK_OLLAMA_WAIT_SECONDS, THINK_OLLAMA_OVERLOADED,
+                              increment_metric, set_metric)
+
+
+logger = logging.getLogger(__name__)
+
+
+# Take a slot for the waiter if it is among the first waiters that fit in the free slots, so the slots are handed out
+# in arrival order. Slots are leased, and waiters are forgotten once they stop polling, so a worker that dies holding
+# a slot or waiting for one does not hold the others up. Returns whether the slot was taken, the limit, the number of
+# slots taken and the number of waiters.
+ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local token = ARGV[1]
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now - tonumber(ARGV[3]))
+for _, waiter in ipairs(stale) do
+    redis.call('ZREM', KEYS[2], waiter)
+    redis.call('ZREM', KEYS[3], waiter)
+end
+
+redis.call('ZADD', KEYS[2], 'NX', now, token)
+redis.call('ZADD', KEYS[3], now, token)
+
+local limit = tonumber(redis.call('HGET', KEYS[4], 'limit')) or tonumber(ARGV[4])
+local in_flight = redis.call('ZCARD', KEYS[1])
+local acquired = 0
+
+if redis.call('ZRANK', KEYS[2], token) < math.floor(limit) - in_flight then
+    redis.call('ZREM', KEYS[2], token)
+    redis.call('ZREM', KEYS[3], token)
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), token)
+    acquired = 1
+    in_flight = in_flight + 1
+end
+
+return {acquired, tostring(limit), in_flight, redis.call('ZCARD', KEYS[2])}
+"""
+
+# Release the slot and adapt the limit to the latency of the generation. The limit grows additively while the latency
+# stays within the tolerance of its moving average and the slots are in use, and shrinks multiplicatively once it
+# does not, or the generation timed out (AIMD). Decreases are applied at most once per average latency, so the
+# generations caught in the same congestion count as a single signal. Returns the limit, the number of slots taken
+# and the number of waiters.
+RELEASE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local in_flight = redis.call('ZCARD', KEYS[1])
+redis.call('ZREM', KEYS[1], ARGV[1])
+
+local state = redis.call('HMGET', KEYS[3], 'limit', 'baseline', 'decreased_at')
+local limit = tonumber(state[1]) or tonumber(ARGV[4])
+local baseline = tonumber(state[2])
+local decreased_at = tonumber(state[3]) or 0
+local congested = ARGV[3] == '1'
+
+if ARGV[2] ~= '' then
+    local latency = tonumber(ARGV[2])
+    baseline = baseline or latency
+    congested = congested or latency > baseline * tonumber(ARGV[7])
+    baseline = baseline + tonumber(ARGV[9]) * (latency - baseline)
+    redis.call('HSET', KEYS[3], 'baseline', baseline)
+end
+
+if congested then
+    if now - decreased_at >= (baseline or 0) then
+        limit = math.max(tonumber(ARGV[5]), limit * tonumber(ARGV[8]))
+        redis.call('HSET', KEYS[3], 'limit', limit, 'decreased_at', now)
+    end
+elseif ARGV[2] ~= '' and in_flight * 2 >= limit then
+    limit = math.min(tonumber(ARGV[6]), limit + 1 / limit)
+    redis.call('HSET', KEYS[3], 'limit', limit)
+end
+
+return {tostring(limit), redis.call('ZCARD', KEYS[1]), redis.call('ZCARD', KEYS[2])}
+"""
+
+
+class GovernorSlot:
+    """
+    Slot of a generation, which records the latency the limit adapts to once the slot is released.
+    """
+
+    def __init__(self) -> None:
+        self.latency: Optional[float] = None
+
+    def observe(self, latency: Optional[float]) -> None:
+        """
+        Record the latency of the generation.
+
+        Args:
+            - latency (float | None): Seconds Ollama took to start generating, None if unknown.
+        """
+        self.latency = latency
+
+
+class ConcurrencyGovernor:
+    """
+    Distributed semaphore bounding the concurrent Ollama generations of all the thinker workers, whose limit adapts
+    to the latency Ollama starts generating with.
+
+    The celery concurrency of the workers says nothing of how many generations Ollama serves in parallel, beyond which
+    the requests queue up inside Ollama until they time out. Generations take a slot stored in redis instead, waiting
+    in arrival order while the slots are taken. The limit grows additively while the time to first token stays close
+    to its moving average, which is where the generations queue up inside Ollama first, and shrinks multiplicatively
+    once it does not, or a generation times out (AIMD).
+    """
+
+    def __init__(
+            self,
+            key: str = 'thinker:ollama:governor',
+            initial_limit: float = 4,
+            min_limit: float = 1,
+            max_limit: float = 32,
+            latency_tolerance: float = 2,
+            multiplicative_decrease: float = 0.75,
+            latency_smoothing: float = 0.05,
+            max_wait: float = 300,
+            poll_interval: float = 0.1,
+            lease_ttl: float = 900,
+            enabled: bool = True
+        ) -> None:
+        """
+        Initialize the governor.
+
+        Args:
+            - key (str): Prefix of the redis keys.
+            - initial_limit (float): Concurrent generations permitted before any adjustment.
+            - min_limit (float): Lower bound of the concurrent generations.
+            - max_limit (float): Upper bound of the concurrent generations.
+            - latency_tolerance (float): Factor of the average latency beyond which a generation signals congestion.
+            - multiplicative_decrease (float): Factor the limit is multiplied by on congestion.
+            - latency_smoothing (float): Weight of every latency in its moving average.
+            - max_wait (float): Maximum seconds to wait for a slot before giving up.
+            - poll_interval (float): Seconds between two attempts to take a slot.
+            - lease_ttl (float): Seconds a slot is held at most, after which it is released for the worker holding it.
+            - enabled (bool): Whether the governor is enabled.
+        """
+        self.key = key
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.multiplicative_decrease = multiplicative_decrease
+        self.latency_smoothing = latency_smoothing
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.lease_ttl = lease_ttl
+        self.enabled = enabled
+
+    @property
+    def keys(self) -> Tuple[str, str, str, str]:
+        return f'{self.key}:slots', f'{self.key}:waiters', f'{self.key}:polled', f'{self.key}:state'
+
+    def _set_metrics(self, limit: float, in_flight: int, queue_depth: int) -> None:
+        set_metric(THINK_OLLAMA_CONCURRENCY_LIMIT, float(limit))
+        set_metric(THINK_OLLAMA_IN_FLIGHT, in_flight)
+        set_metric(THINK_OLLAMA_QUEUE_DEPTH, queue_depth)
+
+    def acquire(self) -> Optional[str]:
+        """
+        Wait until a slot is available to start a generation.
+
+        Returns:
+            - str | None: Token of the slot, None if the governor is disabled or unavailable.
+
+        Raises:
+            - OllamaBusy: If no slot is available within the maximum wait.
+        """
+        if not self.enabled:
+            return None
+
+        token, started = uuid.uuid4().hex, time.monotonic()
+        slots, waiters, polled, state = self.keys
+
+        try:
+            while True:
+                acquired, limit, in_flight, queue_depth = get_redis_client().eval(
+                    ACQUIRE_SCRIPT,
+                    4,
+                    slots,
+                    waiters,
+                    polled,
+                    state,
+                    token,
+                    self.lease_ttl,
+                    max(1, self.poll_interval * 10),
+                    self.initial_limit
+                )
+                if acquired:
+                    break
+
+                if time.monotonic() - started >= self.max_wait:
+                    get_redis_client().pipeline().zrem(waiters, token).zrem(polled, token).execute()
+                    increment_metric(THINK_OLLAMA_WAIT_SECONDS, time.monotonic() - started)
+                    increment_metric(THINK_OLLAMA_OVERLOADED)
+                    raise OllamaBusy("No Ollama generation slot was available")
+
+                # Jitter the polls, so the waiting workers do not hit redis all at once
+                time.sleep(self.poll_interval * random.uniform(0.5, 1.5))
+        except redis.RedisError:
+            logger.warning("Concurrency governor is unavailable, starting the generation directly", exc_info=True)
+            return None
+
+        increment_metric(THINK_OLLAMA_WAIT_SECONDS, time.monotonic() - started)
+        self._set_metrics(limit=float(limit), in_flight=in_flight, queue_depth=queue_depth)
+        return token
+
+    def release(self, token: Optional[str], latency: Optional[float], overloaded: bool) -> None:
+        """
+        Release a slot, adapting the limit to the latency of its generation.
+
+        Args:
+            - token (str | None): Token of the slot, None if no slot was taken.
+            - latency (float | None): Seconds Ollama took to start generating, None if unknown.
+            - overloaded (bool): Whether the generation timed out.
+        """
+        increment_metric(THINK_OLLAMA_GENERATIONS)
+        if overloaded:
+            increment_metric(THINK_OLLAMA_OVERLOADED)
+
+        if token is None:
+            return
+
+        slots, waiters, _, state = self.keys
+
+        try:
+            limit, in_flight, queue_depth = get_redis_client().eval(
+                RELEASE_SCRIPT,
+                3,
+                slots,
+                waiters,
+                state,
+                token,
+                '' if latency is None else max(latency, 0),
+                int(overloaded),
+                self.initial_limit,
+                self.min_limit,
+                self.max_limit,
+                self.latency_tolerance,
+                self.multiplicative_decrease,
+                self.latency_smoothing
+            )
+        except redis.RedisError:
+            logger.warning("Failed to release the Ollama generation slot", exc_info=True)
+            return
+
+        self._set_metrics(limit=float(limit), in_flight=in_flight, queue_depth=queue_depth)
+
+    @contextlib.contextmanager
+    def slot(self) -> Iterator[GovernorSlot]:
+        """
+        Hold a slot for the generation run within the block.
+
+        Returns:
+            - Iterator[GovernorSlot]: The slot, which the latency of the generation is recorded on.
+
+        Raises:
+            - OllamaBusy: If no slot is available within the maximum wait.
+        """
+        token, slot = self.acquire(), GovernorSlot()
+
+        try:
+            yield slot
+        except httpx.TimeoutException:
+            self.release(token=token, latency=None, overloaded=True)
+            raise
+        except BaseException:
+            # Errors other than timeouts say nothing of the load of Ollama
+            self.release(token=token, latency=None, overloaded=False)
+            raise
+        else:
+            self.release(token=token, latency=slot.latency, overloaded=False)
+
+
+thinker_ollama_governor = ConcurrencyGovernor(
+    initial_limit=settings.OLLAMA_GOVERNOR_INITIAL_LIMIT,
+    min_limit=settings.OLLAMA_GOVERNOR_MIN_LIMIT,
+    max_limit=settings.OLLAMA_GOVERNOR_MAX_LIMIT,
+    latency_tolerance=settings.OLLAMA_GOVERNOR_LATENCY_TOLERANCE,
+    max_wait=settings.OLLAMA_GOVERNOR_MAX_WAIT,
+    lease_ttl=settings.OLLAMA_GOVERNOR_LEASE_TTL,
+    enabled=settings.OLLAMA_GOVERNOR_ENABLED
+)
@@ -0,0 +1,241 @@
+import os
+import json
+import queue
+import asyncio
+import logging
+import threading
+from typing import Any, Coroutine, Dict, Iterator, Optional, TypeVar
+
+import httpx
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+
+from app.core.conf import settings
+from app.exceptions import OllamaRequestFailed
+
+
+logger = logging.getLogger(__name__)
+
+
+T = TypeVar('T')
+
+
+class OllamaClient:
+    """
+    Client of the Ollama API shared by the tasks of the current worker process.
+
+    The requests run on an event loop owned by a background thread, through a single `httpx.AsyncClient`, so both the
+    event loop and the keep-alive connections to Ollama outlive the tasks, instead of being set up and torn down by
+    every generation. The task thread waits for its own request, which can be sent from any worker pool.
+    """
+
+    def __init__(
+            self,
+            base_url: str,
+            timeout: Optional[float] = None,
+            max_connections: int = 10,
+            max_keepalive_connections: int = 10,
+            keepalive_expiry: float = 60
+        ) -> None:
+        """
+        Initialize the client.
+
+        Args:
+            - base_url (str): URL of the Ollama API.
+            - timeout (float | None): Seconds to wait for a response, None to wait for as long as the generation takes.
+            - max_connections (int): Maximum connections to Ollama of every worker process.
+            - max_keepalive_connections (int): Maximum idle connections kept alive between the requests.
+            - keepalive_expiry (float): Seconds an idle connection is kept alive for.
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._reset()
+
+        # The event loop thread does not survive a fork, so every worker process starts its own
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """
+        Start the event loop and the connection pool of the current process, if not started yet.
+
+        Returns:
+            - asyncio.AbstractEventLoop: The event loop the requests run on.
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='ollama-client', daemon=True).start()
+
+                # The client is created on its event loop, which its connections are bound to
+                self._client = asyncio.run_coroutine_threadsafe(self._create_client(), self._loop).result()
+
+            return self._loop
+
+    async def _create_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """
+        Run a coroutine on the event loop of the client, and wait for its result.
+
+        Args:
+            - coroutine (Coroutine): The coroutine.
+
+        Returns:
+            - T: The result of the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.start()).result()
+
+    def generate(self, payload: Dict[str, Any], base_url: Optional[str] = None) -> httpx.Response:
+        """
+        Send a generation request to Ollama over the pooled connections.
+
+        Args:
+            - payload (Dict[str, Any]): Body of the generation request.
+            - base_url (str | None): URL of the Ollama API to send the request to, the URL of the client if None.
+
+        Returns:
+            - httpx.Response: The response of Ollama.
+        """
+        return self.run(self._post(path='/generate', payload=payload, base_url=base_url))
+
+    def embed(self, payload: Dict[str, Any]) -> httpx.Response:
+        """
+        Send an embedding request to Ollama over the pooled connections.
+
+        Args:
+            - payload (Dict[str, Any]): Body of the embedding request.
+
+        Returns:
+            - httpx.Response: The response of Ollama.
+        """
+        return self.run(self._post(path='/embed', payload=payload))
+
+    def tags(self, base_url: Optional[str] = None, timeout: float = 5) -> httpx.Response:
+        """
+        List the models available on Ollama.
+
+        Args:
+            - base_url (str | None): URL of the Ollama API to send the request to, the URL of the client if None.
+            - timeout (float): Seconds to wait for the response, which is much shorter than a generation.
+
+        Returns:
+            - httpx.Response: The response of Ollama.
+        """
+        return self.run(self._get(path='/tags', base_url=base_url, timeout=timeout))
+
+    @staticmethod
+    def _get_url(path: str, base_url: Optional[str]) -> str:
+        # Absolute URLs take over the base URL of the client, so a single pool reaches every Ollama backend
+        return path if base_url is None else f'{base_url}{path}'
+
+    async def _get(self, path: str, base_url: Optional[str] = None, timeout: Optional[float] = None) -> httpx.Response:
+        return await self._client.get(self._get_url(path=path, base_url=base_url), timeout=timeout)
+
+    async def _post(self, path: str, payload: Dict[str, Any], base_url: Optional[str] = None) -> httpx.Response:
+        return await self._client.post(self._get_url(path=path, base_url=base_url), json=payload)
+
+    def stream_generate(self, payload: Dict[str, Any], base_url: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Send a streaming generation request to Ollama over the pooled connections, and iterate over the chunks of the
+        response as they arrive.
+
+        The response is read on the event loop of the client, which hands the chunks over to the task thread, so a
+        slow task never holds the loop up. Leaving the iteration early cancels the request.
+
+        Args:
+            - payload (Dict[str, Any]): Body of the generation request, which should stream its response.
+            - base_url (str | None): URL of the Ollama API to send the request to, the URL of the client if None.
+
+        Returns:
+            - Iterator[Dict[str, Any]]: The chunks of the response, the last of which is marked as done.
+
+        Raises:
+            - OllamaRequestFailed: If Ollama responds with an error.
+        """
+        chunks = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._stream(url=self._get_url(path='/generate', base_url=base_url), payload=payload, chunks=chunks),
+            self.start()
+        )
+
+        try:
+            while (chunk := chunks.get()) is not None:
+                yield chunk
+
+            # Raise the error the stream stopped on, if any
+            future.result()
+        finally:
+            future.cancel()
+
+    async def _stream(self, url: str, payload: Dict[str, Any], chunks: queue.Queue) -> None:
+        try:
+            async with self._client.stream('POST', url, json=payload) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise OllamaRequestFailed(f"Failed to generate think content: {response.text}")
+
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+
+                    chunk = json.loads(line)
+                    if 'error' in chunk:
+                        raise OllamaRequestFailed(f"Failed to generate think content: {chunk['error']}")
+
+                    chunks.put(chunk)
+        finally:
+            # Tell the task thread the stream is over
+            chunks.put(None)
+
+    def close(self) -> None:
+        """
+        Close the connections to Ollama and stop the event loop.
+        """
+        with self._lock:
+            loop, client = self._loop, self._client
+            if loop is None:
+                return
+            self._reset()
+
+        try:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+        except (TimeoutError, httpx.HTTPError, OSError):
+            logger.warning("Failed to close the connections to Ollama", exc_info=True)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+ollama_client = OllamaClient(
+    base_url=settings.OLLAMA_API_URL,
+    timeout=settings.OLLAMA_REQUEST_TIMEOUT,
+    max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY
+)
+
+
+@worker_process_init.connect
+def start_ollama_client(**kwargs) -> None:
+    """
+    Start the Ollama client as the worker process starts, so the first task does not pay for it.
+    """
+    ollama_client.start()
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def close_ollama_client(**kwargs) -> None:
+    """
+    Close the connections to Ollama before the worker process exits.
+    """
+    ollama_client.close()
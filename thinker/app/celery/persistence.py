@@ -0,0 +1,172 @@
+import os
+import asyncio
+import logging
+import threading
+from uuid import UUID
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from celery.signals import worker_process_shutdown, worker_shutdown
+from shared_utils.schemas.status import TaskStatus
+
+from app.core.conf import settings
+from app.cache import task_detail_cache
+from app.events import TaskEvent, task_event_broker
+from app.repositories.task import TaskModelRepository
+from app.celery.callbacks import CallbackDispatcher, thinker_callback_dispatcher
+
+
+logger = logging.getLogger(__name__)
+
+
+def build_task_update(task_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the database update of a task from its callback payload.
+
+    Args:
+        - task_id (str): Unique id of the task.
+        - payload (Dict): Data of the callback.
+
+    Returns:
+        - Dict: The update of the task, as expected by `TaskModelRepository.bulk_update`.
+    """
+    task_update = {
+        'id': UUID(task_id),
+        'increment_retry_count': int(payload.get('increment_retry_count', 0))
+    }
+
+    if payload.get('status') is not None:
+        task_update['status'] = TaskStatus(payload['status'])
+
+    for field in ('result_data', 'error'):
+        if field in payload:
+            task_update[field] = payload[field]
+
+    return task_update
+
+
+class TaskResultStore:
+    """
+    Store writing the task status transitions and results of the current worker process straight to the database of
+    the task service, which saves serializing and validating the results a second time in the task service.
+
+    The writes run on an event loop owned by a background thread, so the async connection pool outlives the tasks,
+    while the task thread waits for its own write, which keeps the updates of a task in order. Updates whose write
+    fails are sent through the callback dispatcher instead.
+    """
+
+    def __init__(
+            self,
+            database_url: str,
+            dispatcher: CallbackDispatcher,
+            pool_size: int = 2,
+            timeout: float = 5
+        ) -> None:
+        """
+        Initialize the store.
+
+        Args:
+            - database_url (str): Async URL of the task service database.
+            - dispatcher (CallbackDispatcher): Dispatcher the updates fall back to.
+            - pool_size (int): Maximum connections to the database of every worker process.
+            - timeout (float): Seconds to wait for a write before falling back to the dispatcher.
+        """
+        self.database_url = database_url
+        self.dispatcher = dispatcher
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._reset()
+
+        # The event loop thread does not survive a fork, so every worker process starts its own
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._engine: Optional[AsyncEngine] = None
+        self._session_maker: Optional[async_sessionmaker] = None
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._engine = create_async_engine(
+                    self.database_url,
+                    pool_size=self.pool_size,
+                    max_overflow=0,
+                    pool_pre_ping=True
+                )
+                self._session_maker = async_sessionmaker(self._engine, expire_on_commit=False)
+
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='task-result-store', daemon=True).start()
+
+            return self._loop
+
+    async def _write(self, task_update: Dict[str, Any]) -> None:
+        async with self._session_maker() as db:
+            await TaskModelRepository(db=db).bulk_update(updates=[task_update])
+
+    def persist(self, task_id: str, payload: Dict[str, Any]) -> None:
+        """
+        Write the update of a task to the database, or send it through the dispatcher if the write fails.
+
+        Args:
+            - task_id (str): Unique id of the task.
+            - payload (Dict): Data of the callback.
+        """
+        # An earlier update of the task is still on its way through the dispatcher, this one has to follow it
+        if self.dispatcher.is_pending(task_id):
+            self.dispatcher.dispatch(task_id=task_id, payload=payload)
+            return
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._write(task_update=build_task_update(task_id=task_id, payload=payload)),
+            self._start()
+        )
+
+        try:
+            future.result(timeout=self.timeout)
+        except (TimeoutError, SQLAlchemyError, OSError):
+            future.cancel()
+            logger.warning("Failed to write the update of task %s, sending it as a callback", task_id, exc_info=True)
+            self.dispatcher.dispatch(task_id=task_id, payload=payload)
+        else:
+            # The update skips the callback route, which refreshes the cached task and publishes it otherwise
+            task_detail_cache.discard(task_ids=[task_id])
+            if payload.get('status') is not None:
+                task_event_broker.publish_sync(TaskEvent(task_id=task_id, status=TaskStatus(payload['status'])))
+
+    def close(self) -> None:
+        """
+        Close the connections to the database and stop the event loop.
+        """
+        with self._lock:
+            loop, engine = self._loop, self._engine
+            if loop is None:
+                return
+            self._reset()
+
+        try:
+            asyncio.run_coroutine_threadsafe(engine.dispose(), loop).result(timeout=self.timeout)
+        except (TimeoutError, SQLAlchemyError, OSError):
+            logger.warning("Failed to close the connections to the database", exc_info=True)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+thinker_result_store = TaskResultStore(
+    database_url=settings.SQLALCHEMY_DATABASE_URL,
+    dispatcher=thinker_callback_dispatcher,
+    pool_size=settings.TASK_DIRECT_PERSISTENCE_POOL_SIZE,
+    timeout=settings.TASK_DIRECT_PERSISTENCE_TIMEOUT
+)
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def close_task_result_store(**kwargs) -> None:
+    """
+    Close the connections to the database before the worker process exits.
+    """
+    thinker_result_store.close()
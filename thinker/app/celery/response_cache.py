@@ -0,0 +1,363 @@
+import json
+import math
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import redis
+import httpx
+
+from app.core.conf import settings
+from app.core.redis import get_redis_client
+from app.core.metrics import (THINK_RESPONSE_CACHE_EXACT_HITS, THINK_RESPONSE_CACHE_SEMANTIC_HITS,
+                              THINK_RESPONSE_CACHE_MISSES, increment_metric)
+from app.celery.ollama import ollama_client
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt, so the prompts differing only by their case and whitespace are cached together.
+
+    Args:
+        - prompt (str): The prompt.
+
+    Returns:
+        - str: The normalized prompt.
+    """
+    return ' '.join(prompt.split()).casefold()
+
+
+def get_response_cache_key(payload: Dict[str, Any]) -> str:
+    """
+    Get the cache key of a generation request, from its model, normalized prompt, and parameters.
+
+    Args:
+        - payload (Dict[str, Any]): Body of the generation request.
+
+    Returns:
+        - str: The cache key.
+    """
+    params = json.dumps(
+        [payload.get('model'), normalize_prompt(payload['prompt']), payload.get('temperature'), payload.get('max_tokens')]
+    )
+    return hashlib.sha256(params.encode()).hexdigest()
+
+
+def normalize_vector(vector: List[float]) -> Tuple[float, ...]:
+    norm = math.sqrt(sum(value * value for value in vector)) or 1
+    return tuple(value / norm for value in vector)
+
+
+class SemanticIndex:
+    """
+    In process nearest neighbour index of the prompt embeddings, pointing at the cache keys of their responses.
+
+    The index is searched exhaustively, which is fast enough for the few thousand prompts it holds, next to the
+    generation it saves. The embeddings are only compared within the same bucket, so a response is only served to the
+    requests with the same model and parameters.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 86400, threshold: float = 0.95) -> None:
+        """
+        Initialize the index.
+
+        Args:
+            - max_size (int): Maximum number of embeddings, the least recently used embedding is evicted beyond it.
+            - ttl (float): Time to live of the embeddings in seconds.
+            - threshold (float): Minimum cosine similarity of a prompt to the nearest cached prompt for a hit.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, Tuple[float, str, Tuple[float, ...]]] = OrderedDict()
+
+    def search(self, bucket: str, embedding: List[float]) -> Optional[str]:
+        """
+        Search the nearest cached prompt of a bucket.
+
+        Args:
+            - bucket (str): Bucket of the prompt.
+            - embedding (List[float]): Embedding of the prompt.
+
+        Returns:
+            - str | None: Cache key of the nearest prompt, or None if no prompt is similar enough.
+        """
+        vector, now = normalize_vector(embedding), time.monotonic()
+        best_key, best_similarity = None, self.threshold
+
+        with self._lock:
+            for key, (expires_at, entry_bucket, entry_vector) in list(self._entries.items()):
+                if expires_at <= now:
+                    del self._entries[key]
+                    continue
+
+                if entry_bucket != bucket or len(entry_vector) != len(vector):
+                    continue
+
+                similarity = sum(a * b for a, b in zip(vector, entry_vector))
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+
+        return best_key
+
+    def add(self, bucket: str, key: str, embedding: List[float]) -> None:
+        """
+        Add the embedding of a cached prompt.
+
+        Args:
+            - bucket (str): Bucket of the prompt.
+            - key (str): Cache key of the response of the prompt.
+            - embedding (List[float]): Embedding of the prompt.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, bucket, normalize_vector(embedding))
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        """
+        Remove the embedding of a prompt whose response is no longer cached, if any.
+
+        Args:
+            - key (str): Cache key of the response of the prompt.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class ResponseCacheLookup:
+    """
+    Lookup of a generation request in the response cache, which the generated response is stored under on a miss.
+    """
+
+    def __init__(
+            self,
+            key: str,
+            bucket: str,
+            embedding: Optional[List[float]] = None,
+            result: Optional[Dict[str, Any]] = None,
+            tier: Optional[str] = None
+        ) -> None:
+        """
+        Initialize the lookup.
+
+        Args:
+            - key (str): Cache key of the request.
+            - bucket (str): Bucket of the request in the semantic index.
+            - embedding (List[float] | None): Embedding of the prompt, None if the semantic tier was not searched.
+            - result (Dict[str, Any] | None): The cached response, None on a miss.
+            - tier (str | None): Tier of the cache the response was found in, None on a miss.
+        """
+        self.key = key
+        self.bucket = bucket
+        self.embedding = embedding
+        self.result = result
+        self.tier = tier
+
+
+class ResponseCache:
+    """
+    Cache of the Ollama responses, in front of the generation of the think tasks.
+
+    Responses are cached in redis, shared by all the workers, under the hash of the normalized prompt and the
+    generation parameters, for a time to live. The cache is bounded in size by a sorted set of the keys by their last
+    use, from which the least recently used responses are evicted. Requests deterministic enough, at a low temperature,
+    are also looked up by the embedding of their prompt in a semantic index kept by every worker process, which serves
+    the response of a near identical prompt.
+    """
+
+    def __init__(
+            self,
+            embed: Optional[Callable[[Dict[str, Any]], httpx.Response]] = None,
+            prefix: str = 'thinker:response',
+            ttl: int = 86400,
+            max_size: int = 10000,
+            semantic_model: Optional[str] = None,
+            semantic_max_temperature: float = 0.2,
+            semantic_index: Optional[SemanticIndex] = None,
+            enabled: bool = True
+        ) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            - embed (Callable[[Dict[str, Any]], httpx.Response] | None): Function sending an embedding request to
+              Ollama, None to disable the semantic tier.
+            - prefix (str): Prefix of the redis keys.
+            - ttl (int): Time to live of the responses in seconds.
+            - max_size (int): Maximum number of responses, the least recently used response is evicted beyond it.
+            - semantic_model (str | None): Ollama model embedding the prompts, None to disable the semantic tier.
+            - semantic_max_temperature (float): Maximum temperature of the requests looked up by their embedding.
+            - semantic_index (SemanticIndex | None): Index of the prompt embeddings, None to disable the semantic tier.
+            - enabled (bool): Whether the cache is enabled, a disabled cache always misses.
+        """
+        self.embed = embed
+        self.prefix = prefix
+        self.ttl = ttl
+        self.max_size = max_size
+        self.semantic_model = semantic_model
+        self.semantic_max_temperature = semantic_max_temperature
+        self.semantic_index = semantic_index
+        self.enabled = enabled
+
+    @property
+    def index_key(self) -> str:
+        return f'{self.prefix}:index'
+
+    def get_key(self, key: str) -> str:
+        """
+        Get the redis key of a response.
+
+        Args:
+            - key (str): Cache key of the response.
+
+        Returns:
+            - str: The redis key.
+        """
+        return f'{self.prefix}:{key}'
+
+    def is_semantic(self, payload: Dict[str, Any]) -> bool:
+        """
+        Check whether a generation request is looked up in the semantic tier.
+
+        Args:
+            - payload (Dict[str, Any]): Body of the generation request.
+
+        Returns:
+            - bool: True if the semantic tier is enabled and the request is deterministic enough.
+        """
+        return (
+            self.embed is not None
+            and self.semantic_model is not None
+            and self.semantic_index is not None
+            and (payload.get('temperature') or 0) <= self.semantic_max_temperature
+        )
+
+    def _get_embedding(self, text: str) -> Optional[List[float]]:
+        try:
+            response = self.embed({'model': self.semantic_model, 'input': normalize_prompt(text)})
+            response.raise_for_status()
+            return response.json()['embeddings'][0]
+        except (httpx.HTTPError, KeyError, IndexError, ValueError):
+            logger.warning("Failed to embed the prompt for the response cache", exc_info=True)
+            return None
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        client = get_redis_client()
+        payload = client.get(self.get_key(key))
+        if payload is None:
+            return None
+
+        # Touch the response, so it is evicted after the responses used less recently
+        client.zadd(self.index_key, {key: time.time()})
+        return json.loads(payload)
+
+    def lookup(self, payload: Dict[str, Any], text: Optional[str] = None) -> ResponseCacheLookup:
+        """
+        Look a generation request up, by its cache key first, then by the embedding of its prompt.
+
+        Args:
+            - payload (Dict[str, Any]): Body of the generation request.
+            - text (str | None): Text embedded for the semantic tier, which should leave the template of the prompt
+              out, since it makes every prompt look alike. The whole prompt is embedded if None.
+
+        Returns:
+            - ResponseCacheLookup: The lookup, holding the cached response on a hit.
+        """
+        key = get_response_cache_key(payload)
+        lookup = ResponseCacheLookup(
+            key=key,
+            bucket=json.dumps([payload.get('model'), payload.get('temperature'), payload.get('max_tokens')])
+        )
+        if not self.enabled:
+            return lookup
+
+        try:
+            lookup.result = self._read(key)
+            if lookup.result is not None:
+                lookup.tier = 'exact'
+            elif self.is_semantic(payload):
+                lookup.embedding = self._get_embedding(text or payload['prompt'])
+                nearest_key = None
+                if lookup.embedding is not None:
+                    nearest_key = self.semantic_index.search(bucket=lookup.bucket, embedding=lookup.embedding)
+                if nearest_key is not None:
+                    lookup.result = self._read(nearest_key)
+                    if lookup.result is not None:
+                        lookup.tier = 'semantic'
+                    else:
+                        # The response expired or was evicted from redis
+                        self.semantic_index.discard(nearest_key)
+        except redis.RedisError:
+            logger.warning("Failed to read the response cache", exc_info=True)
+
+        if lookup.tier == 'exact':
+            increment_metric(THINK_RESPONSE_CACHE_EXACT_HITS)
+        elif lookup.tier == 'semantic':
+            increment_metric(THINK_RESPONSE_CACHE_SEMANTIC_HITS)
+        else:
+            increment_metric(THINK_RESPONSE_CACHE_MISSES)
+        return lookup
+
+    def store(self, lookup: ResponseCacheLookup, result: Dict[str, Any]) -> None:
+        """
+        Cache the response generated for a request that missed the cache.
+
+        Args:
+            - lookup (ResponseCacheLookup): The lookup of the request.
+            - result (Dict[str, Any]): The generated response.
+        """
+        if not self.enabled or lookup.tier is not None:
+            return
+
+        now = time.time()
+
+        try:
+            client = get_redis_client()
+            pipeline = client.pipeline()
+            pipeline.set(self.get_key(lookup.key), json.dumps(result), ex=self.ttl)
+            pipeline.zadd(self.index_key, {lookup.key: now})
+            # Responses not used for a whole time to live have expired already
+            pipeline.zremrangebyscore(self.index_key, '-inf', now - self.ttl)
+            pipeline.zcard(self.index_key)
+            size = pipeline.execute()[-1]
+
+            if size > self.max_size:
+                evicted = [key for key, _ in client.zpopmin(self.index_key, size - self.max_size)]
+                client.delete(*(self.get_key(key) for key in evicted))
+                if self.semantic_index is not None:
+                    for key in evicted:
+                        self.semantic_index.discard(key)
+        except redis.RedisError:
+            logger.warning("Failed to write the response cache", exc_info=True)
+            return
+
+        if lookup.embedding is not None:
+            self.semantic_index.add(bucket=lookup.bucket, key=lookup.key, embedding=lookup.embedding)
+
+
+thinker_response_cache = ResponseCache(
+    embed=ollama_client.embed,
+    ttl=settings.THINK_RESPONSE_CACHE_TTL,
+    max_size=settings.THINK_RESPONSE_CACHE_MAX_SIZE,
+    semantic_model=settings.THINK_RESPONSE_CACHE_SEMANTIC_MODEL_NAME,
+    semantic_max_temperature=settings.THINK_RESPONSE_CACHE_SEMANTIC_MAX_TEMPERATURE,
+    semantic_index=SemanticIndex(
+        max_size=settings.THINK_RESPONSE_CACHE_SEMANTIC_MAX_SIZE,
+        ttl=settings.THINK_RESPONSE_CACHE_TTL,
+        threshold=settings.THINK_RESPONSE_CACHE_SEMANTIC_THRESHOLD
+    ) if settings.THINK_RESPONSE_CACHE_SEMANTIC_ENABLED else None,
+    enabled=settings.THINK_RESPONSE_CACHE_ENABLED
+)
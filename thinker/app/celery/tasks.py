@@ -1,34 +1,44 @@
-from typing import Dict, Optional, Any
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional
 
 import httpx
 from celery import shared_task
-from shared_utils.async_handler import AsyncHandler
 
 from app.core.conf import settings
-from app.utils import split_think_content
+from app.core.metrics import THINK_OLLAMA_BACKEND_FAILOVERS, increment_metric
+from app.exceptions import OllamaRequestFailed
+from app.utils import ThinkStreamSplitter, split_think_content
 from app.celery.base_task import ThinkTask
+from app.celery.ollama import ollama_client
+from app.celery.governor import thinker_ollama_governor
+from app.celery.backends import thinker_ollama_backends
+from app.celery.response_cache import thinker_response_cache
 
 
-@shared_task(
-    queue='thinker_queue',
-    routing_key='thinker_routing_key',
-    exchange='thinker_exchange',
-    base=ThinkTask,
-    throws=(Exception, ),
-    autoretry_for=(Exception, ),
-    bind=True,
-    max_retries=5,
-    default_retry_delay=5
-)
-@AsyncHandler.sync_to_async
-async def think_task(
-        self,
+logger = logging.getLogger(__name__)
+
+
+def build_ollama_request(
         question: str,
         context: Optional[str] = None,
         temperature: Optional[float] = 0.7,
         max_tokens: Optional[int] = 250,
+        stream: bool = False
     ) -> Dict[str, Any]:
+    """
+    Build the Ollama generation request answering a question.
+
+    Args:
+        - question (str): The question to answer.
+        - context (str, optional): Background information for the question.
+        - temperature (float, optional): Randomness of the generation.
+        - max_tokens (int, optional): Maximum number of output tokens.
+        - stream (bool): Whether Ollama streams the tokens as they are generated.
 
+    Returns:
+        - Dict[str, Any]: Body of the generation request.
+    """
     if context:
         prompt = f"""
         Context: {context}
@@ -44,25 +54,239 @@ async def think_task(
         Please provide a concise and accurate answer based on your knowledge.
         """
 
-    ollama_request = {
+    return {
         "model": settings.OLLAMA_MODEL_NAME,
         "prompt": prompt,
         "temperature": temperature,
         "max_tokens": max_tokens,
-        "stream": False
+        "stream": stream
+    }
+
+
+def get_generation_metrics(result: Dict[str, Any], time_to_first_token: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Get the metrics of a generation from the statistics Ollama reports along with the end of its response.
+
+    Args:
+        - result (Dict[str, Any]): The response of Ollama, or the last chunk of its streamed response.
+        - time_to_first_token (float, optional): Seconds from sending the request to receiving the first token.
+
+    Returns:
+        - Dict[str, Any]: The metrics of the generation.
+    """
+    # Ollama reports its durations in nanoseconds
+    eval_count = result.get("eval_count")
+    eval_duration = result.get("eval_duration")
+    total_duration = result.get("total_duration")
+
+    return {
+        "time_to_first_token": time_to_first_token,
+        "tokens_per_second": eval_count / eval_duration * 1e9 if eval_count and eval_duration else None,
+        "eval_count": eval_count,
+        "total_duration": total_duration / 1e9 if total_duration else None
+    }
+
+
+def get_first_token_latency(metrics: Dict[str, Any], elapsed: float) -> Optional[float]:
+    """
+    Get the seconds Ollama took to start generating, which grow first as the generations queue up inside Ollama.
+
+    The latency is measured when the response is streamed, and otherwise estimated as the seconds the request took
+    less the seconds Ollama spent generating the tokens.
+
+    Args:
+        - metrics (Dict[str, Any]): The metrics of the generation.
+        - elapsed (float): Seconds the request took.
+
+    Returns:
+        - float | None: The latency, None if it can not be told.
+    """
+    if metrics["time_to_first_token"] is not None:
+        return metrics["time_to_first_token"]
+
+    if metrics["eval_count"] and metrics["tokens_per_second"]:
+        return max(elapsed - metrics["eval_count"] / metrics["tokens_per_second"], 0)
+
+    return None
+
+
+def parse_ollama_response(response: httpx.Response) -> Dict[str, Any]:
+    """
+    Parse the Ollama generation response into the answer and the thinking of the model.
+
+    Args:
+        - response (httpx.Response): The response of Ollama.
+
+    Returns:
+        - Dict[str, Any]: The answer and the thinking.
+
+    Raises:
+        - OllamaRequestFailed: If Ollama responds with an error.
+    """
+    if response.status_code != 200:
+        raise OllamaRequestFailed(f"Failed to generate think content: {response.text}")
+
+    result = response.json()
+    text = result.get("response", "").strip()
+    think_content, remaining_content = split_think_content(text)
+
+    return {
+        "answer": remaining_content.strip(),
+        "thinking": think_content,
+        "metrics": get_generation_metrics(result)
+    }
+
+
+def stream_ollama_response(
+        chunks: Iterable[Dict[str, Any]],
+        started: float,
+        publish_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
+        partial_interval: float = 1
+    ) -> Dict[str, Any]:
+    """
+    Read the streamed Ollama generation response into the answer and the thinking of the model, splitting them as the
+    tokens arrive, and publish the partial result at most once every interval.
+
+    Args:
+        - chunks (Iterable[Dict[str, Any]]): The chunks of the response.
+        - started (float): Time the request was sent at, as given by `time.monotonic`.
+        - publish_partial (Callable[[Dict[str, Any]], None], optional): Function publishing the partial result.
+        - partial_interval (float): Minimum seconds between two publications of the partial result.
+
+    Returns:
+        - Dict[str, Any]: The answer, the thinking, and the metrics of the generation.
+    """
+    splitter = ThinkStreamSplitter()
+    time_to_first_token = None
+    published_at = None
+    last_chunk = {}
+
+    for chunk in chunks:
+        last_chunk = chunk
+        token = chunk.get("response", "")
+        if not token:
+            continue
+
+        now = time.monotonic()
+        if time_to_first_token is None:
+            time_to_first_token = now - started
+        splitter.feed(token)
+
+        # The first token is published right away, the following ones once the interval is over
+        if publish_partial is not None and (published_at is None or now - published_at >= partial_interval):
+            publish_partial({"answer": splitter.answer.strip(), "thinking": splitter.thinking})
+            published_at = now
+
+    think_content, remaining_content = splitter.close()
+
+    return {
+        "answer": remaining_content,
+        "thinking": think_content,
+        "metrics": get_generation_metrics(last_chunk, time_to_first_token=time_to_first_token)
     }
 
-    async with httpx.AsyncClient(timeout=settings.OLLAMA_REQUEST_TIMEOUT) as client:
-        response = await client.post(f"{settings.OLLAMA_API_URL}/generate", json=ollama_request)
 
-        if response.status_code != 200:
-            raise Exception(f"Failed to generate think content: {response.text}")
+def generate_think_content(
+        payload: Dict[str, Any],
+        base_url: Optional[str] = None,
+        started: Optional[float] = None,
+        publish_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+    """
+    Send a generation request to Ollama, over the connections kept alive by the worker process, and read its response,
+    as it is streamed if enabled.
+
+    Args:
+        - payload (Dict[str, Any]): The request payload.
+        - base_url (str | None): URL of the Ollama API to send the request to, the default one if None.
+        - started (float | None): Time the request was sent at, as given by `time.monotonic`, now if None.
+        - publish_partial (Callable[[Dict[str, Any]], None], optional): Function publishing the partial result.
+
+    Returns:
+        - Dict[str, Any]: The answer, the thinking, and the metrics of the generation.
+
+    Raises:
+        - OllamaRequestFailed: If Ollama responds with an error.
+    """
+    if not settings.OLLAMA_STREAM_ENABLED:
+        return parse_ollama_response(ollama_client.generate(payload=payload, base_url=base_url))
+
+    # The answer is written to the task as it is generated, so it can be followed before the generation is over
+    return stream_ollama_response(
+        chunks=ollama_client.stream_generate(payload=payload, base_url=base_url),
+        started=time.monotonic() if started is None else started,
+        publish_partial=publish_partial,
+        partial_interval=settings.OLLAMA_STREAM_PARTIAL_INTERVAL
+    )
+
+
+@shared_task(
+    queue='thinker_queue',
+    routing_key='thinker_routing_key',
+    exchange='thinker_exchange',
+    base=ThinkTask,
+    throws=(Exception, ),
+    autoretry_for=(Exception, ),
+    bind=True,
+    max_retries=5,
+    default_retry_delay=5
+)
+def think_task(
+        self,
+        question: str,
+        context: Optional[str] = None,
+        temperature: Optional[float] = 0.7,
+        max_tokens: Optional[int] = 250,
+    ) -> Dict[str, Any]:
+    payload = build_ollama_request(
+        question=question,
+        context=context,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=settings.OLLAMA_STREAM_ENABLED
+    )
+
+    # Identical, or near identical deterministic, requests are answered without generating again
+    lookup = thinker_response_cache.lookup(payload, text=f"{context}\n{question}" if context else question)
+    if lookup.result is not None:
+        return {**lookup.result, "metrics": {**(lookup.result.get("metrics") or {}), "cache": lookup.tier}}
+
+    # Generations wait for a slot of the governor, so Ollama is not sent more requests than it serves in parallel
+    with thinker_ollama_governor.slot() as slot:
+        backends = thinker_ollama_backends.rank(model=payload["model"])
+
+        # The generation is sent to the least loaded backend, and fails over to the next ones if it fails on it
+        for attempt, backend in enumerate(backends, start=1):
+            started = time.monotonic()
+
+            try:
+                with thinker_ollama_backends.track(backend):
+                    result = generate_think_content(
+                        payload=payload,
+                        base_url=backend.url,
+                        started=started,
+                        publish_partial=lambda partial: self.send_partial_result(task_id=self.request.id, result=partial)
+                    )
+            except (httpx.HTTPError, OllamaRequestFailed):
+                if attempt == len(backends):
+                    raise
+                increment_metric(THINK_OLLAMA_BACKEND_FAILOVERS)
+                logger.warning(
+                    "Task %s failed on Ollama backend %s, failing over", self.request.id, backend.name, exc_info=True
+                )
+            else:
+                break
+
+        slot.observe(get_first_token_latency(metrics=result["metrics"], elapsed=time.monotonic() - started))
 
-        result = response.json()
-        text = result.get("response", "").strip()
-        think_content, remaining_content = split_think_content(text)
+    metrics = result["metrics"]
+    logger.info(
+        "Task %s generated %s tokens, first token after %.3fs, %.1f tokens/s",
+        self.request.id,
+        metrics["eval_count"],
+        metrics["time_to_first_token"] or 0,
+        metrics["tokens_per_second"] or 0
+    )
 
-        return {
-            "answer": remaining_content,
-            "thinking": think_content
-        }
+    thinker_response_cache.store(lookup=lookup, result=result)
+    return result
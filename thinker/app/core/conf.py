@@ -23,12 +23,83 @@ class Settings(BaseSettings):
     OLLAMA_MODEL_NAME: Optional[str] = os.environ.get('OLLAMA_MODEL_NAME', None)
     OLLAMA_REQUEST_TIMEOUT: int = os.environ.get('OLLAMA_REQUEST_TIMEOUT', None)
 
+    # Ollama Backend Envs (comma separated URLs of the Ollama APIs the generations are spread over, falling back to the
+    # Ollama API URL, the models of every backend are probed every interval in seconds)
+    OLLAMA_API_URLS: str = os.environ.get('OLLAMA_API_URLS', os.environ.get('OLLAMA_API_URL', ''))
+    OLLAMA_BACKEND_PROBE_INTERVAL: float = os.environ.get('OLLAMA_BACKEND_PROBE_INTERVAL', 30)
+    OLLAMA_BACKEND_FAILURE_THRESHOLD: int = os.environ.get('OLLAMA_BACKEND_FAILURE_THRESHOLD', 3)
+    OLLAMA_BACKEND_COOLDOWN: float = os.environ.get('OLLAMA_BACKEND_COOLDOWN', 30)
+
+    # Ollama Client Envs (connections are pooled per worker process, idle connections expire after seconds)
+    OLLAMA_MAX_CONNECTIONS: int = os.environ.get('OLLAMA_MAX_CONNECTIONS', 10)
+    OLLAMA_MAX_KEEPALIVE_CONNECTIONS: int = os.environ.get('OLLAMA_MAX_KEEPALIVE_CONNECTIONS', 10)
+    OLLAMA_KEEPALIVE_EXPIRY: float = os.environ.get('OLLAMA_KEEPALIVE_EXPIRY', 60)
+
+    # Ollama Streaming Envs (partial answers are written to the task at most once every interval in seconds)
+    OLLAMA_STREAM_ENABLED: bool = os.environ.get('OLLAMA_STREAM_ENABLED', True)
+    OLLAMA_STREAM_PARTIAL_INTERVAL: float = os.environ.get('OLLAMA_STREAM_PARTIAL_INTERVAL', 1)
+
+    # Ollama Governor Envs (concurrent generations across the workers, adapting between the bounds to the time to first
+    # token, the tasks waiting longer than the maximum wait in seconds are retried)
+    OLLAMA_GOVERNOR_ENABLED: bool = os.environ.get('OLLAMA_GOVERNOR_ENABLED', True)
+    OLLAMA_GOVERNOR_INITIAL_LIMIT: float = os.environ.get('OLLAMA_GOVERNOR_INITIAL_LIMIT', 4)
+    OLLAMA_GOVERNOR_MIN_LIMIT: float = os.environ.get('OLLAMA_GOVERNOR_MIN_LIMIT', 1)
+    OLLAMA_GOVERNOR_MAX_LIMIT: float = os.environ.get('OLLAMA_GOVERNOR_MAX_LIMIT', 32)
+    OLLAMA_GOVERNOR_LATENCY_TOLERANCE: float = os.environ.get('OLLAMA_GOVERNOR_LATENCY_TOLERANCE', 2)
+    OLLAMA_GOVERNOR_MAX_WAIT: float = os.environ.get('OLLAMA_GOVERNOR_MAX_WAIT', 300)
+    OLLAMA_GOVERNOR_LEASE_TTL: float = os.environ.get('OLLAMA_GOVERNOR_LEASE_TTL', 900)
+
+    # Think Response Cache Envs (time to live in seconds, the semantic tier is kept by every worker process and only
+    # serves the requests up to its maximum temperature, with an embedding similar enough to a cached one)
+    THINK_RESPONSE_CACHE_ENABLED: bool = os.environ.get('THINK_RESPONSE_CACHE_ENABLED', True)
+    THINK_RESPONSE_CACHE_TTL: int = os.environ.get('THINK_RESPONSE_CACHE_TTL', 86400)
+    THINK_RESPONSE_CACHE_MAX_SIZE: int = os.environ.get('THINK_RESPONSE_CACHE_MAX_SIZE', 10000)
+    THINK_RESPONSE_CACHE_SEMANTIC_ENABLED: bool = os.environ.get('THINK_RESPONSE_CACHE_SEMANTIC_ENABLED', False)
+    THINK_RESPONSE_CACHE_SEMANTIC_MODEL_NAME: Optional[str] = os.environ.get('THINK_RESPONSE_CACHE_SEMANTIC_MODEL_NAME', None)
+    THINK_RESPONSE_CACHE_SEMANTIC_MAX_TEMPERATURE: float = os.environ.get('THINK_RESPONSE_CACHE_SEMANTIC_MAX_TEMPERATURE', 0.2)
+    THINK_RESPONSE_CACHE_SEMANTIC_THRESHOLD: float = os.environ.get('THINK_RESPONSE_CACHE_SEMANTIC_THRESHOLD', 0.95)
+    THINK_RESPONSE_CACHE_SEMANTIC_MAX_SIZE: int = os.environ.get('THINK_RESPONSE_CACHE_SEMANTIC_MAX_SIZE', 1024)
+
     CELERY_BROKER_URL: Optional[str] = os.environ.get('CELERY_BROKER_URL', None)
     CELERY_RESULT_BACKEND: Optional[str] = os.environ.get('CELERY_RESULT_BACKEND', None)
 
+    # Redis Envs (falls back to the celery result backend, which is the redis instance the workers already use)
+    REDIS_URL: Optional[str] = os.environ.get('REDIS_URL', os.environ.get('CELERY_RESULT_BACKEND', None))
+    REDIS_MAX_CONNECTIONS: int = os.environ.get('REDIS_MAX_CONNECTIONS', 50)
+
     TASK_CALLBACK_URL: Optional[str] = os.environ.get('TASK_CALLBACK_URL', None)
     TASK_SIGNATURE_KEY: Optional[str] = os.environ.get('TASK_SIGNATURE_KEY', None)
 
+    # Task Callback Envs
+    TASK_CALLBACK_BATCH_SIZE: int = os.environ.get('TASK_CALLBACK_BATCH_SIZE', 50)
+    TASK_CALLBACK_FLUSH_INTERVAL: float = os.environ.get('TASK_CALLBACK_FLUSH_INTERVAL', 0.2)
+    TASK_CALLBACK_TIMEOUT: float = os.environ.get('TASK_CALLBACK_TIMEOUT', 10)
+    TASK_CALLBACK_MAX_RETRIES: int = os.environ.get('TASK_CALLBACK_MAX_RETRIES', 5)
+    # Seconds the response of a callback batch is kept under its idempotency key, beyond the retries of the batch
+    TASK_CALLBACK_IDEMPOTENCY_TTL: int = os.environ.get('TASK_CALLBACK_IDEMPOTENCY_TTL', 3600)
+
+    # Task Persistence Envs (workers write the task updates straight to the database, falling back to the callbacks)
+    TASK_DIRECT_PERSISTENCE_ENABLED: bool = os.environ.get('TASK_DIRECT_PERSISTENCE_ENABLED', False)
+    TASK_DIRECT_PERSISTENCE_POOL_SIZE: int = os.environ.get('TASK_DIRECT_PERSISTENCE_POOL_SIZE', 2)
+    TASK_DIRECT_PERSISTENCE_TIMEOUT: float = os.environ.get('TASK_DIRECT_PERSISTENCE_TIMEOUT', 5)
+
+    # Task Detail Cache Envs (time to live in seconds, the local tier is kept by every API process)
+    TASK_DETAIL_CACHE_ENABLED: bool = os.environ.get('TASK_DETAIL_CACHE_ENABLED', True)
+    TASK_DETAIL_CACHE_TERMINAL_TTL: int = os.environ.get('TASK_DETAIL_CACHE_TERMINAL_TTL', 3600)
+    TASK_DETAIL_CACHE_ACTIVE_TTL: int = os.environ.get('TASK_DETAIL_CACHE_ACTIVE_TTL', 2)
+    TASK_DETAIL_CACHE_LOCAL_MAX_SIZE: int = os.environ.get('TASK_DETAIL_CACHE_LOCAL_MAX_SIZE', 1024)
+    TASK_DETAIL_CACHE_LOCAL_TTL: float = os.environ.get('TASK_DETAIL_CACHE_LOCAL_TTL', 30)
+
+    # Task Events Envs (timeouts in seconds of the requests waiting for a task)
+    TASK_EVENTS_ENABLED: bool = os.environ.get('TASK_EVENTS_ENABLED', True)
+    TASK_WAIT_MAX_TIMEOUT: float = os.environ.get('TASK_WAIT_MAX_TIMEOUT', 60)
+    TASK_EVENTS_STREAM_TIMEOUT: float = os.environ.get('TASK_EVENTS_STREAM_TIMEOUT', 600)
+    TASK_EVENTS_HEARTBEAT_INTERVAL: float = os.environ.get('TASK_EVENTS_HEARTBEAT_INTERVAL', 15)
+
+    # Task Scheduler Envs (tasks scheduled for later are dispatched by the scheduler, polling every interval in seconds)
+    TASK_SCHEDULER_BATCH_SIZE: int = os.environ.get('TASK_SCHEDULER_BATCH_SIZE', 100)
+    TASK_SCHEDULER_POLL_INTERVAL: float = os.environ.get('TASK_SCHEDULER_POLL_INTERVAL', 1)
+
     # OpenTelemetry Envs
     OTEL_EXPORTER_OTLP_ENDPOINT: Optional[str] = os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT", None)
     OTEL_EXPORTER_OTLP_INSECURE: Optional[bool] = os.environ.get("OTEL_EXPORTER_OTLP_INSECURE", None)
@@ -0,0 +1,175 @@
+import enum
+import logging
+from typing import Iterator, NamedTuple
+
+import redis
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+from app.core.redis import get_redis_client
+
+
+logger = logging.getLogger(__name__)
+
+
+WORKER_METRICS_KEY = 'thinker:worker:metrics'
+
+
+class MetricType(enum.Enum):
+    COUNTER = 'counter'
+    GAUGE = 'gauge'
+
+
+class WorkerMetric(NamedTuple):
+    name: str
+    type: MetricType
+    documentation: str
+
+
+THINK_RESPONSE_CACHE_EXACT_HITS = WorkerMetric(
+    name='think_response_cache_exact_hits',
+    type=MetricType.COUNTER,
+    documentation='Number of think tasks answered from the response cache by their exact prompt.'
+)
+
+THINK_RESPONSE_CACHE_SEMANTIC_HITS = WorkerMetric(
+    name='think_response_cache_semantic_hits',
+    type=MetricType.COUNTER,
+    documentation='Number of think tasks answered from the response cache by a near identical prompt.'
+)
+
+THINK_RESPONSE_CACHE_MISSES = WorkerMetric(
+    name='think_response_cache_misses',
+    type=MetricType.COUNTER,
+    documentation='Number of think tasks that were not found in the response cache.'
+)
+
+THINK_OLLAMA_CONCURRENCY_LIMIT = WorkerMetric(
+    name='think_ollama_concurrency_limit',
+    type=MetricType.GAUGE,
+    documentation='Concurrent Ollama generations currently permitted by the adaptive concurrency governor.'
+)
+
+THINK_OLLAMA_IN_FLIGHT = WorkerMetric(
+    name='think_ollama_in_flight',
+    type=MetricType.GAUGE,
+    documentation='Number of Ollama generations in progress across the thinker workers.'
+)
+
+THINK_OLLAMA_QUEUE_DEPTH = WorkerMetric(
+    name='think_ollama_queue_depth',
+    type=MetricType.GAUGE,
+    documentation='Number of think tasks waiting for the concurrency governor to start their generation.'
+)
+
+THINK_OLLAMA_GENERATIONS = WorkerMetric(
+    name='think_ollama_generations',
+    type=MetricType.COUNTER,
+    documentation='Number of Ollama generations that went through the concurrency governor.'
+)
+
+THINK_OLLAMA_WAIT_SECONDS = WorkerMetric(
+    name='think_ollama_wait_seconds',
+    type=MetricType.COUNTER,
+    documentation='Seconds the think tasks spent waiting for the concurrency governor.'
+)
+
+THINK_OLLAMA_OVERLOADED = WorkerMetric(
+    name='think_ollama_overloaded',
+    type=MetricType.COUNTER,
+    documentation='Number of Ollama generations that timed out, or gave up waiting for the concurrency governor.'
+)
+
+THINK_OLLAMA_BACKENDS_AVAILABLE = WorkerMetric(
+    name='think_ollama_backends_available',
+    type=MetricType.GAUGE,
+    documentation='Number of Ollama backends whose circuit is closed and which have the model loaded.'
+)
+
+THINK_OLLAMA_BACKEND_FAILURES = WorkerMetric(
+    name='think_ollama_backend_failures',
+    type=MetricType.COUNTER,
+    documentation='Number of Ollama requests and probes that failed on a backend.'
+)
+
+THINK_OLLAMA_BACKEND_FAILOVERS = WorkerMetric(
+    name='think_ollama_backend_failovers',
+    type=MetricType.COUNTER,
+    documentation='Number of generations sent again to another Ollama backend after failing on one.'
+)
+
+THINK_OLLAMA_BACKEND_CIRCUITS_OPENED = WorkerMetric(
+    name='think_ollama_backend_circuits_opened',
+    type=MetricType.COUNTER,
+    documentation='Number of times the circuit of an Ollama backend was opened.'
+)
+
+WORKER_METRICS = [
+    THINK_RESPONSE_CACHE_EXACT_HITS,
+    THINK_RESPONSE_CACHE_SEMANTIC_HITS,
+    THINK_RESPONSE_CACHE_MISSES,
+    THINK_OLLAMA_CONCURRENCY_LIMIT,
+    THINK_OLLAMA_IN_FLIGHT,
+    THINK_OLLAMA_QUEUE_DEPTH,
+    THINK_OLLAMA_GENERATIONS,
+    THINK_OLLAMA_WAIT_SECONDS,
+    THINK_OLLAMA_OVERLOADED,
+    THINK_OLLAMA_BACKENDS_AVAILABLE,
+    THINK_OLLAMA_BACKEND_FAILURES,
+    THINK_OLLAMA_BACKEND_FAILOVERS,
+    THINK_OLLAMA_BACKEND_CIRCUITS_OPENED,
+]
+
+
+def increment_metric(metric: WorkerMetric, amount: float = 1) -> None:
+    """
+    Increment a worker metric shared by all the thinker workers.
+
+    Metrics are best effort, so a redis failure is logged and never propagated to the calling task.
+
+    Args:
+        - metric (WorkerMetric): The metric to increment.
+        - amount (float): The amount to increment the metric by.
+    """
+    try:
+        get_redis_client().hincrbyfloat(WORKER_METRICS_KEY, metric.name, amount)
+    except redis.RedisError:
+        logger.warning("Failed to increment worker metric %s", metric.name, exc_info=True)
+
+
+def set_metric(metric: WorkerMetric, value: float) -> None:
+    """
+    Set the current value of a worker metric shared by all the thinker workers.
+
+    Args:
+        - metric (WorkerMetric): The metric to set.
+        - value (float): The new value of the metric.
+    """
+    try:
+        get_redis_client().hset(WORKER_METRICS_KEY, metric.name, value)
+    except redis.RedisError:
+        logger.warning("Failed to set worker metric %s", metric.name, exc_info=True)
+
+
+class WorkerMetricsCollector(Collector):
+    """
+    Prometheus collector that exposes the metrics recorded by the celery workers.
+
+    Workers are not scraped directly, so they record their metrics in redis and the API service exposes them
+    alongside its own metrics.
+    """
+
+    def collect(self) -> Iterator[Metric]:
+        try:
+            values = get_redis_client().hgetall(WORKER_METRICS_KEY)
+        except redis.RedisError:
+            logger.warning("Failed to collect worker metrics", exc_info=True)
+            return
+
+        for metric in WORKER_METRICS:
+            metric_family_class = CounterMetricFamily if metric.type is MetricType.COUNTER else GaugeMetricFamily
+            yield metric_family_class(
+                metric.name,
+                metric.documentation,
+                value=float(values.get(metric.name, 0))
+            )
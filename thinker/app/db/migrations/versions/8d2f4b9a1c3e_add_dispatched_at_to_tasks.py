@@ -0,0 +1,36 @@
+"""add dispatched at to tasks
+
+Revision ID: 8d2f4b9a1c3e
+Revises: e419f87d5e9c
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2f4b9a1c3e'
+down_revision: Union[str, None] = 'e419f87d5e9c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tasks', sa.Column('dispatched_at', sa.DateTime(), nullable=True))
+    # The existing tasks were dispatched as they were created
+    op.execute('UPDATE tasks SET dispatched_at = COALESCE(created_at, now())')
+    op.create_index(
+        'ix_tasks_schedule_at_undispatched',
+        'tasks',
+        ['schedule_at'],
+        unique=False,
+        postgresql_where=sa.text('dispatched_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_schedule_at_undispatched', table_name='tasks', postgresql_where=sa.text('dispatched_at IS NULL'))
+    op.drop_column('tasks', 'dispatched_at')
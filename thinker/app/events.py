@@ -0,0 +1,220 @@
+import json
+import asyncio
+import logging
+import contextlib
+from uuid import UUID
+from typing import AsyncIterator, Dict, Optional, Set, Type
+
+import redis
+import pydantic
+from prometheus_client import Gauge
+from shared_utils.schemas.status import TaskStatus
+
+from app.core.conf import settings
+from app.schemas.task import TaskRetrieve
+from app.core.redis import get_async_redis_client, get_redis_client
+
+
+logger = logging.getLogger(__name__)
+
+
+TASK_WAITERS = Gauge(
+    'task_waiters',
+    'Number of requests currently waiting for a task update.'
+)
+
+
+class TaskEvent:
+    """
+    Status transition of a task, along with the updated task when the publisher has it at hand.
+    """
+
+    def __init__(self, task_id: str, status: TaskStatus, task: Optional[pydantic.BaseModel] = None) -> None:
+        """
+        Initialize the event.
+
+        Args:
+            - task_id (str): Unique id of the task.
+            - status (TaskStatus): The new status of the task.
+            - task (pydantic.BaseModel | None): The updated task, None if the subscribers have to read it themselves.
+        """
+        self.task_id = task_id
+        self.status = status
+        self.task = task
+
+    def dumps(self) -> str:
+        """
+        Serialize the event into its pub/sub message.
+
+        Returns:
+            - str: The message.
+        """
+        return json.dumps({
+            'task_id': self.task_id,
+            'status': self.status.value,
+            'task': self.task.model_dump(mode='json') if self.task is not None else None
+        })
+
+    @classmethod
+    def loads(cls, message: str, schema: Type[pydantic.BaseModel]) -> 'TaskEvent':
+        """
+        Deserialize an event from its pub/sub message.
+
+        Args:
+            - message (str): The message.
+            - schema (Type[pydantic.BaseModel]): Schema of the updated task.
+
+        Returns:
+            - TaskEvent: The event.
+        """
+        data = json.loads(message)
+        task = schema.model_validate(data['task']) if data['task'] is not None else None
+        return cls(task_id=data['task_id'], status=TaskStatus(data['status']), task=task)
+
+
+class TaskEventBroker:
+    """
+    Broker of the task status transitions over redis pub/sub, which lets the requests waiting for a task sleep until
+    it is updated instead of polling the database.
+
+    Every API process listens to all the task events through a single pattern subscription, and hands them out to the
+    requests waiting in that process, so the number of waiting requests costs neither redis connections nor database
+    queries.
+    """
+
+    def __init__(
+            self,
+            schema: Type[pydantic.BaseModel],
+            prefix: str = 'task:events',
+            enabled: bool = True
+        ) -> None:
+        """
+        Initialize the broker.
+
+        Args:
+            - schema (Type[pydantic.BaseModel]): Schema of the updated tasks the events come with.
+            - prefix (str): Prefix of the redis channels, which tells the tasks of every service apart.
+            - enabled (bool): Whether the broker is enabled, a disabled broker neither publishes nor delivers events.
+        """
+        self.schema = schema
+        self.prefix = prefix
+        self.enabled = enabled
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+
+    def get_channel(self, task_id: UUID | str) -> str:
+        """
+        Get the redis channel of a task.
+
+        Args:
+            - task_id (UUID | str): Unique id of the task.
+
+        Returns:
+            - str: The redis channel.
+        """
+        return f'{self.prefix}:{task_id}'
+
+    async def publish(self, event: TaskEvent) -> None:
+        """
+        Publish the status transition of a task.
+
+        Args:
+            - event (TaskEvent): The status transition.
+        """
+        if not self.enabled:
+            return
+
+        try:
+            await get_async_redis_client().publish(self.get_channel(event.task_id), event.dumps())
+        except redis.RedisError:
+            logger.warning("Failed to publish the event of task %s", event.task_id, exc_info=True)
+
+    def publish_sync(self, event: TaskEvent) -> None:
+        """
+        Publish the status transition of a task from synchronous code, such as the celery workers.
+
+        Args:
+            - event (TaskEvent): The status transition.
+        """
+        if not self.enabled:
+            return
+
+        try:
+            get_redis_client().publish(self.get_channel(event.task_id), event.dumps())
+        except redis.RedisError:
+            logger.warning("Failed to publish the event of task %s", event.task_id, exc_info=True)
+
+    async def _listen(self, ready: asyncio.Event) -> None:
+        pubsub = get_async_redis_client().pubsub(ignore_subscribe_messages=True)
+
+        try:
+            await pubsub.psubscribe(f'{self.prefix}:*')
+            ready.set()
+
+            channel_prefix_length = len(self.prefix) + 1
+            async for message in pubsub.listen():
+                # Only the events of the tasks waited for in this process are parsed
+                subscribers = self._subscribers.get(message['channel'][channel_prefix_length:])
+                if not subscribers:
+                    continue
+
+                event = TaskEvent.loads(message['data'], schema=self.schema)
+                for queue in subscribers:
+                    queue.put_nowait(event)
+        except redis.RedisError:
+            logger.warning("Lost the subscription to the task events", exc_info=True)
+        finally:
+            # Wake the waiting requests up, a None event tells them the subscription is down
+            ready.set()
+            for subscribers in self._subscribers.values():
+                for queue in subscribers:
+                    queue.put_nowait(None)
+            await pubsub.aclose()
+
+    async def _start(self) -> bool:
+        loop = asyncio.get_running_loop()
+
+        if self._listener is None or self._listener.done() or self._listener.get_loop() is not loop:
+            self._ready = asyncio.Event()
+            self._listener = loop.create_task(self._listen(ready=self._ready))
+
+        await self._ready.wait()
+        return not self._listener.done()
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, task_id: UUID | str) -> AsyncIterator[Optional[asyncio.Queue]]:
+        """
+        Subscribe to the status transitions of a task, within the block.
+
+        Args:
+            - task_id (UUID | str): Unique id of the task.
+
+        Returns:
+            - AsyncIterator[asyncio.Queue | None]: Queue receiving the `TaskEvent` of the task, then None if the
+              subscription goes down, or None instead of the queue if the events are not available, such as when redis
+              is unreachable.
+        """
+        if not self.enabled or not await self._start():
+            yield None
+            return
+
+        queue = asyncio.Queue()
+        subscribers = self._subscribers.setdefault(str(task_id), set())
+        subscribers.add(queue)
+        TASK_WAITERS.inc()
+
+        try:
+            yield queue
+        finally:
+            TASK_WAITERS.dec()
+            subscribers.discard(queue)
+            if not subscribers:
+                self._subscribers.pop(str(task_id), None)
+
+
+task_event_broker = TaskEventBroker(
+    schema=TaskRetrieve,
+    prefix='thinker:task:events',
+    enabled=settings.TASK_EVENTS_ENABLED
+)
@@ -0,0 +1,14 @@
+class InvalidCursor(ValueError):
+    message = "The pagination cursor is invalid."
+
+
+class RequestInProgress(Exception):
+    message = "A request with the same idempotency key is being applied."
+
+
+class OllamaBusy(Exception):
+    ...
+
+
+class OllamaRequestFailed(Exception):
+    ...
@@ -1,13 +1,20 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, Float, Integer, String, DateTime, JSON, Enum, UUID
+from sqlalchemy import Index, text, Column, Float, Integer, String, DateTime, JSON, Enum, UUID
 from shared_utils.db.base import Base
 from shared_utils.schemas.status import TaskStatus
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Keyset pagination of the tasks of a user, and of all the tasks, newest first
+        Index('ix_tasks_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        Index('ix_tasks_created_at_id', 'created_at', 'id'),
+        # Due tasks polled by the scheduler, which only holds the tasks scheduled for later and not dispatched yet
+        Index('ix_tasks_schedule_at_undispatched', 'schedule_at', postgresql_where=text('dispatched_at IS NULL')),
+    )
 
     id = Column(UUID(as_uuid=True), index=True, primary_key=True, default=uuid.uuid4)
     user_id = Column(Integer, index=True)
@@ -17,6 +24,7 @@ class Task(Base):
     temperature = Column(Float, default=0.7, nullable=True)
     max_tokens = Column(Integer, default=250, nullable=True)
     schedule_at = Column(DateTime, default=datetime.now, nullable=True)
+    dispatched_at = Column(DateTime, nullable=True)
 
     status = Column(Enum(TaskStatus), default=TaskStatus.PENDING)
     result_data = Column(JSON, nullable=True)
@@ -1,12 +1,21 @@
-from typing import Sequence
+import contextlib
+from uuid import UUID
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set
 
 from fastapi import Depends
+from pydantic import BaseModel
+from sqlalchemy import JSON, Integer, cast, column, event, func, select, update, values
+from sqlalchemy.orm import ORMExecuteState, load_only
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
 from shared_utils.db.session import get_db
-from shared_utils.exceptions import ObjDoesNotExist
+from shared_utils.exceptions import ObjAlreadyExist, ObjDoesNotExist
+from shared_utils.pagination import Paginator
 from shared_utils.repository.sqlalchemy import SQLAlchemyModelRepository
 
 from app.models.task import Task
+from app.pagination import CursorPaginationQueryParams, CursorPaginationResponse, CursorPaginator
 
 
 class TaskModelRepository(SQLAlchemyModelRepository[Task]):
@@ -30,9 +39,30 @@ class TaskModelRepository(SQLAlchemyModelRepository[Task]):
             - Task: The created task instance.
 
         Raises:
-            - ObjDoesNotExist: If no instance is found with the given ID.
+            - ObjAlreadyExist: If a task with the same id exists.
         """
-        return await super().create(id=id, user_id=user_id, search_task_id=search_task_id, **other_fields)
+        return await self._insert(id=id, user_id=user_id, search_task_id=search_task_id, **other_fields)
+
+    async def _insert(self, **fields) -> Task:
+        # A single `INSERT ... ON CONFLICT DO NOTHING RETURNING` statement, which returns no row on a conflict
+        statement = (
+            insert(Task)
+            .values(**fields)
+            .on_conflict_do_nothing(index_elements=[Task.id])
+            .returning(Task)
+        )
+
+        result = await self.db.execute(statement)
+        task = result.scalar_one_or_none()
+
+        if task is None:
+            raise ObjAlreadyExist
+
+        # Detach the created task, so committing does not expire the values it was returned with
+        self.db.expunge(task)
+        await self.db.commit()
+
+        return task
 
     async def filter_by_user_id(self, user_id: str) -> Sequence[Task]:
         """
@@ -109,6 +139,135 @@ class TaskModelRepository(SQLAlchemyModelRepository[Task]):
         """
         return await self.filter_by(id=id, user_id=user_id, search_task_id=search_task_id)
 
+    @staticmethod
+    def _load_only(columns: Sequence[str]):
+        # The primary key and creation date are always loaded, the cursor of the next page is built from them
+        return load_only(*{getattr(Task, name) for name in (*columns, 'id', 'created_at')})
+
+    @contextlib.asynccontextmanager
+    async def _defer_other_columns(self, columns: Optional[Sequence[str]]) -> AsyncIterator[None]:
+        # Loads only the given columns of the tasks selected within the block, whichever query selects them
+        if columns is None:
+            yield
+            return
+
+        def add_load_only(orm_execute_state: ORMExecuteState) -> None:
+            statement = orm_execute_state.statement
+            if orm_execute_state.is_select and any(
+                description['entity'] is Task for description in statement.column_descriptions
+            ):
+                orm_execute_state.statement = statement.options(self._load_only(columns))
+
+        event.listen(self.db.sync_session, 'do_orm_execute', add_load_only)
+        try:
+            yield
+        finally:
+            event.remove(self.db.sync_session, 'do_orm_execute', add_load_only)
+
+    async def get_paginated(
+            self,
+            paginator: Paginator,
+            query_params: BaseModel,
+            response_schema: type[BaseModel],
+            columns: Optional[Sequence[str]] = None,
+            **filters
+        ):
+        """
+        Get a page of tasks, numbered by page.
+
+        Args:
+            - paginator (Paginator): A paginator class applying the pagination logic to the query and response.
+            - query_params (BaseModel): A Pydantic model containing query parameters for filtering.
+            - response_schema (type[BaseModel]): A Pydantic model class that defines the structure of the response items.
+            - columns (Sequence[str] | None): Names of the only columns to load, such as the columns of a task
+              summary, all the columns are loaded if None.
+            - **filters: Fields to filter the tasks by.
+
+        Returns:
+            - The page of tasks, in the format of the paginator.
+        """
+        # The paginator builds its own query, so the other columns are deferred on the queries it executes
+        async with self._defer_other_columns(columns=columns):
+            return await super().get_paginated(
+                paginator=paginator,
+                query_params=query_params,
+                response_schema=response_schema,
+                **filters
+            )
+
+    async def get_cursor_paginated(
+            self,
+            query_params: CursorPaginationQueryParams,
+            response_schema: type[BaseModel],
+            columns: Optional[Sequence[str]] = None,
+            **filters
+        ) -> CursorPaginationResponse:
+        """
+        Get a page of tasks, newest first, seeking past the task of the cursor.
+
+        Args:
+            - query_params (CursorPaginationQueryParams): Cursor and size of the page.
+            - response_schema (type[BaseModel]): A Pydantic model class that defines the structure of the response items.
+            - columns (Sequence[str] | None): Names of the only columns to load, such as the columns of a task
+              summary, all the columns are loaded if None.
+            - **filters: Fields to filter the tasks by.
+
+        Returns:
+            - CursorPaginationResponse: The page of tasks, with the cursor of the next page.
+
+        Raises:
+            - InvalidCursor: If the cursor is invalid.
+        """
+        statement = select(Task).filter_by(**filters)
+        if columns is not None:
+            statement = statement.options(self._load_only(columns))
+
+        return await CursorPaginator(created_at=Task.created_at, id=Task.id).paginate(
+            db=self.db,
+            statement=statement,
+            query_params=query_params,
+            response_schema=response_schema
+        )
+
+    async def stream(
+            self,
+            created_after: Optional[datetime] = None,
+            created_before: Optional[datetime] = None,
+            batch_size: int = 1000,
+            **filters
+        ) -> AsyncIterator[Task]:
+        """
+        Stream tasks, oldest first, through a server side cursor, which fetches them in batches as they are consumed.
+
+        The session is closed once the stream ends, since streamed responses outlive the request dependencies that
+        would close it otherwise.
+
+        Args:
+            - created_after (datetime | None): Only stream tasks created at or after this date.
+            - created_before (datetime | None): Only stream tasks created before this date.
+            - batch_size (int): Number of tasks fetched at a time.
+            - **filters: Fields to filter the tasks by.
+
+        Returns:
+            - AsyncIterator[Task]: The tasks.
+        """
+        statement = (
+            select(Task)
+            .filter_by(**filters)
+            .order_by(Task.created_at, Task.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if created_after is not None:
+            statement = statement.where(Task.created_at >= created_after)
+        if created_before is not None:
+            statement = statement.where(Task.created_at < created_before)
+
+        try:
+            async for task in await self.db.stream_scalars(statement):
+                yield task
+        finally:
+            await self.close()
+
     async def update(self, id: str, **kwargs) -> Task:
         """
         Update a task instance.
@@ -139,9 +298,136 @@ class TaskModelRepository(SQLAlchemyModelRepository[Task]):
         Raises:
             - ObjDoesNotExist: If no instance is found with the given ID.
         """
-        task = await self.get_by_id(id=id)
-        increment_count = task.retry_count + increment_by
-        return await self.update(id=id, retry_count=increment_count)
+        return await self.update_and_increment_retry_count(id=id, increment_by=increment_by)
+
+    async def update_and_increment_retry_count(self, id: str, increment_by: int = 0, **kwargs) -> Task:
+        """
+        Update a task instance and increment its retry count with a single `UPDATE ... RETURNING` statement.
+
+        The retry count is incremented in SQL, so concurrent increments of the same task are never lost.
+
+        Args:
+            - id (str): Task id to update.
+            - increment_by (int): The amount to increment the retry count by.
+            - **kwargs: Fields to update.
+
+        Returns:
+            - Task: The updated task instance.
+
+        Raises:
+            - ObjDoesNotExist: If no instance is found with the given ID.
+        """
+        statement = (
+            update(Task)
+            .where(Task.id == id)
+            .values(retry_count=func.coalesce(Task.retry_count, 0) + increment_by, **kwargs)
+            .returning(Task)
+            .execution_options(populate_existing=True)
+        )
+
+        result = await self.db.execute(statement)
+        task = result.scalar_one_or_none()
+
+        if task is None:
+            raise ObjDoesNotExist
+
+        # Detach the returned task, so committing does not expire the values it was returned with
+        self.db.expunge(task)
+        await self.db.commit()
+
+        return task
+
+    async def bulk_update(self, updates: List[Dict[str, Any]]) -> Set[UUID]:
+        """
+        Apply the updates of many tasks with a single `UPDATE ... FROM (VALUES ...)` statement.
+
+        Fields missing from an update keep their current value, and the retry count increments are added in SQL, so
+        concurrent updates of the same task never lose an increment.
+
+        Args:
+            - updates (List[Dict]): The update of every task, holding its `id`, its `increment_retry_count` and the
+              fields to set among `status`, `result_data` and `error`.
+
+        Returns:
+            - Set[UUID]: The ids of the updated tasks, tasks that do not exist are left out.
+        """
+        if not updates:
+            return set()
+
+        updates_values = values(
+            column('id', Task.id.type),
+            column('status', Task.status.type),
+            column('result_data', JSON(none_as_null=True)),
+            column('error', JSON(none_as_null=True)),
+            column('increment_retry_count', Integer),
+            name='updates'
+        ).data([
+            (
+                task_update['id'],
+                task_update.get('status'),
+                task_update.get('result_data'),
+                task_update.get('error'),
+                task_update.get('increment_retry_count', 0)
+            )
+            for task_update in updates
+        ])
+
+        statement = (
+            update(Task)
+            .where(Task.id == updates_values.c.id)
+            .values(
+                status=func.coalesce(cast(updates_values.c.status, Task.status.type), Task.status),
+                result_data=func.coalesce(cast(updates_values.c.result_data, JSON), Task.result_data),
+                error=func.coalesce(cast(updates_values.c.error, JSON), Task.error),
+                retry_count=func.coalesce(Task.retry_count, 0) + cast(updates_values.c.increment_retry_count, Integer)
+            )
+            .returning(Task.id)
+            .execution_options(synchronize_session=False)
+        )
+
+        result = await self.db.execute(statement)
+        await self.db.commit()
+
+        return set(result.scalars().all())
+
+    async def claim_due(self, now: datetime, limit: int) -> Sequence[Task]:
+        """
+        Claim the tasks that are due and not dispatched yet, earliest first, marking them as dispatched.
+
+        The claimed tasks stay locked until the session commits, once they are dispatched, or rolls back, which leaves
+        them to be claimed again. Tasks locked by other sessions are skipped, so concurrent claims never overlap.
+
+        Args:
+            - now (datetime): The current time, which the tasks are due by and marked as dispatched at.
+            - limit (int): Maximum number of tasks to claim.
+
+        Returns:
+            - Sequence[Task]: The claimed tasks.
+        """
+        due_tasks = (
+            select(Task.id)
+            .where(Task.dispatched_at.is_(None), Task.schedule_at <= now)
+            .order_by(Task.schedule_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+
+        statement = (
+            update(Task)
+            .where(Task.id.in_(due_tasks.scalar_subquery()))
+            .values(dispatched_at=now)
+            .returning(Task)
+            .execution_options(synchronize_session=False)
+        )
+
+        result = await self.db.execute(statement)
+        return sorted(result.scalars().all(), key=lambda task: task.schedule_at)
+
+    async def close(self) -> None:
+        """
+        Close the session, which returns its connection to the pool, the session remains usable afterwards.
+        """
+        await self.db.close()
 
     async def delete(self, id: str) -> None:
         """
@@ -0,0 +1,153 @@
+"""
+Scheduler dispatching the tasks scheduled for later to the workers once they are due.
+
+Run from the thinker service directory:
+
+    python -m app.scheduler
+"""
+import signal
+import asyncio
+import logging
+import contextlib
+from datetime import datetime
+from typing import Callable, Optional
+
+from kombu.exceptions import OperationalError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.conf import settings
+from app.schemas.task import TaskCreate
+from app.repositories.task import TaskModelRepository
+from app.celery.tasks import think_task
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_due(schedule_at: Optional[datetime]) -> bool:
+    """
+    Check whether a task scheduled at the given time is due.
+
+    Args:
+        - schedule_at (datetime | None): Time the task is scheduled at, None if it is not scheduled.
+
+    Returns:
+        - bool: True if the task is due, False if it is scheduled for later.
+    """
+    return schedule_at is None or schedule_at <= datetime.now()
+
+
+def dispatch_task(task_id: str, task: TaskCreate) -> None:
+    """
+    Send a task to the workers.
+
+    Args:
+        - task_id (str): Unique id of the task.
+        - task (TaskCreate): The task.
+    """
+    think_task.apply_async(
+        kwargs={
+            "question": task.question,
+            "context": task.context,
+            "temperature": task.temperature,
+            "max_tokens": task.max_tokens
+        },
+        task_id=task_id
+    )
+
+
+class TaskScheduler:
+    """
+    Scheduler dispatching the tasks scheduled for later to the workers once they are due.
+
+    Scheduled tasks wait in the database rather than in the workers, which would hold every task sent with an `eta`
+    in memory until it is due. The scheduler polls the index of the tasks waiting for dispatch, and claims the due
+    ones in batches with `FOR UPDATE SKIP LOCKED`, so schedulers can run side by side. A batch is marked as dispatched
+    in the transaction that claims it, which is committed once the batch is sent, so a restarted scheduler carries on
+    from the first task it had not sent, and at worst sends the batch it was stopped in again.
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker,
+            dispatch: Callable[[str, TaskCreate], None] = dispatch_task,
+            batch_size: int = 100,
+            poll_interval: float = 1
+        ) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            - session_maker (async_sessionmaker): Session maker of the task service database.
+            - dispatch (Callable[[str, TaskCreate], None]): Function sending a task to the workers.
+            - batch_size (int): Maximum number of tasks dispatched per transaction.
+            - poll_interval (float): Seconds to wait for tasks to become due, once no due task is left.
+        """
+        self.session_maker = session_maker
+        self.dispatch = dispatch
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+    async def dispatch_due(self) -> int:
+        """
+        Dispatch a batch of the due tasks.
+
+        Returns:
+            - int: Number of dispatched tasks.
+        """
+        async with self.session_maker() as db:
+            tasks = await TaskModelRepository(db=db).claim_due(now=datetime.now(), limit=self.batch_size)
+
+            for task in tasks:
+                self.dispatch(str(task.id), TaskCreate.model_validate(task))
+
+            await db.commit()
+
+        return len(tasks)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """
+        Dispatch the due tasks until stopped.
+
+        Args:
+            - stop (asyncio.Event): Event stopping the scheduler once set.
+        """
+        while not stop.is_set():
+            try:
+                dispatched = await self.dispatch_due()
+            except (SQLAlchemyError, OperationalError, OSError):
+                logger.warning("Failed to dispatch the due tasks", exc_info=True)
+                dispatched = 0
+            else:
+                if dispatched:
+                    logger.info("Dispatched %s due tasks", dispatched)
+
+            # A full batch may leave more due tasks behind, which are dispatched right away
+            if dispatched < self.batch_size:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+
+
+async def main() -> None:
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URL, pool_size=1, max_overflow=0, pool_pre_ping=True)
+    scheduler = TaskScheduler(
+        session_maker=async_sessionmaker(engine, expire_on_commit=False),
+        batch_size=settings.TASK_SCHEDULER_BATCH_SIZE,
+        poll_interval=settings.TASK_SCHEDULER_POLL_INTERVAL
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop.set)
+
+    try:
+        await scheduler.run(stop=stop)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
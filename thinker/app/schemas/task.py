@@ -1,9 +1,13 @@
+import functools
 from uuid import UUID
-from typing import Optional
+from typing import Optional, List, FrozenSet
 from datetime import datetime
 
 import pydantic
 from shared_utils.schemas.status import TaskStatus
+from shared_utils.pagination import PageNumberPaginationQueryParams
+
+from app.pagination import CursorPaginationQueryParams
 
 
 class TaskCreate(pydantic.BaseModel):
@@ -34,6 +38,39 @@ class TaskCreate(pydantic.BaseModel):
     )
     schedule_at: Optional[datetime] = pydantic.Field(default_factory=datetime.now)
 
+    @pydantic.field_validator("schedule_at")
+    def validate_schedule_at(cls, v):
+        # Dates are stored in the local time of the service, without their time zone
+        if v is not None and v.tzinfo is not None:
+            return v.astimezone().replace(tzinfo=None)
+        return v
+
+    class Config:
+        from_attributes=True
+
+
+class ThinkMetrics(pydantic.BaseModel):
+    time_to_first_token: Optional[float] = pydantic.Field(
+        None,
+        description="Seconds from sending the request to receiving the first token, only measured when streaming"
+    )
+    tokens_per_second: Optional[float] = pydantic.Field(
+        None,
+        description="Output tokens generated per second"
+    )
+    eval_count: Optional[int] = pydantic.Field(
+        None,
+        description="Number of output tokens"
+    )
+    total_duration: Optional[float] = pydantic.Field(
+        None,
+        description="Seconds Ollama took to load the model, read the prompt and generate the response"
+    )
+    cache: Optional[str] = pydantic.Field(
+        None,
+        description="Tier of the response cache the answer was served from, `exact` or `semantic`, None if generated"
+    )
+
     class Config:
         from_attributes=True
 
@@ -41,6 +78,7 @@ class TaskCreate(pydantic.BaseModel):
 class ThinkResponse(pydantic.BaseModel):
     answer: str
     thinking: str
+    metrics: Optional[ThinkMetrics] = None
 
     class Config:
         from_attributes=True
@@ -68,6 +106,8 @@ class TaskRetrieve(TaskCreate):
 
     class Config:
         from_attributes=True
+        # Cached tasks are read back from their serialized form, which is keyed by the field names
+        populate_by_name=True
 
 
 class TaskUpdate(pydantic.BaseModel):
@@ -100,12 +140,174 @@ class TaskUpdate(pydantic.BaseModel):
         from_attributes=True
 
 
+class TaskSummary(pydantic.BaseModel):
+    """
+    Task without its answer and error, for listing many tasks at once.
+    """
+    task_id: UUID = pydantic.Field(alias="id", serialization_alias="task_id")
+    user_id: int
+    search_task_id: Optional[str] = None
+    question: str
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    schedule_at: Optional[datetime] = None
+    status: TaskStatus
+    retry_count: Optional[int] = 0
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes=True
+
+
+class TaskListQueryParams(pydantic.BaseModel):
+    include_results: bool = pydantic.Field(
+        default=True,
+        description="Whether to return the full tasks with their results, or only their summaries."
+    )
+    fields: Optional[str] = pydantic.Field(
+        default=None,
+        description="Comma separated summary fields to return, such as 'status,created_at', which implies summaries."
+    )
+
+    @pydantic.field_validator("fields")
+    def validate_fields(cls, v):
+        if v is None:
+            return v
+
+        unknown_fields = split_fields(v) - TaskSummary.model_fields.keys()
+        if unknown_fields:
+            raise ValueError(f"Unknown task summary fields: {', '.join(sorted(unknown_fields))}.")
+
+        return v
+
+    def get_summary_schema(self) -> Optional[type[pydantic.BaseModel]]:
+        """
+        Get the schema of the requested task summaries.
+
+        Returns:
+            - type[BaseModel] | None: The summary schema, restricted to the requested fields, or None if the full
+              tasks are requested.
+        """
+        if self.fields is None:
+            return None if self.include_results else TaskSummary
+
+        return get_task_summary_schema(fields=split_fields(self.fields))
+
+
+class TaskPageListQueryParams(TaskListQueryParams, PageNumberPaginationQueryParams):
+    ...
+
+
+class TaskCursorListQueryParams(TaskListQueryParams, CursorPaginationQueryParams):
+    ...
+
+
+class TaskExportQueryParams(pydantic.BaseModel):
+    status: Optional[TaskStatus] = pydantic.Field(
+        default=None,
+        description="Only export the tasks in this status."
+    )
+    created_after: Optional[datetime] = pydantic.Field(
+        default=None,
+        description="Only export the tasks created at or after this date."
+    )
+    created_before: Optional[datetime] = pydantic.Field(
+        default=None,
+        description="Only export the tasks created before this date."
+    )
+    gzip: bool = pydantic.Field(
+        default=False,
+        description="Whether to compress the export with gzip."
+    )
+
+
+def split_fields(fields: str) -> FrozenSet[str]:
+    """
+    Split comma separated field names.
+
+    Args:
+        - fields (str): Comma separated field names, such as 'status,created_at'.
+
+    Returns:
+        - FrozenSet[str]: The field names.
+    """
+    return frozenset(filter(None, map(str.strip, fields.split(','))))
+
+
+@functools.lru_cache(maxsize=128)
+def get_task_summary_schema(fields: FrozenSet[str]) -> type[pydantic.BaseModel]:
+    """
+    Build a task summary schema restricted to the given fields, the task id is always kept.
+
+    Args:
+        - fields (FrozenSet[str]): Names of the `TaskSummary` fields to keep.
+
+    Returns:
+        - type[BaseModel]: The restricted summary schema.
+    """
+    return pydantic.create_model(
+        'TaskSummary',
+        __config__=pydantic.ConfigDict(from_attributes=True),
+        **{
+            name: (field.annotation, field)
+            for name, field in TaskSummary.model_fields.items()
+            if name in fields or name == 'task_id'
+        }
+    )
+
+
+def get_summary_columns(summary_schema: type[pydantic.BaseModel]) -> List[str]:
+    """
+    Get the task columns a summary schema is read from.
+
+    Args:
+        - summary_schema (type[BaseModel]): `TaskSummary` or one of its restricted schemas.
+
+    Returns:
+        - List[str]: Names of the task columns.
+    """
+    return [field.alias or name for name, field in summary_schema.model_fields.items()]
+
+
 class ThinkTaskUpdate(pydantic.BaseModel):
     status: Optional[TaskStatus] = None
     result_data: Optional[ThinkResponse] = None
     error: Optional[ThinkError] = None
-    increment_retry_count: Optional[bool] = False
+    increment_retry_count: Optional[int] = pydantic.Field(
+        default=0,
+        ge=0,
+        description="Amount to increment the retry count by, coalesced callbacks add up their increments."
+    )
     update_at: Optional[datetime] = pydantic.Field(default_factory=datetime.now)
 
     class Config:
         from_attributes=True
+
+
+class ThinkTaskBulkUpdateItem(ThinkTaskUpdate):
+    task_id: UUID
+
+
+class ThinkTaskBulkUpdate(pydantic.BaseModel):
+    items: List[ThinkTaskBulkUpdateItem] = pydantic.Field(max_length=500)
+
+    class Config:
+        from_attributes=True
+
+
+class TaskCallbackResult(pydantic.BaseModel):
+    task_id: UUID
+    updated: bool = pydantic.Field(
+        description="Whether the callback was applied, it is not when the task does not exist."
+    )
+
+    class Config:
+        from_attributes=True
+
+
+class TaskBulkCallbackResponse(pydantic.BaseModel):
+    results: List[TaskCallbackResult]
+
+    class Config:
+        from_attributes=True
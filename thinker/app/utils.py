@@ -1,5 +1,5 @@
 import re
-from typing import Tuple
+from typing import Any, Dict, Tuple
 
 
 def split_think_content(text: str) -> Tuple[str, str]:
@@ -36,3 +36,82 @@ def split_think_content(text: str) -> Tuple[str, str]:
             remaining_content = match[1]
 
     return think_content, remaining_content
+
+
+def is_model_loaded(tags: Dict[str, Any], model_name: str) -> bool:
+    """
+    Check whether a model is available on Ollama, from the response of its `/tags` endpoint.
+
+    Args:
+        - tags (Dict[str, Any]): The response of the `/tags` endpoint.
+        - model_name (str): Name of the model.
+
+    Returns:
+        - bool: True if the model is available.
+    """
+    return any(model["name"] == model_name for model in tags.get("models", []))
+
+
+class ThinkStreamSplitter:
+    """
+    Splits a streamed text into the content inside the <think> tags and the remaining content, as the text arrives.
+
+    The tags may be split across the chunks of the stream, so the end of a chunk that may start a tag is held back
+    until the following chunk tells whether it does.
+    """
+    THINK_START = '<think>'
+    THINK_END = '</think>'
+
+    def __init__(self) -> None:
+        self.thinking = ''
+        self.answer = ''
+        self._in_think = False
+        self._held = ''
+
+    def feed(self, chunk: str) -> None:
+        """
+        Split a chunk of the text.
+
+        Args:
+            - chunk (str): The chunk, following the chunks fed so far.
+        """
+        text = self._held + chunk
+        self._held = ''
+
+        while text:
+            tag = self.THINK_END if self._in_think else self.THINK_START
+            index = text.find(tag)
+
+            if index != -1:
+                self._append(text[:index])
+                self._in_think = not self._in_think
+                text = text[index + len(tag):]
+                continue
+
+            # Hold back the end of the text that may be the start of the tag
+            for size in range(min(len(tag) - 1, len(text)), 0, -1):
+                if tag.startswith(text[-size:]):
+                    self._held = text[-size:]
+                    text = text[:-size]
+                    break
+
+            self._append(text)
+            break
+
+    def _append(self, text: str) -> None:
+        if self._in_think:
+            self.thinking += text
+        else:
+            self.answer += text
+
+    def close(self) -> Tuple[str, str]:
+        """
+        Split the end of the text held back, once the stream is over.
+
+        Returns:
+            - Tuple[str, str]: The content inside the <think> tags, and the remaining content, stripped of the
+              surrounding whitespace.
+        """
+        self._append(self._held)
+        self._held = ''
+        return self.thinking, self.answer.strip()
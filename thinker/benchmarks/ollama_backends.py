@@ -0,0 +1,160 @@
+"""
+Benchmark of the think tasks of many worker threads spread over several Ollama backends at random, against routed by
+the backend pool to the least loaded healthy backend, failing over to the next one.
+
+The requests go to fake Ollama servers started in process, each generating a fixed number of requests in parallel
+and queuing the others, as Ollama does: a fast one, a slow one, one failing every request and one without the model.
+Tasks whose generation fails are retried. The pool uses the redis instance of `REDIS_URL`.
+
+Run from the thinker service directory:
+
+    python -m benchmarks.ollama_backends
+"""
+import json
+import time
+import random
+import socket
+import contextlib
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from app.exceptions import OllamaRequestFailed
+from app.celery.ollama import OllamaClient
+from app.celery.backends import OllamaBackendPool, build_backends
+from app.celery.tasks import build_ollama_request, parse_ollama_response
+
+
+MODEL = 'benchmark'
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self) -> None:
+        super().setup()
+        # As Ollama does, otherwise the headers and the body written apart wait for the delayed acknowledgement
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self) -> None:
+        models = [{'name': MODEL}] if self.server.has_model else [{'name': 'other'}]
+        self.reply(200, {'models': models})
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests += 1
+
+        if self.server.failing:
+            self.reply(500, {'error': 'failed'})
+            return
+        if not self.server.has_model:
+            self.reply(404, {'error': f'model "{MODEL}" not found'})
+            return
+
+        with self.server.slots:
+            time.sleep(self.server.delay)
+        self.reply(200, {'model': MODEL, 'response': '<think>Thought.</think>Answer.', 'done': True})
+
+    def reply(self, status: int, body: dict) -> None:
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args) -> None:
+        ...
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """
+    Fake Ollama server, generating a fixed number of requests in parallel.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, parallel: int, delay: float, failing: bool = False, has_model: bool = True) -> None:
+        super().__init__(('127.0.0.1', 0), FakeOllamaHandler)
+        self.slots = threading.Semaphore(parallel)
+        self.delay = delay
+        self.failing = failing
+        self.has_model = has_model
+        self.requests = 0
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/api'
+
+
+def measure(servers: dict, pool: OllamaBackendPool, routed: bool, tasks_count: int, workers: int) -> tuple:
+    ollama_client = OllamaClient(base_url=pool.backends[0].url, max_connections=workers * 2)
+    payload = build_ollama_request(question='What is the answer?')
+    payload['model'] = MODEL
+    failures = []
+
+    for server in servers.values():
+        server.requests = 0
+
+    def run_task(_):
+        while True:
+            backends = pool.rank(model=MODEL) if routed else [random.choice(pool.backends)]
+            for backend in backends:
+                try:
+                    with pool.track(backend) if routed else contextlib.nullcontext():
+                        return parse_ollama_response(ollama_client.generate(payload=payload, base_url=backend.url))
+                except (httpx.HTTPError, OllamaRequestFailed):
+                    failures.append(1)
+            # Every backend failed, the task is retried
+            time.sleep(0.05)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(run_task, range(tasks_count)))
+    seconds = time.perf_counter() - started
+
+    ollama_client.close()
+    return tasks_count / seconds, len(failures), Counter({name: server.requests for name, server in servers.items()})
+
+
+def main(tasks_count: int = 200, workers: int = 16, parallel: int = 4, delay: float = 0.1) -> None:
+    servers = {
+        'fast': FakeOllamaServer(parallel=parallel, delay=delay),
+        'slow': FakeOllamaServer(parallel=parallel, delay=delay * 3),
+        'failing': FakeOllamaServer(parallel=parallel, delay=delay, failing=True),
+        'no model': FakeOllamaServer(parallel=parallel, delay=delay, has_model=False),
+    }
+    for server in servers.values():
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"{tasks_count} tasks on {workers} workers, backends generating {parallel} in parallel, "
+          f"{delay * 1000:.0f} and {delay * 3000:.0f} ms/generation, one failing, one without the model")
+    print(f"{'routing':<9}{'tasks/s':>9}{'failures':>10}" + ''.join(f'{name:>10}' for name in servers))
+
+    try:
+        for name, routed in (('random', False), ('pool', True)):
+            pool = OllamaBackendPool(
+                backends=build_backends(urls=','.join(server.url for server in servers.values())),
+                client=OllamaClient(base_url=servers['fast'].url),
+                prefix=f'benchmark:backend:{time.time_ns()}'
+            )
+            throughput, failures, requests = measure(
+                servers=servers,
+                pool=pool,
+                routed=routed,
+                tasks_count=tasks_count,
+                workers=workers
+            )
+            pool.client.close()
+            print(f"{name:<9}{throughput:>9.2f}{failures:>10}" + ''.join(f'{requests[server]:>10}' for server in servers))
+    finally:
+        for server in servers.values():
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    main()
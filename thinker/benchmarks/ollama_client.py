@@ -0,0 +1,123 @@
+"""
+Benchmark of the Ollama requests of the think task, sent with a new client on a new event loop per task against the
+client kept alive by the worker process.
+
+The requests go to a fake Ollama server started in process, which answers every generation after a short delay and
+counts the connections it accepts, so the connection and event loop setup dominate.
+
+Run from the thinker service directory:
+
+    python -m benchmarks.ollama_client
+"""
+import json
+import time
+import socket
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from app.celery.ollama import OllamaClient
+from app.celery.tasks import build_ollama_request, parse_ollama_response
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self) -> None:
+        super().setup()
+        # As Ollama does, otherwise the headers and the body written apart wait for the delayed acknowledgement
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(self.server.delay)
+
+        content = json.dumps({
+            'model': 'benchmark',
+            'response': '<think>The question is simple.</think>It is answered.',
+            'done': True
+        }).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args) -> None:
+        ...
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """
+    Fake Ollama server, counting the connections it accepts.
+    """
+    daemon_threads = True
+
+    def __init__(self, delay: float) -> None:
+        super().__init__(('127.0.0.1', 0), FakeOllamaHandler)
+        self.delay = delay
+        self.connections = 0
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/api'
+
+    def process_request(self, request, client_address) -> None:
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+def build_per_task_generate(url: str):
+    # As the think task sent its request before the pooled client, with a new client on a new event loop
+    def generate(payload):
+        async def post():
+            async with httpx.AsyncClient(timeout=None) as client:
+                return await client.post(f'{url}/generate', json=payload)
+
+        return asyncio.run(post())
+
+    return generate
+
+
+def measure(server: FakeOllamaServer, generate, tasks_count: int, concurrency: int) -> float:
+    payload = build_ollama_request(question='What is the answer?', context='Some context.')
+
+    def run_task(_):
+        assert parse_ollama_response(generate(payload))['answer'] == 'It is answered.'
+
+    server.connections = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run_task, range(tasks_count)))
+
+    return (time.perf_counter() - started) / tasks_count
+
+
+def main(tasks_count: int = 500, delay: float = 0.002) -> None:
+    server = FakeOllamaServer(delay=delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"{'client':<12}{'concurrency':>13}{'tasks':>8}{'ms/task':>10}{'connections':>13}")
+
+    try:
+        for concurrency in (1, 8):
+            ollama_client = OllamaClient(base_url=server.url, max_connections=concurrency)
+            cases = (
+                ('per task', build_per_task_generate(server.url)),
+                ('pooled', ollama_client.generate),
+            )
+            for name, generate in cases:
+                seconds = measure(server=server, generate=generate, tasks_count=tasks_count, concurrency=concurrency)
+                print(f"{name:<12}{concurrency:>13}{tasks_count:>8}{seconds * 1000:>10.2f}{server.connections:>13}")
+            ollama_client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
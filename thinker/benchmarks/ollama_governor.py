@@ -0,0 +1,142 @@
+"""
+Benchmark of the think tasks of many worker threads sending their generations to Ollama as they come, against
+through the concurrency governor.
+
+The requests go to a fake Ollama server started in process, which generates a fixed number of requests in parallel
+and queues the others, as Ollama does, and keeps generating for the requests that timed out. Tasks whose request
+times out are retried. The governor uses the redis instance of `REDIS_URL`.
+
+Run from the thinker service directory:
+
+    python -m benchmarks.ollama_governor
+"""
+import json
+import time
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from app.core.redis import get_redis_client
+from app.celery.ollama import OllamaClient
+from app.celery.governor import ConcurrencyGovernor
+from app.celery.tasks import build_ollama_request, get_first_token_latency, parse_ollama_response
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self) -> None:
+        super().setup()
+        # As Ollama does, otherwise the headers and the body written apart wait for the delayed acknowledgement
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers['Content-Length']))
+        arrived = time.monotonic()
+
+        with self.server.slots:
+            self.server.queued.append(time.monotonic() - arrived)
+            generation = self.server.tokens * self.server.token_delay
+            time.sleep(generation)
+
+        content = json.dumps({
+            'model': 'benchmark',
+            'response': '<think>Thought.</think>Answer.',
+            'done': True,
+            'eval_count': self.server.tokens,
+            'eval_duration': int(generation * 1e9),
+            'total_duration': int((time.monotonic() - arrived) * 1e9)
+        }).encode()
+
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        except OSError:
+            # The request timed out, its generation was wasted
+            ...
+
+    def log_message(self, format, *args) -> None:
+        ...
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """
+    Fake Ollama server, generating a fixed number of requests in parallel.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, parallel: int, tokens: int, token_delay: float) -> None:
+        super().__init__(('127.0.0.1', 0), FakeOllamaHandler)
+        self.slots = threading.Semaphore(parallel)
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.queued = []
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/api'
+
+
+def measure(server: FakeOllamaServer, governor: ConcurrencyGovernor, tasks_count: int, workers: int) -> tuple:
+    ollama_client = OllamaClient(base_url=server.url, timeout=1.5, max_connections=workers)
+    payload = build_ollama_request(question='What is the answer?')
+    timeouts = []
+    server.queued = []
+
+    def run_task(_):
+        while True:
+            try:
+                with governor.slot() as slot:
+                    started = time.monotonic()
+                    result = parse_ollama_response(ollama_client.generate(payload=payload))
+                    slot.observe(get_first_token_latency(result['metrics'], elapsed=time.monotonic() - started))
+                return
+            except httpx.TimeoutException:
+                timeouts.append(1)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(run_task, range(tasks_count)))
+    seconds = time.perf_counter() - started
+
+    ollama_client.close()
+    queued = sorted(server.queued)
+    return tasks_count / seconds, len(timeouts), queued[len(queued) // 2], queued[int(len(queued) * 0.95)]
+
+
+def main(tasks_count: int = 160, workers: int = 24, parallel: int = 4, tokens: int = 20, token_delay: float = 0.01):
+    server = FakeOllamaServer(parallel=parallel, tokens=tokens, token_delay=token_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"{tasks_count} tasks on {workers} workers, Ollama generating {parallel} in parallel, "
+          f"{tokens * token_delay * 1000:.0f} ms/generation, 1.5s timeout")
+    print(f"{'governor':<10}{'tasks/s':>9}{'timeouts':>10}{'queued p50 (ms)':>17}{'queued p95 (ms)':>17}{'limit':>7}")
+
+    try:
+        for name, enabled in (('off', False), ('on', True)):
+            governor = ConcurrencyGovernor(key=f'benchmark:governor:{time.time_ns()}', poll_interval=0.02, enabled=enabled)
+            throughput, timeouts, p50, p95 = measure(
+                server=server,
+                governor=governor,
+                tasks_count=tasks_count,
+                workers=workers
+            )
+            limit = get_redis_client().hget(governor.keys[3], 'limit') if enabled else None
+            print(
+                f"{name:<10}{throughput:>9.2f}{timeouts:>10}{p50 * 1000:>17.0f}{p95 * 1000:>17.0f}"
+                f"{float(limit) if limit else float('nan'):>7.1f}"
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark of the time users wait before seeing the answer of a think task, with the response of Ollama generated
+whole against streamed, in which case the partial answer is published as the tokens arrive.
+
+The requests go to a fake Ollama server started in process, which generates a fixed number of tokens at a fixed pace,
+with the <think> tags split across the tokens.
+
+Run from the thinker service directory:
+
+    python -m benchmarks.ollama_streaming
+"""
+import json
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.celery.ollama import OllamaClient
+from app.celery.tasks import build_ollama_request, parse_ollama_response, stream_ollama_response
+
+
+TEXT = '<think>' + ' '.join(f'thought{index}' for index in range(40)) + '</think>\n\n' + ' '.join(
+    f'word{index}' for index in range(80)
+)
+
+
+def get_tokens(size: int = 3) -> list:
+    return [TEXT[index:index + size] for index in range(0, len(TEXT), size)]
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self) -> None:
+        super().setup()
+        # As Ollama does, otherwise the chunks wait for the delayed acknowledgement
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self) -> None:
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        tokens = get_tokens()
+        stats = {
+            'done': True,
+            'eval_count': len(tokens),
+            'eval_duration': int(len(tokens) * self.server.token_delay * 1e9),
+            'total_duration': int(len(tokens) * self.server.token_delay * 1e9)
+        }
+
+        if not payload['stream']:
+            time.sleep(len(tokens) * self.server.token_delay)
+            content = json.dumps({'model': 'benchmark', 'response': TEXT, **stats}).encode()
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        for token in tokens:
+            time.sleep(self.server.token_delay)
+            self.write_chunk({'model': 'benchmark', 'response': token, 'done': False})
+        self.write_chunk({'model': 'benchmark', 'response': '', **stats})
+        self.wfile.write(b'0\r\n\r\n')
+
+    def write_chunk(self, chunk: dict) -> None:
+        line = json.dumps(chunk).encode() + b'\n'
+        self.wfile.write(f'{len(line):x}\r\n'.encode() + line + b'\r\n')
+
+    def log_message(self, format, *args) -> None:
+        ...
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """
+    Fake Ollama server, generating its tokens at a fixed pace.
+    """
+    daemon_threads = True
+
+    def __init__(self, token_delay: float) -> None:
+        super().__init__(('127.0.0.1', 0), FakeOllamaHandler)
+        self.token_delay = token_delay
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/api'
+
+
+def measure_whole(ollama_client: OllamaClient) -> tuple:
+    started = time.monotonic()
+    result = parse_ollama_response(ollama_client.generate(payload=build_ollama_request(question='What is it?')))
+    finished = time.monotonic() - started
+    return finished, finished, 1, result
+
+
+def measure_streamed(ollama_client: OllamaClient, partial_interval: float) -> tuple:
+    partials = []
+    started = time.monotonic()
+    result = stream_ollama_response(
+        chunks=ollama_client.stream_generate(payload=build_ollama_request(question='What is it?', stream=True)),
+        started=started,
+        publish_partial=lambda partial: partials.append(time.monotonic() - started),
+        partial_interval=partial_interval
+    )
+    return partials[0], time.monotonic() - started, len(partials), result
+
+
+def main(runs: int = 5, token_delay: float = 0.01, partial_interval: float = 0.25) -> None:
+    server = FakeOllamaServer(token_delay=token_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ollama_client = OllamaClient(base_url=server.url)
+
+    thinking, answer = TEXT[len('<think>'):TEXT.index('</think>')], TEXT[TEXT.index('</think>') + 8:].strip()
+    print(f"{len(get_tokens())} tokens, {token_delay * 1000:.0f} ms/token, partials every {partial_interval}s")
+    print(f"{'response':<10}{'first visible (ms)':>20}{'complete (ms)':>15}{'updates':>10}{'tokens/s':>10}")
+
+    try:
+        cases = (
+            ('whole', lambda: measure_whole(ollama_client)),
+            ('streamed', lambda: measure_streamed(ollama_client, partial_interval=partial_interval)),
+        )
+        for name, measure in cases:
+            totals = [0, 0, 0]
+            for _ in range(runs):
+                first_visible, complete, updates, result = measure()
+                assert (result['thinking'], result['answer']) == (thinking, answer)
+                totals = [totals[0] + first_visible, totals[1] + complete, totals[2] + updates]
+
+            print(
+                f"{name:<10}{totals[0] / runs * 1000:>20.1f}{totals[1] / runs * 1000:>15.1f}"
+                f"{totals[2] / runs:>10.1f}{result['metrics']['tokens_per_second']:>10.1f}"
+            )
+    finally:
+        ollama_client.close()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
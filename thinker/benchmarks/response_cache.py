@@ -0,0 +1,147 @@
+"""
+Benchmark of the think tasks of a workload with repeated questions, all answered by Ollama against answered through the
+response cache, with the exact tier only, then with the semantic tier too.
+
+The requests go to a fake Ollama server started in process, which answers every generation after a fixed delay, and
+embeds the prompts as bags of words. Some questions of the workload are asked again as they are, some with another
+case and spacing, and some with a few words added. The cache uses the redis instance of `REDIS_URL`.
+
+Run from the thinker service directory:
+
+    python -m benchmarks.response_cache
+"""
+import json
+import time
+import random
+import socket
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.core.redis import get_redis_client
+from app.core.metrics import WORKER_METRICS_KEY, THINK_RESPONSE_CACHE_EXACT_HITS, THINK_RESPONSE_CACHE_SEMANTIC_HITS
+from app.celery.ollama import OllamaClient
+from app.celery.tasks import build_ollama_request, parse_ollama_response
+from app.celery.response_cache import ResponseCache, SemanticIndex
+
+
+def embed_words(text: str, size: int = 256) -> list:
+    vector = [0.0] * size
+    for word in text.split():
+        vector[int(hashlib.md5(word.strip('?.,').encode()).hexdigest(), 16) % size] += 1
+    return vector
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self) -> None:
+        super().setup()
+        # As Ollama does, otherwise the headers and the body written apart wait for the delayed acknowledgement
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self) -> None:
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+
+        if self.path.endswith('/embed'):
+            self.server.embeddings += 1
+            body = {'model': payload['model'], 'embeddings': [embed_words(payload['input'])]}
+        else:
+            self.server.generations += 1
+            time.sleep(self.server.delay)
+            body = {'model': payload['model'], 'response': '<think>Thought.</think>Answer.', 'done': True}
+
+        content = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args) -> None:
+        ...
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """
+    Fake Ollama server, counting the generations and embeddings it serves.
+    """
+    daemon_threads = True
+
+    def __init__(self, delay: float) -> None:
+        super().__init__(('127.0.0.1', 0), FakeOllamaHandler)
+        self.delay = delay
+        self.generations = 0
+        self.embeddings = 0
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/api'
+
+
+def build_workload(tasks_count: int, questions_count: int, seed: int = 0) -> list:
+    rand = random.Random(seed)
+    words = [f'word{index}' for index in range(1000)]
+    questions = [f"What is {' '.join(rand.sample(words, 5))}?" for _ in range(questions_count)]
+
+    workload = []
+    for _ in range(tasks_count):
+        question = rand.choice(questions)
+        variant = rand.random()
+        if variant < 0.2:
+            question = '  ' + question.upper().replace(' ', '  ')
+        elif variant < 0.4:
+            question = 'Please tell me, ' + question
+        workload.append(question)
+
+    return workload
+
+
+def measure(server: FakeOllamaServer, ollama_client: OllamaClient, cache: ResponseCache, workload: list) -> tuple:
+    get_redis_client().delete(WORKER_METRICS_KEY, cache.index_key)
+    server.generations = server.embeddings = 0
+
+    started = time.perf_counter()
+    for question in workload:
+        payload = build_ollama_request(question=question, temperature=0)
+        lookup = cache.lookup(payload, text=question)
+        if lookup.result is None:
+            cache.store(lookup=lookup, result=parse_ollama_response(ollama_client.generate(payload=payload)))
+
+    stats = get_redis_client().hgetall(WORKER_METRICS_KEY)
+    hits = [int(float(stats.get(metric.name, 0))) for metric in (THINK_RESPONSE_CACHE_EXACT_HITS, THINK_RESPONSE_CACHE_SEMANTIC_HITS)]
+    return (time.perf_counter() - started) / len(workload), hits, server.generations, server.embeddings
+
+
+def main(tasks_count: int = 200, questions_count: int = 40, delay: float = 0.05) -> None:
+    server = FakeOllamaServer(delay=delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ollama_client = OllamaClient(base_url=server.url)
+    workload = build_workload(tasks_count=tasks_count, questions_count=questions_count)
+
+    print(f"{tasks_count} tasks of {questions_count} questions, {delay * 1000:.0f} ms/generation")
+    print(f"{'cache':<18}{'ms/task':>10}{'exact hits':>12}{'semantic hits':>15}{'generations':>13}{'embeddings':>12}")
+
+    try:
+        cases = (
+            ('none', dict(enabled=False)),
+            ('exact', dict()),
+            ('exact + semantic', dict(semantic_model='benchmark', semantic_index=SemanticIndex(threshold=0.8))),
+        )
+        for name, options in cases:
+            cache = ResponseCache(embed=ollama_client.embed, prefix=f'benchmark:response:{time.time_ns()}', **options)
+            seconds, hits, generations, embeddings = measure(
+                server=server,
+                ollama_client=ollama_client,
+                cache=cache,
+                workload=workload
+            )
+            print(f"{name:<18}{seconds * 1000:>10.2f}{hits[0]:>12}{hits[1]:>15}{generations:>13}{embeddings:>12}")
+    finally:
+        ollama_client.close()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
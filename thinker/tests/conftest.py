@@ -0,0 +1,77 @@
+import dotenv
+import pytest
+from testcontainers.redis import RedisContainer
+from testcontainers.postgres import PostgresContainer
+
+
+@pytest.fixture(scope="session")
+def redis_container():
+    redis = RedisContainer(
+        image="redis:7.4-alpine"
+    ).with_exposed_ports(
+        6379
+    )
+
+    redis.start()
+
+    yield redis
+
+    redis.stop()
+
+
+@pytest.fixture(scope="session")
+def postgres_container():
+    postgres = PostgresContainer(
+        image="postgres:16-alpine",
+        driver="asyncpg"
+    )
+
+    postgres.start()
+
+    yield postgres
+
+    postgres.stop()
+
+
+@pytest.fixture(scope="session")
+def app_setup_and_teardown(redis_container):
+    dotenv.load_dotenv('.env.test')
+
+    import os
+    host, port = redis_container.get_container_host_ip(), redis_container.get_exposed_port(6379)
+    os.environ['REDIS_URL'] = f'redis://{host}:{port}/0'
+
+    yield
+
+
+@pytest.fixture(scope="function")
+def redis_client(app_setup_and_teardown):
+    from app.core.redis import get_redis_client
+
+    client = get_redis_client()
+
+    yield client
+
+    client.flushdb()
+
+
+@pytest.fixture(scope="function")
+def database_url(app_setup_and_teardown, postgres_container):
+    import asyncio
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from shared_utils.db.base import Base
+    from app.models.task import Task  # noqa: F401, registers the tasks table
+
+    url = postgres_container.get_connection_url()
+
+    async def run_sync(method):
+        engine = create_async_engine(url)
+        async with engine.begin() as connection:
+            await connection.run_sync(method)
+        await engine.dispose()
+
+    asyncio.run(run_sync(Base.metadata.create_all))
+
+    yield url
+
+    asyncio.run(run_sync(Base.metadata.drop_all))
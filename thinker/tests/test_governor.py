@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+
+def build_governor(**options):
+    from app.celery.governor import ConcurrencyGovernor
+
+    return ConcurrencyGovernor(poll_interval=0.01, **options)
+
+
+def try_acquire(governor, token):
+    from app.core.redis import get_redis_client
+    from app.celery.governor import ACQUIRE_SCRIPT
+
+    acquired, *_ = get_redis_client().eval(
+        ACQUIRE_SCRIPT, 4, *governor.keys, token, governor.lease_ttl, 10, governor.initial_limit
+    )
+    return bool(acquired)
+
+
+def get_limit(redis_client, governor):
+    return float(redis_client.hget(governor.keys[3], 'limit'))
+
+
+def test_slots_handed_out_in_arrival_order(redis_client):
+    governor = build_governor(initial_limit=1)
+
+    token = governor.acquire()
+    assert not try_acquire(governor, 'first')
+    assert not try_acquire(governor, 'second')
+
+    governor.release(token=token, latency=None, overloaded=False)
+
+    # The slot is kept for the waiter that arrived first, even if it polls last
+    assert not try_acquire(governor, 'second')
+    assert try_acquire(governor, 'first')
+    assert redis_client.zrange(governor.keys[1], 0, -1) == ['second']
+
+
+def test_expired_lease_frees_its_slot(redis_client):
+    from app.exceptions import OllamaBusy
+
+    governor = build_governor(initial_limit=1, lease_ttl=0.2, max_wait=0.1)
+
+    assert governor.acquire() is not None
+    with pytest.raises(OllamaBusy):
+        governor.acquire()
+
+    # The worker holding the slot never released it
+    time.sleep(0.3)
+    assert governor.acquire() is not None
+
+
+def test_limit_increases_additively_while_latency_holds(redis_client):
+    governor = build_governor(initial_limit=2)
+
+    tokens = [governor.acquire(), governor.acquire()]
+    governor.release(token=tokens[0], latency=1.0, overloaded=False)
+    assert get_limit(redis_client, governor) == 2.5
+
+    # A single slot in use out of the limit says nothing of whether more would be served
+    governor.release(token=tokens[1], latency=1.0, overloaded=False)
+    assert get_limit(redis_client, governor) == 2.5
+
+
+def test_limit_decreases_multiplicatively_on_congestion(redis_client):
+    governor = build_governor(initial_limit=4, min_limit=1, latency_tolerance=2, multiplicative_decrease=0.5)
+
+    tokens = [governor.acquire() for _ in range(4)]
+    governor.release(token=tokens[0], latency=1.0, overloaded=False)
+    limit = get_limit(redis_client, governor)
+
+    governor.release(token=tokens[1], latency=10.0, overloaded=False)
+    assert get_limit(redis_client, governor) == limit * 0.5
+
+    # Generations caught in the same congestion count as a single signal
+    governor.release(token=tokens[2], latency=None, overloaded=True)
+    governor.release(token=tokens[3], latency=10.0, overloaded=False)
+    assert get_limit(redis_client, governor) == limit * 0.5
+
+
+def test_timed_out_generation_decreases_limit(redis_client):
+    import httpx
+
+    governor = build_governor(initial_limit=4, multiplicative_decrease=0.5)
+
+    with pytest.raises(httpx.ReadTimeout):
+        with governor.slot():
+            raise httpx.ReadTimeout('Ollama did not answer in time')
+
+    assert get_limit(redis_client, governor) == 2
+    assert redis_client.zcard(governor.keys[0]) == 0
@@ -0,0 +1,99 @@
+import time
+
+import httpx
+
+
+RESULT = {'answer': 'Answer.', 'thinking': 'Thought.', 'metrics': {'eval_count': 2}}
+
+
+def build_payload(question, temperature=0):
+    from app.celery.tasks import build_ollama_request
+
+    return build_ollama_request(question=question, temperature=temperature)
+
+
+def embed_words(payload):
+    # Embeds the prompts as bags of the words of a tiny vocabulary
+    vocabulary = ['capital', 'france', 'germany', 'what', 'is', 'the', 'of', 'please']
+    words = payload['input'].replace('?', '').split()
+    return httpx.Response(
+        200,
+        json={'embeddings': [[float(words.count(word)) for word in vocabulary]]},
+        request=httpx.Request('POST', 'http://ollama/api/embed')
+    )
+
+
+def test_exact_hit_after_store(redis_client):
+    from app.celery.response_cache import ResponseCache
+
+    cache = ResponseCache()
+
+    lookup = cache.lookup(build_payload('What is the capital of France?'))
+    assert lookup.result is None and lookup.tier is None
+    cache.store(lookup=lookup, result=RESULT)
+
+    # Prompts differing only by their case and whitespace share the response
+    lookup = cache.lookup(build_payload('  what is the CAPITAL  of france?'))
+    assert (lookup.result, lookup.tier) == (RESULT, 'exact')
+
+    # Other parameters do not
+    assert cache.lookup(build_payload('What is the capital of France?', temperature=0.1)).result is None
+
+
+def test_least_recently_used_responses_evicted_past_max_size(redis_client):
+    from app.celery.response_cache import ResponseCache
+
+    cache = ResponseCache(max_size=2)
+    questions = ['What is one?', 'What is two?', 'What is three?']
+
+    for question in questions[:2]:
+        cache.store(lookup=cache.lookup(build_payload(question)), result=RESULT)
+        time.sleep(0.01)
+
+    # Using the first response makes the second one the least recently used
+    assert cache.lookup(build_payload(questions[0])).tier == 'exact'
+    time.sleep(0.01)
+    cache.store(lookup=cache.lookup(build_payload(questions[2])), result=RESULT)
+
+    assert [cache.lookup(build_payload(question)).tier for question in questions] == ['exact', None, 'exact']
+    assert redis_client.zcard(cache.index_key) == 2
+    assert len(redis_client.keys(f'{cache.prefix}:*')) == 3
+
+
+def test_semantic_hit_of_similar_prompt(redis_client):
+    from app.celery.response_cache import ResponseCache, SemanticIndex
+
+    cache = ResponseCache(embed=embed_words, semantic_model='embedder', semantic_index=SemanticIndex(threshold=0.9))
+
+    lookup = cache.lookup(build_payload('What is the capital of France?'), text='What is the capital of France?')
+    cache.store(lookup=lookup, result=RESULT)
+
+    lookup = cache.lookup(build_payload('Please, capital of France?'), text='please what is the capital of france')
+    assert (lookup.result, lookup.tier) == (RESULT, 'semantic')
+
+    lookup = cache.lookup(build_payload('Capital of Germany?'), text='What is the capital of Germany?')
+    assert lookup.result is None
+
+    # Requests that are not deterministic enough are never served a similar prompt's response
+    lookup = cache.lookup(
+        build_payload('Please, capital of France?', temperature=0.7),
+        text='please what is the capital of france'
+    )
+    assert lookup.result is None and lookup.embedding is None
+
+
+def test_semantic_index_evicts_least_recently_used():
+    from app.celery.response_cache import SemanticIndex
+
+    index = SemanticIndex(max_size=2, threshold=0.99)
+    index.add(bucket='bucket', key='x', embedding=[1, 0, 0])
+    index.add(bucket='bucket', key='y', embedding=[0, 1, 0])
+
+    assert index.search(bucket='bucket', embedding=[2, 0, 0]) == 'x'
+    index.add(bucket='bucket', key='z', embedding=[0, 0, 1])
+
+    assert [index.search(bucket='bucket', embedding=vector) for vector in ([1, 0, 0], [0, 1, 0], [0, 0, 1])] == [
+        'x', None, 'z'
+    ]
+    # Embeddings are only compared within their bucket
+    assert index.search(bucket='other', embedding=[1, 0, 0]) is None
@@ -0,0 +1,57 @@
+import pytest
+
+
+TEXT = '<think>Weighing the options.</think>\n\nThe answer is 42.'
+
+
+def split_stream(chunks):
+    from app.utils import ThinkStreamSplitter
+
+    splitter = ThinkStreamSplitter()
+    for chunk in chunks:
+        splitter.feed(chunk)
+    return splitter.close()
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 7, 8, len(TEXT)])
+def test_think_stream_splitter_matches_whole_text(size):
+    from app.utils import split_think_content
+
+    # Every chunk size splits the tags at another position
+    chunks = [TEXT[index:index + size] for index in range(0, len(TEXT), size)]
+    thinking, answer = split_think_content(TEXT)
+
+    assert split_stream(chunks) == (thinking, answer.strip()) == ('Weighing the options.', 'The answer is 42.')
+
+
+def test_think_stream_splitter_holds_back_partial_tags():
+    from app.utils import ThinkStreamSplitter
+
+    splitter = ThinkStreamSplitter()
+    splitter.feed('<thi')
+    assert (splitter.thinking, splitter.answer) == ('', '')
+
+    splitter.feed('nk>Thought.</th')
+    assert (splitter.thinking, splitter.answer) == ('Thought.', '')
+
+    splitter.feed('ink>Answer <th')
+    assert (splitter.thinking, splitter.answer) == ('Thought.', 'Answer ')
+
+    # What was held back turns out not to be a tag
+    splitter.feed('ree>')
+    assert splitter.close() == ('Thought.', 'Answer <three>')
+
+
+def test_think_stream_splitter_without_tags():
+    assert split_stream(['The answer', ' is <', '42.']) == ('', 'The answer is <42.')
+
+
+
+def test_is_model_loaded():
+    from app.utils import is_model_loaded
+
+    tags = {'models': [{'name': 'deepseek-r1:7b'}, {'name': 'llama3:8b'}]}
+
+    assert is_model_loaded(tags=tags, model_name='llama3:8b')
+    assert not is_model_loaded(tags=tags, model_name='llama3:70b')
+    assert not is_model_loaded(tags={}, model_name='llama3:8b')
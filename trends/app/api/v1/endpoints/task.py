@@ -1,18 +1,28 @@
 from uuid import UUID
-from typing import Annotated
+from datetime import datetime
+from typing import Annotated, Optional, Union
 
 from celery import uuid
-from fastapi import APIRouter, HTTPException, Header, Depends, Query, status
+from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Header, Depends, Query, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from shared_utils import messages
 from shared_utils.schemas.user import User
 from shared_utils.exceptions import ObjDoesNotExist
 from shared_utils.api.deps.user import get_current_user, get_current_admin_user
-from shared_utils.pagination import PageNumberPaginationQueryParams, PageNumberPaginationResponse, PageNumberPaginator
+from shared_utils.pagination import PageNumberPaginationResponse, PageNumberPaginator
 
+from app.core.conf import settings
+from app.exceptions import InvalidCursor, RequestInProgress
+from app.export import stream_ndjson
 from app.core.security import verify_task_signature
+from app.pagination import CursorPaginationResponse
 from app.services.task import TaskService, get_task_service
-from app.schemas.task import TaskCreate, TaskRetrieve, TrendTaskUpdate
-from app.celery.tasks import trends_search_task
+from app.schemas.task import (TaskCreate, TaskRetrieve, TaskColumnarRetrieve, TaskSummary, TaskPageListQueryParams,
+                              TaskCursorListQueryParams, TaskExportQueryParams, TrendTaskUpdate, TrendTaskBulkUpdate,
+                              TaskBulkCallbackResponse, ResultFormatEnum, get_summary_columns)
+from app.scheduler import dispatch_task, is_due
 
 
 task_router = APIRouter(
@@ -21,6 +31,24 @@ task_router = APIRouter(
 )
 
 
+def get_task_list_response(db_tasks: BaseModel, summary_schema: Optional[type[BaseModel]]) -> BaseModel | JSONResponse:
+    """
+    Get the response of a page of tasks.
+
+    Args:
+        - db_tasks (BaseModel): The page of tasks.
+        - summary_schema (type[BaseModel] | None): Schema of the task summaries, None if the page holds full tasks.
+
+    Returns:
+        - BaseModel | JSONResponse: The page of full tasks, validated by the response model of the route, or the page
+          of summaries as it is, since summaries may be restricted to some of their fields.
+    """
+    if summary_schema is None:
+        return db_tasks
+
+    return JSONResponse(content=jsonable_encoder(db_tasks))
+
+
 @task_router.post('/task/', response_model=TaskRetrieve)
 async def create_task_route(
         task: TaskCreate,
@@ -45,16 +73,17 @@ async def create_task_route(
             detail=messages.USER_FORBIDDEN_MESSAGE
         )
 
+    # Tasks scheduled for later are left to the scheduler, which dispatches them once they are due
     task_id = uuid()
+    dispatched_at = datetime.now() if is_due(task.schedule_at) else None
     db_task = await task_service.create(
         id=task_id,
+        dispatched_at=dispatched_at,
         ** task.model_dump()
     )
 
-    trends_search_task.apply_async(
-        kwargs=task.custom_model_dump(exclude=['user_id', 'schedule_at']),
-        task_id=task_id
-    )
+    if dispatched_at is not None:
+        dispatch_task(task_id=task_id, task=task)
 
     return db_task
 
@@ -63,6 +92,11 @@ async def create_task_route(
 async def get_task_route(
         user_id: int,
         task_id: UUID,
+        result_format: ResultFormatEnum = Query(
+            default=ResultFormatEnum.EXPANDED,
+            description="Format of the results, 'columnar' returns a single array of dates, a partial dates bitmap and "
+                        "an array of values per search topic."
+        ),
         current_user: User = Depends(get_current_user),
         task_service: TaskService = Depends(get_task_service)
     ):
@@ -73,11 +107,12 @@ async def get_task_route(
     Args:
         - user_id (int): The ID of the user.
         - task_id (str): The ID of the task.
+        - result_format (ResultFormatEnum): The format of the results.
         - current_user (User): The current user.
         - task_service (TaskService): The task service.
 
     Returns:
-        - TaskRetrieve: The task if found.
+        - TaskRetrieve | TaskColumnarRetrieve: The task if found.
     """
 
     if not current_user.is_admin and user_id != current_user.id:
@@ -94,14 +129,23 @@ async def get_task_route(
             detail=messages.TASK_NOT_FOUND_MESSAGE
         )
 
+    # The response model expands the results, so the columnar form is returned as is
+    if result_format == ResultFormatEnum.COLUMNAR:
+        return JSONResponse(
+            content=TaskColumnarRetrieve.model_validate(db_task).model_dump(mode='json', by_alias=True)
+        )
+
     return db_task
 
 
-@task_router.get("/{user_id}/tasks/", response_model=PageNumberPaginationResponse[TaskRetrieve])
+@task_router.get(
+    "/{user_id}/tasks/",
+    response_model=Union[PageNumberPaginationResponse[TaskRetrieve], PageNumberPaginationResponse[TaskSummary]]
+)
 async def get_user_tasks_route(
         user_id: int,
         current_user: User = Depends(get_current_user),
-        query_params: Annotated[PageNumberPaginationQueryParams, Query()] = None,
+        query_params: Annotated[TaskPageListQueryParams, Query()] = None,
         task_service: TaskService = Depends(get_task_service)
     ):
     """
@@ -111,13 +155,17 @@ async def get_user_tasks_route(
     Args:
         - user_id (int): The ID of the user.
         - current_user (User): The current user.
-        - query_params (PageNumberPaginationQueryParams): Pagination parameters including page number and size.
+        - query_params (TaskPageListQueryParams): Pagination parameters including page number and size,
+          and whether to return the summaries of the tasks only.
         - task_service (TaskService): The task service.
 
     Returns:
         - PageNumberPaginationResponse[TaskRetrieve]: A paginated response containing task` data associated with the
           user.
     """
+    query_params = query_params or TaskPageListQueryParams()
+    summary_schema = query_params.get_summary_schema()
+
     if not current_user.is_admin and user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -127,16 +175,124 @@ async def get_user_tasks_route(
     db_tasks = await task_service.get_paginated(
         paginator=PageNumberPaginator,
         query_params=query_params,
-        response_schema=TaskRetrieve,
+        response_schema=summary_schema or TaskRetrieve,
+        columns=get_summary_columns(summary_schema) if summary_schema else None,
         user_id=user_id
     )
 
-    return db_tasks
+    return get_task_list_response(db_tasks, summary_schema=summary_schema)
+
+
+@task_router.get(
+    "/{user_id}/tasks/cursor/",
+    response_model=Union[CursorPaginationResponse[TaskRetrieve], CursorPaginationResponse[TaskSummary]]
+)
+async def get_user_tasks_cursor_route(
+        user_id: int,
+        current_user: User = Depends(get_current_user),
+        query_params: Annotated[TaskCursorListQueryParams, Query()] = None,
+        task_service: TaskService = Depends(get_task_service)
+    ):
+    """
+    Get all tasks for a user, newest first, paginated by cursor.
+    Every page is read past the last task of the previous page, so deep pages are as fast as the first one.
+    If the user is not an admin, they can only get tasks for themselves.
+
+    Args:
+        - user_id (int): The ID of the user.
+        - current_user (User): The current user.
+        - query_params (TaskCursorListQueryParams): Pagination parameters including the cursor and page size,
+          and whether to return the summaries of the tasks only.
+        - task_service (TaskService): The task service.
+
+    Returns:
+        - CursorPaginationResponse[TaskRetrieve]: A page of the tasks of the user, with the cursor of the next page.
 
-@task_router.get("/tasks/", response_model=PageNumberPaginationResponse[TaskRetrieve])
+    Raises:
+        - HTTPException: If the user is not authorized to access the tasks or if the cursor is invalid.
+    """
+    query_params = query_params or TaskCursorListQueryParams()
+    summary_schema = query_params.get_summary_schema()
+
+    if not current_user.is_admin and user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=messages.USER_FORBIDDEN_MESSAGE
+        )
+
+    try:
+        db_tasks = await task_service.get_cursor_paginated(
+            query_params=query_params,
+            response_schema=summary_schema or TaskRetrieve,
+            columns=get_summary_columns(summary_schema) if summary_schema else None,
+            user_id=user_id
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=exc.message
+        )
+
+    return get_task_list_response(db_tasks, summary_schema=summary_schema)
+
+
+@task_router.get("/{user_id}/tasks/export/", response_class=StreamingResponse)
+async def export_user_tasks_route(
+        user_id: int,
+        current_user: User = Depends(get_current_user),
+        query_params: Annotated[TaskExportQueryParams, Query()] = None,
+        task_service: TaskService = Depends(get_task_service)
+    ):
+    """
+    Export all tasks of a user, oldest first, as newline delimited JSON, with a task per line.
+    The tasks are read through a server side cursor and encoded as they are sent, so the export runs in constant memory
+    however many tasks the user has.
+    If the user is not an admin, they can only export tasks for themselves.
+
+    Args:
+        - user_id (int): The ID of the user.
+        - current_user (User): The current user.
+        - query_params (TaskExportQueryParams): Filters of the exported tasks, and whether to compress the export.
+        - task_service (TaskService): The task service.
+
+    Returns:
+        - StreamingResponse: The tasks of the user, as `TaskRetrieve` lines.
+
+    Raises:
+        - HTTPException: If the user is not authorized to export the tasks.
+    """
+    query_params = query_params or TaskExportQueryParams()
+
+    if not current_user.is_admin and user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=messages.USER_FORBIDDEN_MESSAGE
+        )
+
+    filters = {'user_id': user_id}
+    if query_params.status is not None:
+        filters['status'] = query_params.status
+
+    db_tasks = task_service.stream(
+        created_after=query_params.created_after,
+        created_before=query_params.created_before,
+        **filters
+    )
+
+    return StreamingResponse(
+        content=stream_ndjson(db_tasks, schema=TaskRetrieve, compress=query_params.gzip),
+        media_type='application/x-ndjson',
+        headers={'Content-Encoding': 'gzip'} if query_params.gzip else None
+    )
+
+
+@task_router.get(
+    "/tasks/",
+    response_model=Union[PageNumberPaginationResponse[TaskRetrieve], PageNumberPaginationResponse[TaskSummary]]
+)
 async def get_tasks_route(
         current_user: User = Depends(get_current_admin_user),
-        query_params: Annotated[PageNumberPaginationQueryParams, Query()] = None,
+        query_params: Annotated[TaskPageListQueryParams, Query()] = None,
         task_service: TaskService = Depends(get_task_service)
     ):
     """
@@ -145,16 +301,184 @@ async def get_tasks_route(
 
     ArgsL
         - current_user (User): The current user.
-        - query_params (PageNumberPaginationQueryParams): Pagination parameters including page number and size.
+        - query_params (TaskPageListQueryParams): Pagination parameters including page number and size,
+          and whether to return the summaries of the tasks only.
         - task_service (TaskService): The task service.
 
     Returns:
         - PageNumberPaginationResponse[TaskRetrieve]: A paginated response containing task` data.
     """
-    return await task_service.get_paginated(
+    query_params = query_params or TaskPageListQueryParams()
+    summary_schema = query_params.get_summary_schema()
+
+    db_tasks = await task_service.get_paginated(
         paginator=PageNumberPaginator,
         query_params=query_params,
-        response_schema=TaskRetrieve
+        response_schema=summary_schema or TaskRetrieve,
+        columns=get_summary_columns(summary_schema) if summary_schema else None
+    )
+
+    return get_task_list_response(db_tasks, summary_schema=summary_schema)
+
+
+@task_router.get(
+    "/tasks/cursor/",
+    response_model=Union[CursorPaginationResponse[TaskRetrieve], CursorPaginationResponse[TaskSummary]]
+)
+async def get_tasks_cursor_route(
+        current_user: User = Depends(get_current_admin_user),
+        query_params: Annotated[TaskCursorListQueryParams, Query()] = None,
+        task_service: TaskService = Depends(get_task_service)
+    ):
+    """
+    Get all tasks for all users, newest first, paginated by cursor.
+    Only accessible by admin users.
+
+    Args:
+        - current_user (User): The current user.
+        - query_params (TaskCursorListQueryParams): Pagination parameters including the cursor and page size,
+          and whether to return the summaries of the tasks only.
+        - task_service (TaskService): The task service.
+
+    Returns:
+        - CursorPaginationResponse[TaskRetrieve]: A page of the tasks, with the cursor of the next page.
+
+    Raises:
+        - HTTPException: If the cursor is invalid.
+    """
+    query_params = query_params or TaskCursorListQueryParams()
+    summary_schema = query_params.get_summary_schema()
+
+    try:
+        db_tasks = await task_service.get_cursor_paginated(
+            query_params=query_params,
+            response_schema=summary_schema or TaskRetrieve,
+            columns=get_summary_columns(summary_schema) if summary_schema else None
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=exc.message
+        )
+
+    return get_task_list_response(db_tasks, summary_schema=summary_schema)
+
+
+@task_router.get('/{user_id}/task/{task_id}/wait/', response_model=TaskRetrieve)
+async def wait_task_route(
+        user_id: int,
+        task_id: UUID,
+        timeout: float = Query(
+            default=30,
+            ge=0,
+            le=settings.TASK_WAIT_MAX_TIMEOUT,
+            description="Seconds to wait for the task to complete or fail."
+        ),
+        current_user: User = Depends(get_current_user),
+        task_service: TaskService = Depends(get_task_service)
+    ):
+    """
+    Wait for a task to complete or fail, and get it.
+    The request is held until the task is updated by the workers, instead of polling the task, and returns the task
+    as it is once the timeout expires, whatever its status.
+    If the user is not an admin, they can only wait for tasks of themselves.
+
+    Args:
+        - user_id (int): The ID of the user.
+        - task_id (UUID): The ID of the task.
+        - timeout (float): Seconds to wait for the task to complete or fail.
+        - current_user (User): The current user.
+        - task_service (TaskService): The task service.
+
+    Returns:
+        - TaskRetrieve: The task, completed or failed unless the timeout expired.
+
+    Raises:
+        - HTTPException: If the user is not authorized to access the task or if the task is not found.
+    """
+    if not current_user.is_admin and user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=messages.USER_FORBIDDEN_MESSAGE
+        )
+
+    task_updates = task_service.watch(id=task_id, user_id=user_id, timeout=timeout)
+
+    try:
+        db_task = await anext(task_updates)
+    except ObjDoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=messages.TASK_NOT_FOUND_MESSAGE
+        )
+
+    # The last update is the completed or failed task, or the task as it is once the timeout expires
+    async for db_task in task_updates:
+        pass
+
+    return db_task
+
+
+@task_router.get('/{user_id}/task/{task_id}/events/', response_class=StreamingResponse)
+async def task_events_route(
+        user_id: int,
+        task_id: UUID,
+        current_user: User = Depends(get_current_user),
+        task_service: TaskService = Depends(get_task_service)
+    ):
+    """
+    Stream the updates of a task as server sent events, until it completes or fails.
+    Every update is sent as a `task` event holding the task, starting with the task as it is, and comments are sent
+    in between to keep the connection alive.
+    If the user is not an admin, they can only follow tasks of themselves.
+
+    Args:
+        - user_id (int): The ID of the user.
+        - task_id (UUID): The ID of the task.
+        - current_user (User): The current user.
+        - task_service (TaskService): The task service.
+
+    Returns:
+        - StreamingResponse: The `text/event-stream` of the task updates.
+
+    Raises:
+        - HTTPException: If the user is not authorized to access the task or if the task is not found.
+    """
+    if not current_user.is_admin and user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=messages.USER_FORBIDDEN_MESSAGE
+        )
+
+    task_updates = task_service.watch(
+        id=task_id,
+        user_id=user_id,
+        timeout=settings.TASK_EVENTS_STREAM_TIMEOUT,
+        heartbeat_interval=settings.TASK_EVENTS_HEARTBEAT_INTERVAL
+    )
+
+    # The task is read before streaming, so a missing task is still answered with a 404
+    try:
+        db_task = await anext(task_updates)
+    except ObjDoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=messages.TASK_NOT_FOUND_MESSAGE
+        )
+
+    async def stream_events():
+        yield f'event: task\ndata: {db_task.model_dump_json(by_alias=True)}\n\n'
+
+        async for task in task_updates:
+            if task is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield f'event: task\ndata: {task.model_dump_json(by_alias=True)}\n\n'
+
+    return StreamingResponse(
+        content=stream_events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache'}
     )
 
 
@@ -192,7 +516,7 @@ async def delete_task_route(
             detail=messages.TASK_NOT_FOUND_MESSAGE
         )
 
-    await task_service.delete(id=db_task.id)
+    await task_service.delete(id=db_task.task_id)
 
 
 @task_router.put("/task/{task_id}/callback/", response_model=None, status_code=status.HTTP_204_NO_CONTENT,
@@ -230,22 +554,63 @@ async def callback_task_route(
         )
 
     try:
-        # Fetch the task to ensure it exists before updating
-        data = payload.model_dump(exclude_unset=True, exclude=("increment_retry_count", ))
-        await task_service.update(
+        # Update the task and increment its retry count in a single statement
+        data = payload.model_dump(exclude_unset=True, include={"status", "result_data", "error"})
+        await task_service.update_and_increment_retry_count(
             id=task_id,
+            increment_by=payload.increment_retry_count or 0,
             **data
         )
 
-        # Increment retry count if specified in the payload
-        if payload.increment_retry_count is True:
-            await task_service.increment_retry_count(
-                id=task_id,
-                increment_by=payload.increment_retry_count
-            )
-
     except ObjDoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=messages.TASK_NOT_FOUND_MESSAGE
         )
+
+
+@task_router.put("/tasks/callback/", response_model=TaskBulkCallbackResponse, tags=["callback"])
+async def bulk_callback_task_route(
+        request: Request,
+        payload: TrendTaskBulkUpdate,
+        x_signature: str = Header(alias="X-Signature"),
+        idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+        task_service: TaskService = Depends(get_task_service)
+    ):
+    """
+    Handle the callbacks of many tasks at once.
+
+    This endpoint is used by the workers to send the queued status updates of many tasks in a single request.
+    It verifies the signature of the request body, which covers every callback of the request, and then applies all
+    the callbacks with a single update statement, skipping the tasks that no longer exist.
+
+    Args:
+        - request (Request): The request, whose body is signed.
+        - payload (TrendTaskBulkUpdate): The callback of every task.
+        - x_signature (str): The signature of the request body for verification.
+        - idempotency_key (str | None): Key of the callbacks, shared by the requests sending them again.
+        - task_service (TaskService): The task service instance.
+
+    Returns:
+        - TaskBulkCallbackResponse: Whether the callback of every task was applied.
+
+    Raises:
+        - HTTPException: If the signature is invalid, or the callbacks are being applied by another request.
+    """
+    body = await request.body()
+
+    if not verify_task_signature(message=body.decode('utf-8'), signature=x_signature):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=messages.INVALID_TOKEN_MESSAGE
+        )
+
+    try:
+        results = await task_service.bulk_update(items=payload.items, idempotency_key=idempotency_key)
+    except RequestInProgress as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=exc.message
+        )
+
+    return TaskBulkCallbackResponse(results=results)
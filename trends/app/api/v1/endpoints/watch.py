@@ -0,0 +1,159 @@
+from uuid import UUID, uuid4
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from shared_utils import messages
+from shared_utils.schemas.user import User
+from shared_utils.exceptions import ObjDoesNotExist
+from shared_utils.api.deps.user import get_current_user
+from shared_utils.pagination import PageNumberPaginationQueryParams, PageNumberPaginationResponse, PageNumberPaginator
+
+from app.schemas.watch import WatchCreate, WatchRetrieve, WatchSummary
+from app.services.watch import WatchService, get_watch_service
+
+
+WATCH_NOT_FOUND_MESSAGE = "Watch not found."
+
+
+watch_router = APIRouter(
+    prefix='/search',
+    tags = ['watch']
+)
+
+
+@watch_router.post('/watch/', response_model=WatchRetrieve)
+async def create_watch_route(
+        watch: WatchCreate,
+        current_user: User = Depends(get_current_user),
+        watch_service: WatchService = Depends(get_watch_service)
+    ):
+    """
+    Create a new watch for the current user, which runs its search every interval.
+    The first run fetches the lookback of the watch, and every later run only fetches the days since the last run,
+    which are merged into the series of the watch.
+    If the user is not an admin, they can only create watches for themselves.
+
+    Args:
+        - watch (WatchCreate): The watch to create.
+        - current_user (User): The current user.
+        - watch_service (WatchService): The watch service.
+
+    Returns:
+        - WatchRetrieve: The created watch.
+    """
+    if not current_user.is_admin and watch.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=messages.USER_FORBIDDEN_MESSAGE
+        )
+
+    return await watch_service.create(
+        id=uuid4(),
+        ** watch.model_dump()
+    )
+
+
+@watch_router.get('/{user_id}/watches/', response_model=PageNumberPaginationResponse[WatchSummary])
+async def get_user_watches_route(
+        user_id: int,
+        current_user: User = Depends(get_current_user),
+        query_params: Annotated[PageNumberPaginationQueryParams, Query()] = None,
+        watch_service: WatchService = Depends(get_watch_service)
+    ):
+    """
+    Get all watches for a user, without their series.
+    If the user is not an admin, they can only get watches for themselves.
+
+    Args:
+        - user_id (int): The ID of the user.
+        - current_user (User): The current user.
+        - query_params (PageNumberPaginationQueryParams): Pagination parameters including page number and size.
+        - watch_service (WatchService): The watch service.
+
+    Returns:
+        - PageNumberPaginationResponse[WatchSummary]: A paginated response containing the watches of the user.
+    """
+    if not current_user.is_admin and user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=messages.USER_FORBIDDEN_MESSAGE
+        )
+
+    return await watch_service.get_paginated(
+        paginator=PageNumberPaginator,
+        query_params=query_params or PageNumberPaginationQueryParams(),
+        response_schema=WatchSummary,
+        user_id=user_id
+    )
+
+
+@watch_router.get('/{user_id}/watch/{watch_id}/', response_model=WatchRetrieve)
+async def get_watch_route(
+        user_id: int,
+        watch_id: UUID,
+        current_user: User = Depends(get_current_user),
+        watch_service: WatchService = Depends(get_watch_service)
+    ):
+    """
+    Get a watch, along with its series, by its ID and user ID.
+    If the user is not an admin, they can only get watches for themselves.
+
+    Args:
+        - user_id (int): The ID of the user.
+        - watch_id (UUID): The ID of the watch.
+        - current_user (User): The current user.
+        - watch_service (WatchService): The watch service.
+
+    Returns:
+        - WatchRetrieve: The watch if found.
+    """
+    if not current_user.is_admin and user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=messages.USER_FORBIDDEN_MESSAGE
+        )
+
+    try:
+        return await watch_service.get_by_user_id(id=watch_id, user_id=user_id)
+    except ObjDoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=WATCH_NOT_FOUND_MESSAGE
+        )
+
+
+@watch_router.delete('/{user_id}/watch/{watch_id}/', response_model=None, status_code=status.HTTP_204_NO_CONTENT)
+async def delete_watch_route(
+        user_id: int,
+        watch_id: UUID,
+        current_user: User = Depends(get_current_user),
+        watch_service: WatchService = Depends(get_watch_service)
+    ):
+    """
+    Delete a watch by its ID and user ID.
+    If the user is not an admin, they can only delete watches for themselves.
+
+    Args:
+        - user_id (int): The ID of the user.
+        - watch_id (UUID): The ID of the watch.
+        - current_user (User): The current user.
+        - watch_service (WatchService): The watch service.
+
+    Returns:
+        - None: No content.
+    """
+    if not current_user.is_admin and user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=messages.USER_FORBIDDEN_MESSAGE
+        )
+
+    try:
+        db_watch = await watch_service.get_by_user_id(id=watch_id, user_id=user_id)
+    except ObjDoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=WATCH_NOT_FOUND_MESSAGE
+        )
+
+    await watch_service.delete(id=db_watch.id)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import task
+from app.api.v1.endpoints import task, watch
 
 
 v1_api_router = APIRouter(
@@ -8,3 +8,4 @@ v1_api_router = APIRouter(
 )
 
 v1_api_router.include_router(task.task_router)
+v1_api_router.include_router(watch.watch_router)
@@ -1,47 +1,31 @@
 import traceback
 from typing import Dict, Any
 
-import requests
 from celery import Task
 from billiard.einfo import ExceptionInfo
 from shared_utils.schemas.status import TaskStatus
 
 from app.core.conf import settings
-from app.core.security import create_task_signature
+from app.utils import compact_results
+from app.celery.callbacks import trends_callback_dispatcher
+from app.celery.persistence import trends_result_store
 
 
 class TrendTask(Task):
 
-    @staticmethod
-    def _get_request_headers(task_id: str) -> Dict[str, str]:
-        """
-        Helper method to get the headers for the request.
-        
-        Args:
-            - task_id (str): Unique id of the task.
-        
-        Returns:
-            - Dict: Headers for the request.
-        """
-        signature = create_task_signature(message=task_id)
-        return {
-            "Content-Type": "application/json",
-            "X-Signature": signature
-        }
-
     def _send_request(self, task_id: str, pyload: Dict[str, Any]) -> None:
         """
-        Helper method to send a request to the task service.
+        Helper method to queue a callback to the task service, which is sent off the task thread, or to write it
+        straight to the database of the task service when direct persistence is enabled.
 
         Args:
             - task_id (str): Unique id of the task.
             - pyload (Dict): Data to be sent in the request.
         """
-        requests.put(
-            f'{settings.TASK_CALLBACK_URL}/task/{task_id}/callback/',
-            headers=self._get_request_headers(task_id),
-            json=pyload
-        )
+        if settings.TASK_DIRECT_PERSISTENCE_ENABLED:
+            trends_result_store.persist(task_id=task_id, payload=pyload)
+        else:
+            trends_callback_dispatcher.dispatch(task_id=task_id, payload=pyload)
 
     def before_start(self, task_id: str, args: tuple, kwargs: dict) -> None:
         """
@@ -97,6 +81,10 @@ class TrendTask(Task):
             - args (Tuple): Original Args for the task that completed.
             - kwargs (Dict): Original keyword Args for the task that completed.
         """
+        # Send the results in their columnar form, which is a fraction of the size of the expanded form
+        if settings.TRENDS_COLUMNAR_RESULTS:
+            retval = compact_results(retval)
+
         self._send_request(
             task_id=task_id,
             pyload={
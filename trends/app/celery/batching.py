@@ -0,0 +1,292 @@
+import json
+import time
+import uuid
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import redis
+
+from app.core.conf import settings
+from app.core.redis import get_redis_client
+from app.exceptions import CoalescedRequestFailed
+from app.celery.single_flight import RELEASE_LEASE_SCRIPT, FAILED_FLIGHT_MARKER, hold_lease
+from app.core.metrics import (TRENDS_BATCHED_REQUESTS, TRENDS_BATCHED_KEYWORDS, TRENDS_BATCH_LOW_RESOLUTION_KEYWORDS,
+                              increment_metric)
+
+
+logger = logging.getLogger(__name__)
+
+
+# Google Trends accepts up to five keywords per request
+MAX_BATCH_SIZE = 5
+
+UNBATCHED_MARKER = {'unbatched': True}
+
+
+def split_batch_results(
+        results: List[Dict[str, Any]],
+        keywords: List[str],
+        min_peak: int
+    ) -> Dict[str, Dict[str, Any]]:
+    """
+    Split the results of a packed request back into the results of every keyword.
+
+    Google Trends scales every request to 0-100 relative to the peak of all its keywords, so each keyword series is
+    rescaled to its own peak to match the result of a single keyword request. Keywords whose packed peak is below
+    `min_peak` lose too much precision by the rescaling and are flagged to be fetched on their own.
+
+    Args:
+        - results (List[Dict]): The search results of the packed request.
+        - keywords (List[str]): The packed keywords.
+        - min_peak (int): The minimum packed peak of a keyword to be rescaled.
+
+    Returns:
+        - Dict[str, Dict]: The outcome of every keyword, either its results or the unbatched marker.
+    """
+    # A request of a single keyword is already scaled to its own peak
+    if len(keywords) == 1:
+        return {keywords[0]: {'result': results}}
+
+    outcomes = {}
+    for keyword in keywords:
+        values = [
+            next(item['value'] for item in point['q_list'] if item['query'] == keyword) for point in results
+        ]
+        peak = max(values, default=0)
+
+        if results and peak < min_peak:
+            outcomes[keyword] = UNBATCHED_MARKER
+            continue
+
+        outcomes[keyword] = {
+            'result': [
+                {
+                    'date': point['date'],
+                    'is_partial': point['is_partial'],
+                    # A keyword without any interest is all zeros on its own as well
+                    'q_list': [{'query': keyword, 'value': round(value * 100 / peak) if peak else 0}]
+                }
+                for point, value in zip(results, values)
+            ]
+        }
+
+    return outcomes
+
+
+class KeywordBatcher:
+    """
+    Distributed batcher that packs pending single keyword searches sharing the same non keyword parameters into
+    requests of up to five keywords.
+
+    Every search adds its keyword to a pending set in redis. The worker holding the batch lease waits for a short
+    window for other keywords to join, performs a single request for all of them and shares the split results with
+    the waiting workers. The lease is renewed for as long as the request takes, which includes waiting for the rate
+    limit, so it only expires if the worker crashed.
+    """
+
+    def __init__(
+            self,
+            prefix: str = 'trends:batch',
+            window: float = 1,
+            lease_timeout: int = 30,
+            wait_timeout: float = 90,
+            min_peak: int = 10,
+            poll_interval: float = 0.1,
+            enabled: bool = True
+        ) -> None:
+        """
+        Initialize the batcher.
+
+        Args:
+            - prefix (str): Prefix of the redis keys.
+            - window (float): Maximum seconds the lease holder waits for other keywords to join the batch.
+            - lease_timeout (int): Seconds after which the lease of a crashed worker expires, the lease of a worker
+              performing the request is renewed every third of it.
+            - wait_timeout (float): Maximum seconds to wait for a batch to include the keyword, which should cover the
+              rate limit wait and the request of the lease holder.
+            - min_peak (int): The minimum packed peak of a keyword to be served from a batch.
+            - poll_interval (float): Seconds between checks while waiting.
+            - enabled (bool): Whether batching is enabled, a disabled batcher never serves a search.
+        """
+        self.prefix = prefix
+        self.window = window
+        self.lease_timeout = lease_timeout
+        self.wait_timeout = wait_timeout
+        self.min_peak = min_peak
+        self.poll_interval = poll_interval
+        self.enabled = enabled
+
+    def _get_pending_key(self, key: str) -> str:
+        return f'{self.prefix}:pending:{key}'
+
+    def _get_lease_key(self, key: str) -> str:
+        return f'{self.prefix}:lease:{key}'
+
+    def _get_result_key(self, key: str, keyword: str) -> str:
+        return f'{self.prefix}:result:{key}:{keyword}'
+
+    def _collect(self, client: redis.Redis, key: str, keywords: List[str]) -> None:
+        """
+        Wait for the batching window, or until the batch is full, and add the pending keywords to the batch keywords,
+        which start with the keyword of the lease holder.
+        """
+        pending_key = self._get_pending_key(key)
+        deadline = time.monotonic() + self.window
+
+        while time.monotonic() < deadline and client.scard(pending_key) < MAX_BATCH_SIZE:
+            time.sleep(self.poll_interval)
+
+        client.srem(pending_key, keywords[0])
+        keywords.extend(client.spop(pending_key, MAX_BATCH_SIZE - 1) or [])
+
+        # Drop the outcomes of previous batches, so waiters only ever see the outcome of this one
+        client.delete(*[self._get_result_key(key, batch_keyword) for batch_keyword in keywords])
+
+    def _publish(self, client: redis.Redis, key: str, token: str, outcomes: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Share the outcome of every keyword of the batch with the waiting workers and release the lease.
+        """
+        try:
+            pipeline = client.pipeline()
+            for keyword, outcome in outcomes.items():
+                pipeline.set(self._get_result_key(key, keyword), json.dumps(outcome), ex=self.lease_timeout)
+            pipeline.execute()
+        except redis.RedisError:
+            logger.warning("Failed to publish the batch outcome", exc_info=True)
+
+        # Released even if the outcome is not out, so the next batch does not wait for the lease to expire
+        try:
+            client.eval(RELEASE_LEASE_SCRIPT, 1, self._get_lease_key(key), token)
+        except redis.RedisError:
+            logger.warning("Failed to release the batch lease", exc_info=True)
+
+    def _lead(
+            self,
+            client: redis.Redis,
+            key: str,
+            token: str,
+            keyword: str,
+            fetch: Callable[[List[str]], List[Dict[str, Any]]]
+        ) -> Dict[str, Any]:
+        """
+        Collect the batch and perform its request while holding the lease.
+        """
+        lease_key, keywords = self._get_lease_key(key), [keyword]
+
+        try:
+            with hold_lease(client=client, lease_key=lease_key, token=token, timeout=self.lease_timeout):
+                try:
+                    self._collect(client=client, key=key, keywords=keywords)
+                except redis.RedisError:
+                    logger.warning("Failed to collect the batch, performing the request directly", exc_info=True)
+                    # The keywords taken from the pending set are fetched on their own, and the lease is released
+                    self._publish(
+                        client=client,
+                        key=key,
+                        token=token,
+                        outcomes={batch_keyword: UNBATCHED_MARKER for batch_keyword in keywords}
+                    )
+                    return UNBATCHED_MARKER
+
+                results = fetch(keywords)
+        except Exception:
+            self._publish(
+                client=client,
+                key=key,
+                token=token,
+                outcomes={batch_keyword: FAILED_FLIGHT_MARKER for batch_keyword in keywords}
+            )
+            raise
+
+        outcomes = split_batch_results(results=results, keywords=keywords, min_peak=self.min_peak)
+        self._publish(client=client, key=key, token=token, outcomes=outcomes)
+
+        increment_metric(TRENDS_BATCHED_REQUESTS)
+        increment_metric(TRENDS_BATCHED_KEYWORDS, len(keywords))
+        increment_metric(
+            TRENDS_BATCH_LOW_RESOLUTION_KEYWORDS,
+            sum(outcome == UNBATCHED_MARKER for outcome in outcomes.values())
+        )
+        return outcomes[keyword]
+
+    def _join(self, client: redis.Redis, key: str, token: str, keyword: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Add the keyword to the pending set and wait for a batch to include it, taking the lease to lead the next batch
+        whenever it is free.
+
+        Returns:
+            - Tuple[bool, Dict | None]: Whether the lease was taken, and the outcome of the keyword if a batch
+              included it within the bounded wait.
+        """
+        pending_key, lease_key = self._get_pending_key(key), self._get_lease_key(key)
+        deadline = time.monotonic() + self.wait_timeout
+
+        client.sadd(pending_key, keyword)
+        client.expire(pending_key, self.lease_timeout)
+
+        while time.monotonic() < deadline:
+            # Check the outcome before taking the lease, since the lease holder releases it once its outcome is out
+            outcome = client.get(self._get_result_key(key, keyword))
+            if outcome is not None:
+                client.srem(pending_key, keyword)
+                return False, json.loads(outcome)
+
+            if client.set(lease_key, token, nx=True, ex=self.lease_timeout):
+                return True, None
+
+            time.sleep(self.poll_interval)
+
+        client.srem(pending_key, keyword)
+        return False, None
+
+    def run(
+            self,
+            key: str,
+            keyword: str,
+            fetch: Callable[[List[str]], List[Dict[str, Any]]]
+        ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Serve a single keyword search from a packed request.
+
+        Args:
+            - key (str): Key identifying searches that share the same non keyword parameters.
+            - keyword (str): The search term.
+            - fetch (Callable): Performs the request of a list of keywords.
+
+        Returns:
+            - List[Dict] | None: The results of the keyword, or None if it has to be fetched on its own.
+
+        Raises:
+            - CoalescedRequestFailed: If the packed request including the keyword failed.
+        """
+        if not self.enabled:
+            return None
+
+        client = get_redis_client()
+        token = uuid.uuid4().hex
+
+        try:
+            is_leader, outcome = self._join(client=client, key=key, token=token, keyword=keyword)
+        except redis.RedisError:
+            logger.warning("Keyword batching is unavailable, performing the request directly", exc_info=True)
+            return None
+
+        if is_leader:
+            outcome = self._lead(client=client, key=key, token=token, keyword=keyword, fetch=fetch)
+
+        if outcome is None or outcome == UNBATCHED_MARKER:
+            return None
+
+        if outcome == FAILED_FLIGHT_MARKER:
+            raise CoalescedRequestFailed("Batched Google Trends request failed")
+
+        return outcome['result']
+
+
+trends_keyword_batcher = KeywordBatcher(
+    window=settings.TRENDS_BATCHING_WINDOW,
+    lease_timeout=settings.TRENDS_BATCHING_LEASE_TIMEOUT,
+    wait_timeout=settings.TRENDS_BATCHING_WAIT_TIMEOUT,
+    min_peak=settings.TRENDS_BATCHING_MIN_PEAK,
+    enabled=settings.TRENDS_BATCHING_ENABLED
+)
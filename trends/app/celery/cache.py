@@ -0,0 +1,197 @@
+import json
+import hashlib
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import redis
+
+from app.core.conf import settings
+from app.core.redis import get_redis_client
+from app.core.metrics import TRENDS_CACHE_HITS, TRENDS_CACHE_MISSES, increment_metric
+
+
+logger = logging.getLogger(__name__)
+
+
+# Time to live (in seconds) of the relative timeframes (e.g., 'now 1-H', 'today 5-y') keyed by their unit, the finer
+# the resolution of the returned series the faster it goes stale.
+RELATIVE_TIMEFRAME_TTLS = {
+    'H': 2 * 60,
+    'd': 15 * 60,
+    'm': 3 * 60 * 60,
+    'y': 12 * 60 * 60,
+}
+
+ALL_TIMEFRAME_TTL = 24 * 60 * 60
+PAST_TIMEFRAME_TTL = 24 * 60 * 60
+DEFAULT_TIMEFRAME_TTL = 15 * 60
+
+
+def get_timeframe_ttl(timeframe: str) -> int:
+    """
+    Get the time to live of cached results based on the timeframe of the search.
+
+    Args:
+        - timeframe (str): The resolved pytrends timeframe (e.g., 'now 1-H', 'today 5-y', '2020-01-01 2021-01-01').
+
+    Returns:
+        - int: The time to live in seconds.
+    """
+    parts = timeframe.split()
+
+    if timeframe == 'all':
+        return ALL_TIMEFRAME_TTL
+
+    if len(parts) == 2 and parts[0] in ('now', 'today'):
+        unit = parts[1].rsplit('-', 1)[-1]
+        return RELATIVE_TIMEFRAME_TTLS.get(unit, DEFAULT_TIMEFRAME_TTL)
+
+    if len(parts) == 2:
+        try:
+            end_date = datetime.fromisoformat(parts[1]).date()
+        except ValueError:
+            return DEFAULT_TIMEFRAME_TTL
+
+        # A range that ended in the past no longer receives new data points
+        if end_date < date.today():
+            return PAST_TIMEFRAME_TTL
+
+    return DEFAULT_TIMEFRAME_TTL
+
+
+def normalize_payload(payload_params: Dict[str, Any], tz: int) -> Dict[str, Any]:
+    """
+    Normalize a search payload so that equivalent searches share the same digest.
+
+    Args:
+        - payload_params (Dict): The resolved pytrends `build_payload` parameters.
+        - tz (int): The resolved timezone offset.
+
+    Returns:
+        - Dict: The normalized payload.
+    """
+    return {
+        **payload_params,
+        'kw_list': sorted(payload_params['kw_list']),
+        'tz': tz
+    }
+
+
+def get_payload_digest(payload_params: Dict[str, Any], tz: int) -> str:
+    """
+    Get the content digest of a search payload.
+
+    Args:
+        - payload_params (Dict): The resolved pytrends `build_payload` parameters.
+        - tz (int): The resolved timezone offset.
+
+    Returns:
+        - str: The hexadecimal sha256 digest of the normalized payload.
+    """
+    normalized_payload = json.dumps(normalize_payload(payload_params, tz), sort_keys=True)
+    return hashlib.sha256(normalized_payload.encode('utf-8')).hexdigest()
+
+
+def order_results(results: List[Dict[str, Any]], keywords: List[str]) -> List[Dict[str, Any]]:
+    """
+    Order the queries of every result point as requested, since searches with the same keywords in a different order
+    share the same digest.
+
+    Args:
+        - results (List[Dict]): The search results.
+        - keywords (List[str]): The requested search terms.
+
+    Returns:
+        - List[Dict]: The search results with their queries ordered as requested.
+    """
+    order = {keyword: index for index, keyword in enumerate(keywords)}
+    for result in results:
+        result['q_list'].sort(key=lambda item: order.get(item['query'], len(order)))
+    return results
+
+
+class TrendsResultCache:
+    """
+    Content addressed cache of Google Trends search results shared by all the trends workers.
+
+    Results are keyed by the normalized search payload, so identical searches submitted by different users are
+    served from redis instead of reaching Google.
+    """
+
+    def __init__(self, prefix: str = 'trends:result', enabled: bool = True) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            - prefix (str): Prefix of the redis keys.
+            - enabled (bool): Whether the cache is enabled, a disabled cache always misses.
+        """
+        self.prefix = prefix
+        self.enabled = enabled
+
+    def get_key(self, payload_params: Dict[str, Any], tz: int) -> str:
+        """
+        Get the redis key of a search payload.
+
+        Args:
+            - payload_params (Dict): The resolved pytrends `build_payload` parameters.
+            - tz (int): The resolved timezone offset.
+
+        Returns:
+            - str: The redis key.
+        """
+        return f'{self.prefix}:{get_payload_digest(payload_params, tz)}'
+
+    def get(self, payload_params: Dict[str, Any], tz: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the cached results of a search.
+
+        Args:
+            - payload_params (Dict): The resolved pytrends `build_payload` parameters.
+            - tz (int): The resolved timezone offset.
+
+        Returns:
+            - List[Dict] | None: The cached results, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            cached_results = get_redis_client().get(self.get_key(payload_params, tz))
+        except redis.RedisError:
+            logger.warning("Failed to read the trends result cache", exc_info=True)
+            cached_results = None
+
+        if cached_results is None:
+            increment_metric(TRENDS_CACHE_MISSES)
+            return None
+
+        increment_metric(TRENDS_CACHE_HITS)
+        return order_results(json.loads(cached_results), payload_params['kw_list'])
+
+    def set(self, payload_params: Dict[str, Any], tz: int, results: List[Dict[str, Any]]) -> None:
+        """
+        Cache the results of a search for a time to live that depends on its timeframe.
+
+        Args:
+            - payload_params (Dict): The resolved pytrends `build_payload` parameters.
+            - tz (int): The resolved timezone offset.
+            - results (List[Dict]): The search results.
+        """
+        if not self.enabled:
+            return
+
+        try:
+            get_redis_client().set(
+                self.get_key(payload_params, tz),
+                json.dumps(results),
+                ex=get_timeframe_ttl(payload_params['timeframe'])
+            )
+        except redis.RedisError:
+            logger.warning("Failed to write the trends result cache", exc_info=True)
+
+
+trends_result_cache = TrendsResultCache(
+    enabled=settings.TRENDS_CACHE_ENABLED
+)
@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from typing import Any, Dict, Set
+
+import requests
+from celery.signals import worker_process_shutdown, worker_shutdown
+
+from app.core.conf import settings
+from app.core.security import create_task_signature
+from app.core.metrics import (TRENDS_CALLBACK_REQUESTS, TRENDS_CALLBACKS_COALESCED, TRENDS_CALLBACKS_DROPPED,
+                              increment_metric)
+
+
+logger = logging.getLogger(__name__)
+
+
+def merge_callback_payloads(pending: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Coalesce a callback payload into the pending payload of the same task.
+
+    The latest value of every field wins, except for the retry count increments, which add up.
+
+    Args:
+        - pending (Dict): The pending payload of the task.
+        - payload (Dict): The new payload of the task.
+
+    Returns:
+        - Dict: The coalesced payload.
+    """
+    merged = {**pending, **payload}
+    merged['increment_retry_count'] = (
+        int(pending.get('increment_retry_count', 0)) + int(payload.get('increment_retry_count', 0))
+    )
+    return merged
+
+
+class CallbackDispatcher:
+    """
+    Dispatcher of the task status callbacks of the current worker process.
+
+    Callbacks are queued by the task handlers and sent by a background thread, so the task thread never waits on the
+    task service. Successive callbacks of the same task that are still queued are coalesced into one, and the queued
+    callbacks of many tasks are sent together to the bulk callback endpoint over a pooled connection, retrying with
+    exponential backoff while the task service is unavailable.
+    """
+
+    def __init__(
+            self,
+            base_url: str,
+            batch_size: int = 50,
+            flush_interval: float = 0.2,
+            timeout: float = 10,
+            max_retries: int = 5,
+            backoff: float = 0.5,
+            backoff_max: float = 30,
+            shutdown_timeout: float = 10
+        ) -> None:
+        """
+        Initialize the dispatcher.
+
+        Args:
+            - base_url (str): Base URL of the task callback endpoints.
+            - batch_size (int): Maximum callbacks sent in a single request.
+            - flush_interval (float): Maximum seconds a callback waits for others to join its request.
+            - timeout (float): Seconds to wait for the task service to respond.
+            - max_retries (int): Retries of a request before its callbacks are dropped.
+            - backoff (float): Seconds to wait before the first retry, doubled on every retry.
+            - backoff_max (float): Maximum seconds to wait between two retries.
+            - shutdown_timeout (float): Maximum seconds to wait for the queued callbacks to be sent on shutdown.
+        """
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.shutdown_timeout = shutdown_timeout
+        self._reset()
+
+        # The background thread does not survive a fork, so every worker process starts its own
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._condition = threading.Condition()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._in_flight: Set[str] = set()
+        self._session = None
+        self._thread = None
+        self._closed = False
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+
+        # A single session keeps the connection to the task service alive across requests
+        self._session = requests.Session()
+
+        self._thread = threading.Thread(target=self._run, name='callback-dispatcher', daemon=True)
+        self._thread.start()
+
+    def dispatch(self, task_id: str, payload: Dict[str, Any]) -> None:
+        """
+        Queue the callback of a task.
+
+        Args:
+            - task_id (str): Unique id of the task.
+            - payload (Dict): Data of the callback.
+        """
+        with self._condition:
+            self._start()
+
+            pending = self._pending.get(task_id)
+            self._pending[task_id] = payload if pending is None else merge_callback_payloads(pending, payload)
+
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+        if pending is not None:
+            increment_metric(TRENDS_CALLBACKS_COALESCED)
+
+    def is_pending(self, task_id: str) -> bool:
+        """
+        Check whether a callback of a task is queued or being sent.
+
+        Args:
+            - task_id (str): Unique id of the task.
+
+        Returns:
+            - bool: True if the task has a callback that has not reached the task service yet.
+        """
+        with self._condition:
+            return task_id in self._pending or task_id in self._in_flight
+
+    def _take_batch(self) -> Dict[str, Dict[str, Any]]:
+        task_ids = list(self._pending)[:self.batch_size]
+        return {task_id: self._pending.pop(task_id) for task_id in task_ids}
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                # Give the callbacks of other tasks a chance to join the request
+                self._condition.wait_for(
+                    lambda: len(self._pending) >= self.batch_size or self._closed,
+                    timeout=self.flush_interval
+                )
+                batch = self._take_batch()
+                self._in_flight = set(batch)
+
+                if not batch and self._closed:
+                    return
+
+            self._send_batch(batch)
+
+            with self._condition:
+                self._in_flight = set()
+
+    def _send_batch(self, batch: Dict[str, Dict[str, Any]]) -> None:
+        body = json.dumps({'items': [{'task_id': task_id, **payload} for task_id, payload in batch.items()]})
+        headers = {
+            "Content-Type": "application/json",
+            "X-Signature": create_task_signature(message=body),
+            # The batch is sent again with the same key, so the task service applies it once, even if the response
+            # to an earlier attempt that was applied is lost
+            "Idempotency-Key": uuid.uuid4().hex
+        }
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(min(self.backoff_max, self.backoff * 2 ** (attempt - 1)))
+
+            try:
+                response = self._session.put(
+                    f'{self.base_url}/tasks/callback/',
+                    data=body,
+                    headers=headers,
+                    timeout=self.timeout
+                )
+            except requests.RequestException:
+                logger.warning("Failed to reach the task service", exc_info=True)
+                continue
+
+            increment_metric(TRENDS_CALLBACK_REQUESTS)
+
+            # Task services without the bulk endpoint are sent the callbacks one by one
+            if response.status_code in (404, 405):
+                for task_id, payload in batch.items():
+                    self._send_one(task_id=task_id, payload=payload)
+                return
+
+            # The batch is still being applied by an earlier attempt, whose outcome is known once it is over
+            if response.status_code < 500 and response.status_code != 409:
+                if response.status_code >= 400:
+                    logger.error("Task service rejected the callbacks: %s", response.text)
+                return
+
+        logger.error("Dropping the callbacks of %d tasks, the task service is unavailable", len(batch))
+        increment_metric(TRENDS_CALLBACKS_DROPPED, len(batch))
+
+    def _send_one(self, task_id: str, payload: Dict[str, Any]) -> None:
+        try:
+            self._session.put(
+                f'{self.base_url}/task/{task_id}/callback/',
+                json=payload,
+                headers={
+                    "Content-Type": "application/json",
+                    "X-Signature": create_task_signature(message=task_id)
+                },
+                timeout=self.timeout
+            )
+        except requests.RequestException:
+            logger.warning("Failed to send the callback of task %s", task_id, exc_info=True)
+            increment_metric(TRENDS_CALLBACKS_DROPPED)
+
+    def close(self) -> None:
+        """
+        Send the queued callbacks and stop the background thread.
+        """
+        with self._condition:
+            if self._thread is None:
+                return
+            self._closed = True
+            self._condition.notify()
+
+        self._thread.join(timeout=self.shutdown_timeout)
+
+
+trends_callback_dispatcher = CallbackDispatcher(
+    base_url=settings.TASK_CALLBACK_URL,
+    batch_size=settings.TASK_CALLBACK_BATCH_SIZE,
+    flush_interval=settings.TASK_CALLBACK_FLUSH_INTERVAL,
+    timeout=settings.TASK_CALLBACK_TIMEOUT,
+    max_retries=settings.TASK_CALLBACK_MAX_RETRIES
+)
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def flush_task_callbacks(**kwargs) -> None:
+    """
+    Send the queued callbacks before the worker process exits.
+    """
+    trends_callback_dispatcher.close()
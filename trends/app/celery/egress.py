@@ -0,0 +1,247 @@
+import time
+import random
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import redis
+import requests
+from pytrends.exceptions import ResponseError, TooManyRequestsError
+
+from app.core.conf import settings
+from app.core.redis import get_redis_client
+from app.core.metrics import (TRENDS_EGRESS_AVAILABLE, TRENDS_EGRESS_FAILURES, TRENDS_EGRESS_CIRCUITS_OPENED,
+                              increment_metric, set_metric)
+
+
+logger = logging.getLogger(__name__)
+
+
+DIRECT_EGRESS_NAME = 'direct'
+
+# Update the health of an egress with the outcome of a request: exponentially weighted success rate and latency, the
+# consecutive failures, and the circuit breaker, which opens once the consecutive failures reach the threshold. A
+# request through a half open egress that fails again reopens its circuit for twice as long, up to 16 cooldowns.
+# Returns 1 if the circuit was opened by this request.
+RECORD_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'success_rate', 'latency', 'failures')
+local outcome = ARGV[1]
+local alpha = tonumber(ARGV[3])
+local threshold = tonumber(ARGV[4])
+local success_rate = tonumber(state[1]) or 1
+local latency = tonumber(state[2]) or tonumber(ARGV[2])
+local failures = tonumber(state[3]) or 0
+local opened = 0
+
+redis.call('HINCRBY', KEYS[1], 'requests', 1)
+
+if outcome == 'success' then
+    success_rate = success_rate * (1 - alpha) + alpha
+    latency = latency * (1 - alpha) + tonumber(ARGV[2]) * alpha
+    failures = 0
+else
+    success_rate = success_rate * (1 - alpha)
+    failures = failures + 1
+    if outcome == 'throttle' then
+        redis.call('HINCRBY', KEYS[1], 'throttles', 1)
+    end
+    if failures >= threshold then
+        local cooldown = tonumber(ARGV[5]) * math.pow(2, math.min(failures - threshold, 4))
+        redis.call('HSET', KEYS[1], 'open_until', now + cooldown)
+        opened = 1
+    end
+end
+
+redis.call('HSET', KEYS[1], 'success_rate', success_rate, 'latency', latency, 'failures', failures)
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+return opened
+"""
+
+
+class Egress(NamedTuple):
+    name: str
+    proxy: Optional[str]
+
+
+def build_egresses(proxies: str, include_direct: bool) -> List[Egress]:
+    """
+    Build the egresses of the pool from the configured proxies.
+
+    Egresses are named after a digest of their proxy URL, so credentials in the URL never end up in redis keys.
+
+    Args:
+        - proxies (str): Comma separated proxy URLs.
+        - include_direct (bool): Whether requests can also leave directly, without a proxy.
+
+    Returns:
+        - List[Egress]: The egresses of the pool.
+    """
+    egresses = [Egress(name=DIRECT_EGRESS_NAME, proxy=None)] if include_direct else []
+    for proxy in filter(None, map(str.strip, proxies.split(','))):
+        egresses.append(Egress(name=f'proxy-{hashlib.sha1(proxy.encode()).hexdigest()[:12]}', proxy=proxy))
+    return egresses
+
+
+class EgressPool:
+    """
+    Pool of the egress endpoints the trends workers reach Google through, with a health score per egress shared by all
+    the workers in redis.
+
+    Every request is routed to the healthier of two random egresses whose circuit is closed (power of two choices),
+    which favors healthy egresses while still spreading the requests, since Google rate limits every IP on its own.
+    An egress whose requests keep failing or getting throttled has its circuit opened for a cooldown.
+    """
+
+    def __init__(
+            self,
+            egresses: List[Egress],
+            prefix: str = 'trends:egress',
+            alpha: float = 0.2,
+            failure_threshold: int = 3,
+            cooldown: float = 60,
+            stats_ttl: int = 86400
+        ) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            - egresses (List[Egress]): The egresses of the pool.
+            - prefix (str): Prefix of the redis keys.
+            - alpha (float): Weight of the latest request in the success rate and latency averages.
+            - failure_threshold (int): Consecutive failures after which the circuit of an egress opens.
+            - cooldown (float): Seconds the circuit of an egress stays open before a request is let through again.
+            - stats_ttl (int): Seconds the health of an unused egress is kept.
+        """
+        if not egresses:
+            raise ValueError("The egress pool requires at least one egress")
+
+        self.egresses = egresses
+        self.prefix = prefix
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.stats_ttl = stats_ttl
+
+    def _get_key(self, egress: Egress) -> str:
+        return f'{self.prefix}:{egress.name}'
+
+    def get_health(self) -> Dict[Egress, Dict[str, float]]:
+        """
+        Get the health of every egress, along with the current redis time.
+        """
+        client = get_redis_client()
+
+        pipeline = client.pipeline()
+        for egress in self.egresses:
+            pipeline.hgetall(self._get_key(egress))
+        pipeline.time()
+        *states, (seconds, microseconds) = pipeline.execute()
+
+        now = seconds + microseconds / 1_000_000
+        return {
+            egress: {
+                'success_rate': float(state.get('success_rate', 1)),
+                'latency': float(state.get('latency', 0)),
+                'open_for': max(0.0, float(state.get('open_until', 0)) - now)
+            }
+            for egress, state in zip(self.egresses, states)
+        }
+
+    @staticmethod
+    def _score(health: Dict[str, float]) -> float:
+        return health['success_rate'] / (1 + health['latency'])
+
+    def select(self) -> Egress:
+        """
+        Select the egress of the next request.
+
+        Returns:
+            - Egress: The healthier of two random egresses with a closed circuit, or the egress whose circuit closes
+              first if every circuit is open.
+        """
+        if len(self.egresses) == 1:
+            return self.egresses[0]
+
+        try:
+            health = self.get_health()
+        except redis.RedisError:
+            logger.warning("Egress health is unavailable, selecting a random egress", exc_info=True)
+            return random.choice(self.egresses)
+
+        available = [egress for egress in self.egresses if health[egress]['open_for'] == 0]
+        set_metric(TRENDS_EGRESS_AVAILABLE, len(available))
+
+        if not available:
+            return min(self.egresses, key=lambda egress: health[egress]['open_for'])
+
+        candidates = random.sample(available, min(2, len(available)))
+        return max(candidates, key=lambda egress: self._score(health[egress]))
+
+    def record(self, egress: Egress, outcome: str, latency: float) -> None:
+        """
+        Record the outcome of a request through an egress.
+
+        Args:
+            - egress (Egress): The egress of the request.
+            - outcome (str): Either 'success', 'failure' or 'throttle'.
+            - latency (float): Seconds the request took.
+        """
+        if outcome != 'success':
+            increment_metric(TRENDS_EGRESS_FAILURES)
+
+        try:
+            opened = get_redis_client().eval(
+                RECORD_SCRIPT,
+                1,
+                self._get_key(egress),
+                outcome,
+                latency,
+                self.alpha,
+                self.failure_threshold,
+                self.cooldown,
+                self.stats_ttl
+            )
+        except redis.RedisError:
+            logger.warning("Failed to record the egress health", exc_info=True)
+            return
+
+        if int(opened):
+            increment_metric(TRENDS_EGRESS_CIRCUITS_OPENED)
+            logger.warning("Circuit of egress %s opened", egress.name)
+
+    @contextmanager
+    def track(self, egress: Egress) -> Iterator[Egress]:
+        """
+        Track the health of an egress over a request through it.
+
+        Args:
+            - egress (Egress): The egress of the request.
+
+        Yields:
+            - Egress: The tracked egress.
+        """
+        started = time.monotonic()
+
+        try:
+            yield egress
+        except TooManyRequestsError:
+            self.record(egress=egress, outcome='throttle', latency=time.monotonic() - started)
+            raise
+        except (ResponseError, requests.RequestException):
+            self.record(egress=egress, outcome='failure', latency=time.monotonic() - started)
+            raise
+        else:
+            self.record(egress=egress, outcome='success', latency=time.monotonic() - started)
+
+
+trends_egress_pool = EgressPool(
+    egresses=build_egresses(
+        proxies=settings.TRENDS_EGRESS_PROXIES,
+        include_direct=settings.TRENDS_EGRESS_INCLUDE_DIRECT
+    ),
+    failure_threshold=settings.TRENDS_EGRESS_FAILURE_THRESHOLD,
+    cooldown=settings.TRENDS_EGRESS_COOLDOWN
+)
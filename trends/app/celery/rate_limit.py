@@ -0,0 +1,201 @@
+import time
+import logging
+from typing import Optional
+
+import redis
+
+from app.core.conf import settings
+from app.core.redis import get_redis_client
+from app.exceptions import RateLimitExceeded
+from app.core.metrics import (TRENDS_RATE_LIMIT_RATE, TRENDS_RATE_LIMIT_WAIT_SECONDS, TRENDS_RATE_LIMIT_THROTTLED,
+                              increment_metric, set_metric)
+
+
+logger = logging.getLogger(__name__)
+
+
+# Label of the bucket of the requests without a scope in the metrics
+DEFAULT_SCOPE = 'default'
+
+
+# Refill the bucket at the current rate and reserve a token, returning the seconds to wait for it. A reservation
+# that would wait longer than the maximum wait is not taken and -1 is returned instead.
+ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'timestamp', 'rate')
+local rate = tonumber(state[3]) or tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local tokens = tonumber(state[1]) or burst
+local timestamp = tonumber(state[2]) or now
+
+tokens = math.min(burst, tokens + math.max(0, now - timestamp) * rate)
+
+local wait = 0
+if tokens < 1 then
+    wait = (1 - tokens) / rate
+end
+if wait > max_wait then
+    return '-1'
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens - 1, 'timestamp', now, 'rate', rate)
+return tostring(wait)
+"""
+
+# Additively increase the rate on success, or multiplicatively decrease it and drain the bucket on a throttled
+# response. Decreases are applied at most once per cooldown, so a burst of throttled responses observed by many
+# workers at the same moment counts as a single congestion signal.
+ADJUST_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'rate', 'decreased_at')
+local rate = tonumber(state[1]) or tonumber(ARGV[2])
+local decreased_at = tonumber(state[2]) or 0
+
+if ARGV[1] == 'increase' then
+    rate = math.min(tonumber(ARGV[4]), rate + tonumber(ARGV[5]))
+    redis.call('HSET', KEYS[1], 'rate', rate)
+elseif now - decreased_at >= tonumber(ARGV[7]) then
+    rate = math.max(tonumber(ARGV[3]), rate * tonumber(ARGV[6]))
+    redis.call('HSET', KEYS[1], 'rate', rate, 'decreased_at', now, 'tokens', 0, 'timestamp', now)
+end
+
+return tostring(rate)
+"""
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket rate limiter shared by all the trends workers, whose rate adapts to the responses of Google Trends.
+
+    Every request reserves a token from a bucket stored in redis before reaching Google. The permitted rate grows
+    additively while requests succeed and shrinks multiplicatively once Google starts rejecting them (AIMD).
+
+    Google limits every egress IP on its own, so each egress can be given a separate bucket through its scope.
+    """
+
+    def __init__(
+            self,
+            key: str = 'trends:rate_limit',
+            initial_rate: float = 1,
+            min_rate: float = 0.05,
+            max_rate: float = 5,
+            burst: float = 5,
+            additive_increase: float = 0.05,
+            multiplicative_decrease: float = 0.5,
+            decrease_cooldown: float = 5,
+            max_wait: float = 60,
+            enabled: bool = True
+        ) -> None:
+        """
+        Initialize the rate limiter.
+
+        Args:
+            - key (str): Redis key of the bucket.
+            - initial_rate (float): Permitted requests per second before any adjustment.
+            - min_rate (float): Lower bound of the permitted requests per second.
+            - max_rate (float): Upper bound of the permitted requests per second.
+            - burst (float): Capacity of the bucket.
+            - additive_increase (float): Requests per second added to the rate on every successful request.
+            - multiplicative_decrease (float): Factor the rate is multiplied by on a throttled request.
+            - decrease_cooldown (float): Minimum seconds between two decreases of the rate.
+            - max_wait (float): Maximum seconds to wait for a token before giving up.
+            - enabled (bool): Whether the rate limiter is enabled.
+        """
+        self.key = key
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.additive_increase = additive_increase
+        self.multiplicative_decrease = multiplicative_decrease
+        self.decrease_cooldown = decrease_cooldown
+        self.max_wait = max_wait
+        self.enabled = enabled
+
+    def _get_key(self, scope: Optional[str]) -> str:
+        return self.key if scope is None else f'{self.key}:{scope}'
+
+    def acquire(self, scope: Optional[str] = None) -> None:
+        """
+        Wait until a token is available to perform a request.
+
+        Args:
+            - scope (str | None): Scope of the bucket, such as the egress the request goes through.
+
+        Raises:
+            - RateLimitExceeded: If no token is available within the maximum wait.
+        """
+        if not self.enabled:
+            return
+
+        try:
+            wait = float(
+                get_redis_client().eval(
+                    ACQUIRE_SCRIPT, 1, self._get_key(scope), self.initial_rate, self.burst, self.max_wait
+                )
+            )
+        except redis.RedisError:
+            logger.warning("Rate limiter is unavailable, performing the request directly", exc_info=True)
+            return
+
+        if wait < 0:
+            increment_metric(TRENDS_RATE_LIMIT_WAIT_SECONDS, self.max_wait)
+            raise RateLimitExceeded("Google Trends rate limit exceeded")
+
+        if wait > 0:
+            increment_metric(TRENDS_RATE_LIMIT_WAIT_SECONDS, wait)
+            time.sleep(wait)
+
+    def _adjust(self, direction: str, scope: Optional[str]) -> None:
+        try:
+            rate = get_redis_client().eval(
+                ADJUST_SCRIPT,
+                1,
+                self._get_key(scope),
+                direction,
+                self.initial_rate,
+                self.min_rate,
+                self.max_rate,
+                self.additive_increase,
+                self.multiplicative_decrease,
+                self.decrease_cooldown
+            )
+        except redis.RedisError:
+            logger.warning("Failed to adjust the rate limit", exc_info=True)
+            return
+
+        set_metric(TRENDS_RATE_LIMIT_RATE, float(rate), label_value=scope or DEFAULT_SCOPE)
+
+    def record_success(self, scope: Optional[str] = None) -> None:
+        """
+        Record a successful request, additively increasing the permitted rate.
+
+        Args:
+            - scope (str | None): Scope of the bucket the request was permitted by.
+        """
+        if self.enabled:
+            self._adjust('increase', scope=scope)
+
+    def record_throttle(self, scope: Optional[str] = None) -> None:
+        """
+        Record a request rejected by Google, multiplicatively decreasing the permitted rate.
+
+        Args:
+            - scope (str | None): Scope of the bucket the request was permitted by.
+        """
+        increment_metric(TRENDS_RATE_LIMIT_THROTTLED)
+        if self.enabled:
+            self._adjust('decrease', scope=scope)
+
+
+trends_rate_limiter = AdaptiveRateLimiter(
+    initial_rate=settings.TRENDS_RATE_LIMIT_INITIAL_RATE,
+    min_rate=settings.TRENDS_RATE_LIMIT_MIN_RATE,
+    max_rate=settings.TRENDS_RATE_LIMIT_MAX_RATE,
+    burst=settings.TRENDS_RATE_LIMIT_BURST,
+    max_wait=settings.TRENDS_RATE_LIMIT_MAX_WAIT,
+    enabled=settings.TRENDS_RATE_LIMIT_ENABLED
+)
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests import status_codes
+from pytrends import exceptions, request
+from pytrends.request import TrendReq
+
+from app.core.conf import settings
+from app.core.metrics import TRENDS_SESSIONS_CREATED, TRENDS_SESSIONS_ROTATED, increment_metric
+
+
+class PooledTrendReq(TrendReq):
+    """
+    TrendReq that sends all its requests through a single long lived `requests.Session`, so connections to Google are
+    kept alive across searches, and that keeps track of the age of its Google cookie.
+    """
+
+    def __init__(self, hl: str = 'en-US', tz: int = 360, proxy: Optional[str] = None, **kwargs) -> None:
+        """
+        Initialize the session, fetching its Google cookie.
+
+        Args:
+            - hl (str): Language of the session.
+            - tz (int): Timezone offset of the session.
+            - proxy (str | None): Proxy URL all the requests of the session go through, None to connect directly.
+            - **kwargs: Remaining `TrendReq` arguments.
+        """
+        self.proxy = proxy
+        self.session = requests.Session()
+        if proxy is not None:
+            self.session.proxies.update({'http': proxy, 'https': proxy})
+
+        try:
+            super().__init__(hl=hl, tz=tz, **kwargs)
+        except BaseException:
+            # The session is not handed out, its connections would never be closed otherwise
+            self.session.close()
+            raise
+
+        self.session.headers.update(self.headers)
+        self.cookies_fetched_at = time.monotonic()
+
+    def GetGoogleCookie(self) -> Dict[str, str]:
+        """
+        Fetch the Google cookie through the session.
+
+        Unlike `TrendReq.GetGoogleCookie`, which retries forever through a failing proxy, a failure is raised so the
+        session can be discarded.
+        """
+        response = self.session.get(
+            f'{request.BASE_TRENDS_URL}/explore/?geo={self.hl[-2:]}', timeout=self.timeout, **self.requests_args
+        )
+        return {name: value for name, value in response.cookies.items() if name == 'NID'}
+
+    def refresh_cookies(self) -> None:
+        """
+        Fetch a new Google cookie for the session.
+        """
+        self.cookies = self.GetGoogleCookie()
+        self.cookies_fetched_at = time.monotonic()
+
+    def reset(self) -> None:
+        """
+        Reset the state left by the previous search, `build_payload` falls back to the geo of the previous search
+        when none is given.
+        """
+        self.geo = ''
+        self.kw_list = list()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _get_data(self, url, method=TrendReq.GET_METHOD, trim_chars=0, **kwargs):
+        """
+        Send a request to Google through the long lived session and return the JSON response as a Python object.
+
+        Mirrors `TrendReq._get_data`, which builds a new session on every call.
+        """
+        if method == TrendReq.POST_METHOD:
+            response = self.session.post(
+                url, timeout=self.timeout, cookies=self.cookies, **kwargs, **self.requests_args
+            )
+        else:
+            response = self.session.get(
+                url, timeout=self.timeout, cookies=self.cookies, **kwargs, **self.requests_args
+            )
+
+        # Google mostly sends 'application/json' in the Content-Type header, but occasionally it sends
+        # 'application/javascript' and sometimes even 'text/javascript'
+        content_type = response.headers.get('Content-Type', '')
+        if response.status_code == 200 and any(
+                json_type in content_type
+                for json_type in ('application/json', 'application/javascript', 'text/javascript')
+        ):
+            # Some responses start with garbage characters, like ")]}'," which have to be trimmed
+            return json.loads(response.text[trim_chars:])
+
+        if response.status_code == status_codes.codes.too_many_requests:
+            raise exceptions.TooManyRequestsError.from_response(response)
+        raise exceptions.ResponseError.from_response(response)
+
+
+class TrendReqPool:
+    """
+    Pool of warmed `PooledTrendReq` sessions of the current worker process, keyed by language, timezone and proxy.
+
+    Sessions are checked out for a single search and returned afterwards. Their cookie is refreshed once it gets
+    older than the maximum cookie age, and a session that gets throttled or fails to connect is discarded so the
+    next search rotates to a fresh session with a new cookie and connection.
+    """
+
+    def __init__(self, max_idle: int = 2, cookie_max_age: float = 1800) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            - max_idle (int): Maximum idle sessions kept per language and timezone.
+            - cookie_max_age (float): Seconds after which the cookie of a session is refreshed.
+        """
+        self.max_idle = max_idle
+        self.cookie_max_age = cookie_max_age
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._idle: Dict[Tuple[str, int, Optional[str]], Deque[PooledTrendReq]] = defaultdict(deque)
+
+    def _pop_idle(self, hl: str, tz: int, proxy: Optional[str]) -> PooledTrendReq | None:
+        with self._lock:
+            # Sessions must not be shared with forked worker processes
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._idle.clear()
+
+            idle = self._idle[(hl, tz, proxy)]
+            return idle.pop() if idle else None
+
+    def _checkout(self, hl: str, tz: int, proxy: Optional[str]) -> PooledTrendReq:
+        trend_req = self._pop_idle(hl=hl, tz=tz, proxy=proxy)
+
+        if trend_req is None:
+            increment_metric(TRENDS_SESSIONS_CREATED)
+            return PooledTrendReq(hl=hl, tz=tz, proxy=proxy)
+
+        # Health check, a session without a Google cookie or with an expired one gets a new cookie
+        if not trend_req.cookies or time.monotonic() - trend_req.cookies_fetched_at > self.cookie_max_age:
+            try:
+                trend_req.refresh_cookies()
+            except BaseException:
+                # The session is neither handed out nor back in the pool, its connections would never be closed
+                increment_metric(TRENDS_SESSIONS_ROTATED)
+                trend_req.close()
+                raise
+
+        trend_req.reset()
+        return trend_req
+
+    def _release(self, trend_req: PooledTrendReq) -> None:
+        with self._lock:
+            idle = self._idle[(trend_req.hl, trend_req.tz, trend_req.proxy)]
+            if len(idle) < self.max_idle:
+                idle.append(trend_req)
+                return
+
+        trend_req.close()
+
+    @contextmanager
+    def session(self, hl: str, tz: int, proxy: Optional[str] = None) -> Iterator[PooledTrendReq]:
+        """
+        Check out a session for a single search.
+
+        Args:
+            - hl (str): Language of the session.
+            - tz (int): Timezone offset of the session.
+            - proxy (str | None): Proxy URL of the session, None to connect directly.
+
+        Yields:
+            - PooledTrendReq: The checked out session.
+        """
+        trend_req = self._checkout(hl=hl, tz=tz, proxy=proxy)
+
+        try:
+            yield trend_req
+        except (exceptions.TooManyRequestsError, requests.RequestException):
+            increment_metric(TRENDS_SESSIONS_ROTATED)
+            trend_req.close()
+            raise
+        except BaseException:
+            self._release(trend_req)
+            raise
+        else:
+            self._release(trend_req)
+
+
+trends_session_pool = TrendReqPool(
+    max_idle=settings.TRENDS_SESSION_POOL_MAX_IDLE,
+    cookie_max_age=settings.TRENDS_SESSION_COOKIE_MAX_AGE
+)
@@ -0,0 +1,229 @@
+import json
+import time
+import uuid
+import logging
+import threading
+import contextlib
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import redis
+
+from app.core.conf import settings
+from app.core.redis import get_redis_client
+from app.exceptions import CoalescedRequestFailed
+from app.core.metrics import TRENDS_REQUESTS_COALESCED, TRENDS_SINGLE_FLIGHT_FALLBACKS, increment_metric
+
+
+logger = logging.getLogger(__name__)
+
+
+# Release the lease only if it is still held by the same owner, so an expired lease taken over by another worker
+# is never released by the previous owner.
+RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Extend the lease only if it is still held by the same owner
+RENEW_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+FAILED_FLIGHT_MARKER = {'failed': True}
+
+
+def renew_lease(client: redis.Redis, lease_key: str, token: str, timeout: int, stopped: threading.Event) -> None:
+    """
+    Renew a lease every third of its timeout until stopped, or until the lease is lost.
+
+    Args:
+        - client (redis.Redis): The redis client.
+        - lease_key (str): Redis key of the lease.
+        - token (str): Token of the lease holder.
+        - timeout (int): Seconds the lease is extended by.
+        - stopped (threading.Event): Set once the lease is not needed anymore.
+    """
+    while not stopped.wait(timeout / 3):
+        try:
+            if not client.eval(RENEW_LEASE_SCRIPT, 1, lease_key, token, timeout):
+                return
+        except redis.RedisError:
+            logger.warning("Failed to renew the lease %s", lease_key, exc_info=True)
+
+
+@contextlib.contextmanager
+def hold_lease(client: redis.Redis, lease_key: str, token: str, timeout: int) -> Iterator[None]:
+    """
+    Keep a lease from expiring within the block, such as while its holder waits for the rate limit and performs the
+    request, so the lease only expires once its holder crashed.
+
+    Args:
+        - client (redis.Redis): The redis client.
+        - lease_key (str): Redis key of the lease.
+        - token (str): Token of the lease holder.
+        - timeout (int): Seconds the lease is extended by.
+    """
+    stopped = threading.Event()
+    renewer = threading.Thread(
+        target=renew_lease,
+        kwargs={'client': client, 'lease_key': lease_key, 'token': token, 'timeout': timeout, 'stopped': stopped},
+        daemon=True
+    )
+    renewer.start()
+
+    try:
+        yield
+    finally:
+        stopped.set()
+        renewer.join()
+
+
+class SingleFlight:
+    """
+    Distributed single flight that coalesces concurrent identical requests across all the trends workers.
+
+    The first worker takes a short redis lease for the request key and performs the request, while the others wait
+    for its result instead of issuing duplicate requests. The lease is renewed for as long as the request takes, which
+    includes waiting for the rate limit, so it only expires if the worker crashed. Waiters fall back to performing the
+    request themselves if the result does not arrive within a bounded wait.
+    """
+
+    def __init__(
+            self,
+            prefix: str = 'trends:flight',
+            lease_timeout: int = 30,
+            wait_timeout: float = 90,
+            poll_interval: float = 0.2
+        ) -> None:
+        """
+        Initialize the single flight.
+
+        Args:
+            - prefix (str): Prefix of the redis keys.
+            - lease_timeout (int): Seconds after which the lease of a crashed worker expires, the lease of a worker
+              performing the request is renewed every third of it.
+            - wait_timeout (float): Maximum seconds to wait for the result of another worker, which should cover the
+              rate limit wait and the request of that worker.
+            - poll_interval (float): Seconds between result checks while waiting.
+        """
+        self.prefix = prefix
+        self.lease_timeout = lease_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    def _get_lease_key(self, key: str) -> str:
+        return f'{self.prefix}:lease:{key}'
+
+    def _get_result_key(self, key: str) -> str:
+        return f'{self.prefix}:result:{key}'
+
+    def _publish(self, client: redis.Redis, key: str, token: str, outcome: Dict[str, Any]) -> None:
+        """
+        Share the outcome of the request with the waiting workers and release the lease.
+        """
+        try:
+            client.set(self._get_result_key(key), json.dumps(outcome), ex=self.lease_timeout)
+            client.eval(RELEASE_LEASE_SCRIPT, 1, self._get_lease_key(key), token)
+        except redis.RedisError:
+            logger.warning("Failed to publish the single flight outcome", exc_info=True)
+
+    def _lead(self, client: redis.Redis, key: str, token: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Perform the request while holding the lease.
+        """
+        lease_key = self._get_lease_key(key)
+
+        try:
+            with hold_lease(client=client, lease_key=lease_key, token=token, timeout=self.lease_timeout):
+                result = fetch()
+        except Exception:
+            self._publish(client=client, key=key, token=token, outcome=FAILED_FLIGHT_MARKER)
+            raise
+
+        self._publish(client=client, key=key, token=token, outcome={'result': result})
+        return result
+
+    def _acquire(self, client: redis.Redis, key: str, token: str) -> bool:
+        """
+        Try to take the lease of the key.
+        """
+        if not client.set(self._get_lease_key(key), token, nx=True, ex=self.lease_timeout):
+            return False
+
+        # Drop the outcome of a previous flight, so waiters only ever see the outcome of this one
+        client.delete(self._get_result_key(key))
+        return True
+
+    def _acquire_or_wait(self, client: redis.Redis, key: str, token: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Take the lease of the key, or wait for the outcome of the worker holding it.
+
+        Returns:
+            - Tuple[bool, Dict | None]: Whether the lease was taken, and the outcome of the lease holder if it arrived
+              within the bounded wait.
+        """
+        result_key = self._get_result_key(key)
+        deadline = time.monotonic() + self.wait_timeout
+
+        if self._acquire(client=client, key=key, token=token):
+            return True, None
+
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+
+            # Check the outcome before retaking the lease, since the lease holder releases it once its outcome is out
+            outcome = client.get(result_key)
+            if outcome is not None:
+                return False, json.loads(outcome)
+
+            if self._acquire(client=client, key=key, token=token):
+                return True, None
+
+        return False, None
+
+    def run(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Run the request once across all the workers requesting the same key at the same moment.
+
+        Args:
+            - key (str): Key identifying identical requests.
+            - fetch (Callable): Performs the request, its result must be json serializable.
+
+        Returns:
+            - Any: The result of the request, performed either by this worker or by the lease holder.
+
+        Raises:
+            - CoalescedRequestFailed: If the lease holder failed to perform the request.
+        """
+        client = get_redis_client()
+        token = uuid.uuid4().hex
+
+        try:
+            is_leader, outcome = self._acquire_or_wait(client=client, key=key, token=token)
+        except redis.RedisError:
+            logger.warning("Single flight is unavailable, performing the request directly", exc_info=True)
+            return fetch()
+
+        if is_leader:
+            return self._lead(client=client, key=key, token=token, fetch=fetch)
+
+        if outcome is None:
+            increment_metric(TRENDS_SINGLE_FLIGHT_FALLBACKS)
+            return fetch()
+
+        if outcome == FAILED_FLIGHT_MARKER:
+            raise CoalescedRequestFailed("Coalesced Google Trends request failed")
+
+        increment_metric(TRENDS_REQUESTS_COALESCED)
+        return outcome['result']
+
+
+trends_single_flight = SingleFlight(
+    lease_timeout=settings.TRENDS_SINGLE_FLIGHT_LEASE_TIMEOUT,
+    wait_timeout=settings.TRENDS_SINGLE_FLIGHT_WAIT_TIMEOUT
+)
@@ -1,14 +1,64 @@
+from functools import partial
 from typing import List, Dict, Any
 
 import httpx
+import requests
 from celery import shared_task, chain
-from pytrends.request import TrendReq
 from pytrends.exceptions import ResponseError
 
 from app.core.conf import settings
+from app.utils import build_payload_params, convert_interest_over_time
 from app.schemas.task import PropertyEnum
 from app.exceptions import TrendRequestFailed
 from app.celery.base_task import TrendTask
+from app.celery.egress import trends_egress_pool
+from app.celery.batching import trends_keyword_batcher
+from app.celery.rate_limit import trends_rate_limiter
+from app.celery.sessions import trends_session_pool
+from app.celery.single_flight import trends_single_flight
+from app.celery.cache import trends_result_cache, get_payload_digest, order_results
+
+
+def fetch_interest_over_time(payload_params: Dict[str, Any], tz: int) -> List[Dict[str, Any]]:
+    """
+    Fetch the interest over time of a search from Google Trends.
+
+    Args:
+        - payload_params (Dict[str, Any]): The pytrends `build_payload` parameters.
+        - tz (int): Timezone offset.
+
+    Returns:
+        - List[Dict[str, Any]]: Google Trends search results
+
+    Raises:
+        - TrendRequestFailed: If Google Trends responds with an error.
+        - RateLimitExceeded: If the rate limiter does not permit the request within its maximum wait.
+    """
+    # Route the request through the healthiest egress, every egress is rate limited by Google on its own
+    egress = trends_egress_pool.select()
+
+    # Wait for the cluster wide rate limiter of the egress, as checking out a session may already reach Google
+    trends_rate_limiter.acquire(scope=egress.name)
+
+    try:
+        # Check out a warmed pytrends session of this worker process, tracking the health of the egress
+        with trends_egress_pool.track(egress):
+            with trends_session_pool.session(hl='en-US', tz=tz, proxy=egress.proxy) as pytrends:
+                # Build the payload
+                pytrends.build_payload(**payload_params)
+
+                # Fetch interest over time
+                interest_over_time_df = pytrends.interest_over_time()
+    except ResponseError:
+        trends_rate_limiter.record_throttle(scope=egress.name)
+        raise TrendRequestFailed("Failed to fetch Google Trends data")
+    except requests.RequestException:
+        raise TrendRequestFailed(f"Failed to reach Google Trends through egress {egress.name}")
+    else:
+        trends_rate_limiter.record_success(scope=egress.name)
+
+        # Convert DataFrame to list of dictionaries
+        return convert_interest_over_time(interest_over_time_df)
 
 
 @shared_task(
@@ -19,7 +69,9 @@ from app.celery.base_task import TrendTask
     throws=(TrendRequestFailed, ),
     autoretry_for=(TrendRequestFailed, ),
     max_retries=5,
-    default_retry_delay=5
+    retry_backoff=5,  # Exponential backoff starting at 5 seconds
+    retry_backoff_max=600,
+    retry_jitter=True
 )
 def trends_search_task(
         q: str | List[str],
@@ -44,58 +96,41 @@ def trends_search_task(
     Returns:
         - Dict[str, Any]: Google Trends search results
     """
-    try:
-        # Initialize pytrends
-        pytrends = TrendReq(
-            hl='en-US',  # Language
-            tz=tz or -300  # Default to Eastern Time if not specified
+    # Convert single string to list if needed
+    keywords = q if isinstance(q, list) else [q]
+    tz = tz or -300  # Default to Eastern Time if not specified
+
+    # Prepare the build payload parameters
+    payload_params = build_payload_params(keywords=keywords, geo=geo, time=time, cat=cat, gprop=gprop)
+
+    # Serve identical searches from the shared result cache without reaching Google
+    cached_results = trends_result_cache.get(payload_params=payload_params, tz=tz)
+    if cached_results is not None:
+        return cached_results
+
+    results = None
+
+    # Pack single keyword searches sharing the same non keyword parameters into requests of up to five keywords
+    if len(keywords) == 1:
+        results = trends_keyword_batcher.run(
+            key=get_payload_digest(payload_params={**payload_params, 'kw_list': []}, tz=tz),
+            keyword=keywords[0],
+            fetch=lambda batch_keywords: fetch_interest_over_time(
+                payload_params={**payload_params, 'kw_list': batch_keywords},
+                tz=tz
+            )
         )
 
-        # Convert single string to list if needed
-        keywords = q if isinstance(q, list) else [q]
-
-        # Prepare the build payload parameters
-        payload_params = {
-            'kw_list': keywords,
-            'geo': '',
-            'timeframe': 'today 5-y',  # Default to 5 years if not specified
-            'cat': 0,
-            'gprop': ''
-        }
-
-        # Add optional parameters
-        if geo:
-            payload_params['geo'] = geo
-        if time:
-            payload_params['timeframe'] = time
-        if cat:
-            payload_params['cat'] = cat
-        if gprop and gprop != 'web':  # Default is 'web', so only set if not 'web'
-            payload_params['gprop'] = gprop
-
-        # Build the payload
-        pytrends.build_payload(**payload_params)
-
-        # Fetch interest over time
-        interest_over_time_df = pytrends.interest_over_time()
-
-        # Convert DataFrame to list of dictionaries
-        interest_over_time_list = interest_over_time_df.reset_index().to_dict('records')
+    # Coalesce identical searches that are in flight on other workers into a single request
+    if results is None:
+        results = trends_single_flight.run(
+            key=get_payload_digest(payload_params=payload_params, tz=tz),
+            fetch=partial(fetch_interest_over_time, payload_params=payload_params, tz=tz)
+        )
+        results = order_results(results=results, keywords=keywords)
 
-    except ResponseError:
-        raise TrendRequestFailed("Failed to fetch Google Trends data")
-    else:
-        # Prepare results dictionary
-        results = []
-        for interest in interest_over_time_list:
-            results.append({
-                "date": interest["date"].isoformat(),
-                "is_partial": interest["isPartial"],
-                "q_list": [
-                    {"query": ky, "value": interest[ky]} for ky in interest.keys() if ky not in ["date", "isPartial"]
-                ]
-            })
-        return results
+    trends_result_cache.set(payload_params=payload_params, tz=tz, results=results)
+    return results
 
 
 @shared_task(
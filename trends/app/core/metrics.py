@@ -0,0 +1,252 @@
+import enum
+import logging
+from typing import Iterator, NamedTuple, Optional
+
+import redis
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+from app.core.redis import get_redis_client
+
+
+logger = logging.getLogger(__name__)
+
+
+WORKER_METRICS_KEY = 'trends:worker:metrics'
+
+
+class MetricType(enum.Enum):
+    COUNTER = 'counter'
+    GAUGE = 'gauge'
+
+
+class WorkerMetric(NamedTuple):
+    name: str
+    type: MetricType
+    documentation: str
+    # Name of the label of a metric recorded for many values of that label, such as the scopes of the rate limiter
+    label: Optional[str] = None
+
+
+TRENDS_CACHE_HITS = WorkerMetric(
+    name='trends_cache_hits',
+    type=MetricType.COUNTER,
+    documentation='Number of trends searches served from the shared result cache.'
+)
+
+TRENDS_CACHE_MISSES = WorkerMetric(
+    name='trends_cache_misses',
+    type=MetricType.COUNTER,
+    documentation='Number of trends searches that were not found in the shared result cache.'
+)
+
+TRENDS_REQUESTS_COALESCED = WorkerMetric(
+    name='trends_requests_coalesced',
+    type=MetricType.COUNTER,
+    documentation='Number of trends searches served by the in-flight request of another worker.'
+)
+
+TRENDS_SINGLE_FLIGHT_FALLBACKS = WorkerMetric(
+    name='trends_single_flight_fallbacks',
+    type=MetricType.COUNTER,
+    documentation='Number of trends searches that gave up waiting for another worker and fetched by themselves.'
+)
+
+TRENDS_BATCHED_REQUESTS = WorkerMetric(
+    name='trends_batched_requests',
+    type=MetricType.COUNTER,
+    documentation='Number of Google Trends requests that packed pending single keyword searches.'
+)
+
+TRENDS_BATCHED_KEYWORDS = WorkerMetric(
+    name='trends_batched_keywords',
+    type=MetricType.COUNTER,
+    documentation='Number of keywords packed into batched Google Trends requests.'
+)
+
+TRENDS_BATCH_LOW_RESOLUTION_KEYWORDS = WorkerMetric(
+    name='trends_batch_low_resolution_keywords',
+    type=MetricType.COUNTER,
+    documentation='Number of batched keywords whose packed peak was too low to rescale and were fetched on their own.'
+)
+
+TRENDS_RATE_LIMIT_RATE = WorkerMetric(
+    name='trends_rate_limit_rate',
+    type=MetricType.GAUGE,
+    documentation='Google Trends requests per second currently permitted by the adaptive rate limiter, by scope.',
+    label='scope'
+)
+
+TRENDS_RATE_LIMIT_WAIT_SECONDS = WorkerMetric(
+    name='trends_rate_limit_wait_seconds',
+    type=MetricType.COUNTER,
+    documentation='Seconds the trends workers spent waiting for the rate limiter.'
+)
+
+TRENDS_RATE_LIMIT_THROTTLED = WorkerMetric(
+    name='trends_rate_limit_throttled',
+    type=MetricType.COUNTER,
+    documentation='Number of Google Trends requests rejected by Google.'
+)
+
+TRENDS_SESSIONS_CREATED = WorkerMetric(
+    name='trends_sessions_created',
+    type=MetricType.COUNTER,
+    documentation='Number of pytrends sessions created by the workers.'
+)
+
+TRENDS_SESSIONS_ROTATED = WorkerMetric(
+    name='trends_sessions_rotated',
+    type=MetricType.COUNTER,
+    documentation='Number of pytrends sessions discarded after being throttled or failing to connect.'
+)
+
+TRENDS_EGRESS_AVAILABLE = WorkerMetric(
+    name='trends_egress_available',
+    type=MetricType.GAUGE,
+    documentation='Number of egresses whose circuit is closed.'
+)
+
+TRENDS_EGRESS_FAILURES = WorkerMetric(
+    name='trends_egress_failures',
+    type=MetricType.COUNTER,
+    documentation='Number of Google Trends requests that failed or got throttled through an egress.'
+)
+
+TRENDS_EGRESS_CIRCUITS_OPENED = WorkerMetric(
+    name='trends_egress_circuits_opened',
+    type=MetricType.COUNTER,
+    documentation='Number of times the circuit of an egress was opened.'
+)
+
+TRENDS_CALLBACK_REQUESTS = WorkerMetric(
+    name='trends_callback_requests',
+    type=MetricType.COUNTER,
+    documentation='Number of bulk callback requests sent to the task service.'
+)
+
+TRENDS_CALLBACKS_COALESCED = WorkerMetric(
+    name='trends_callbacks_coalesced',
+    type=MetricType.COUNTER,
+    documentation='Number of task callbacks coalesced into a queued callback of the same task.'
+)
+
+TRENDS_CALLBACKS_DROPPED = WorkerMetric(
+    name='trends_callbacks_dropped',
+    type=MetricType.COUNTER,
+    documentation='Number of task callbacks dropped after the task service stayed unavailable.'
+)
+
+TRENDS_RESULTS_PERSISTED = WorkerMetric(
+    name='trends_results_persisted',
+    type=MetricType.COUNTER,
+    documentation='Number of task status updates written straight to the task service database.'
+)
+
+TRENDS_RESULTS_PERSISTENCE_FALLBACKS = WorkerMetric(
+    name='trends_results_persistence_fallbacks',
+    type=MetricType.COUNTER,
+    documentation='Number of task status updates sent through the task service after the database write failed.'
+)
+
+WORKER_METRICS = [
+    TRENDS_CACHE_HITS,
+    TRENDS_CACHE_MISSES,
+    TRENDS_REQUESTS_COALESCED,
+    TRENDS_SINGLE_FLIGHT_FALLBACKS,
+    TRENDS_BATCHED_REQUESTS,
+    TRENDS_BATCHED_KEYWORDS,
+    TRENDS_BATCH_LOW_RESOLUTION_KEYWORDS,
+    TRENDS_RATE_LIMIT_RATE,
+    TRENDS_RATE_LIMIT_WAIT_SECONDS,
+    TRENDS_RATE_LIMIT_THROTTLED,
+    TRENDS_SESSIONS_CREATED,
+    TRENDS_SESSIONS_ROTATED,
+    TRENDS_EGRESS_AVAILABLE,
+    TRENDS_EGRESS_FAILURES,
+    TRENDS_EGRESS_CIRCUITS_OPENED,
+    TRENDS_CALLBACK_REQUESTS,
+    TRENDS_CALLBACKS_COALESCED,
+    TRENDS_CALLBACKS_DROPPED,
+    TRENDS_RESULTS_PERSISTED,
+    TRENDS_RESULTS_PERSISTENCE_FALLBACKS,
+]
+
+
+def increment_metric(metric: WorkerMetric, amount: float = 1) -> None:
+    """
+    Increment a worker metric shared by all the trends workers.
+
+    Metrics are best effort, so a redis failure is logged and never propagated to the calling task.
+
+    Args:
+        - metric (WorkerMetric): The metric to increment.
+        - amount (float): The amount to increment the metric by.
+    """
+    try:
+        get_redis_client().hincrbyfloat(WORKER_METRICS_KEY, metric.name, amount)
+    except redis.RedisError:
+        logger.warning("Failed to increment worker metric %s", metric.name, exc_info=True)
+
+
+def get_metric_field(metric: WorkerMetric, label_value: Optional[str] = None) -> str:
+    """
+    Get the field of a worker metric in the redis hash of the worker metrics.
+
+    Args:
+        - metric (WorkerMetric): The metric.
+        - label_value (str | None): Value of the label of the metric, for labeled metrics.
+
+    Returns:
+        - str: The field of the metric.
+    """
+    return metric.name if metric.label is None else f'{metric.name}:{label_value}'
+
+
+def set_metric(metric: WorkerMetric, value: float, label_value: Optional[str] = None) -> None:
+    """
+    Set the current value of a worker metric shared by all the trends workers.
+
+    Args:
+        - metric (WorkerMetric): The metric to set.
+        - value (float): The new value of the metric.
+        - label_value (str | None): Value of the label of the metric, for labeled metrics.
+    """
+    try:
+        get_redis_client().hset(WORKER_METRICS_KEY, get_metric_field(metric=metric, label_value=label_value), value)
+    except redis.RedisError:
+        logger.warning("Failed to set worker metric %s", metric.name, exc_info=True)
+
+
+class WorkerMetricsCollector(Collector):
+    """
+    Prometheus collector that exposes the metrics recorded by the celery workers.
+
+    Workers are not scraped directly, so they record their metrics in redis and the API service exposes them
+    alongside its own metrics.
+    """
+
+    def collect(self) -> Iterator[Metric]:
+        try:
+            values = get_redis_client().hgetall(WORKER_METRICS_KEY)
+        except redis.RedisError:
+            logger.warning("Failed to collect worker metrics", exc_info=True)
+            return
+
+        for metric in WORKER_METRICS:
+            metric_family_class = CounterMetricFamily if metric.type is MetricType.COUNTER else GaugeMetricFamily
+
+            if metric.label is None:
+                yield metric_family_class(
+                    metric.name,
+                    metric.documentation,
+                    value=float(values.get(metric.name, 0))
+                )
+                continue
+
+            metric_family = metric_family_class(metric.name, metric.documentation, labels=[metric.label])
+            field_prefix = get_metric_field(metric=metric, label_value='')
+            for field, value in values.items():
+                if field.startswith(field_prefix):
+                    metric_family.add_metric([field[len(field_prefix):]], float(value))
+            yield metric_family
@@ -0,0 +1,55 @@
+import asyncio
+import weakref
+from functools import lru_cache
+
+import redis
+import redis.asyncio
+
+from app.core.conf import settings
+
+
+@lru_cache
+def get_redis_client() -> redis.Redis:
+    """
+    Get the shared redis client of the current process.
+
+    The client is created lazily on first use, and its connection pool is safe to be used across celery forked
+    worker processes, as redis-py resets the pool whenever it detects a new process id.
+
+    Returns:
+        - redis.Redis: The redis client.
+    """
+    return redis.Redis.from_url(
+        settings.REDIS_URL,
+        decode_responses=True
+    )
+
+
+_async_redis_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, redis.asyncio.Redis]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_redis_client() -> redis.asyncio.Redis:
+    """
+    Get the shared async redis client of the running event loop.
+
+    Async connections are bound to the event loop they were opened on, so every event loop gets its own client, which
+    is created lazily on first use. Its connections are capped, and the commands beyond the cap wait for a connection
+    to be released, so bursts of concurrent requests do not open a connection each.
+
+    Returns:
+        - redis.asyncio.Redis: The async redis client.
+    """
+    loop = asyncio.get_running_loop()
+
+    client = _async_redis_clients.get(loop)
+    if client is None:
+        connection_pool = redis.asyncio.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            decode_responses=True
+        )
+        client = _async_redis_clients[loop] = redis.asyncio.Redis(connection_pool=connection_pool)
+
+    return client
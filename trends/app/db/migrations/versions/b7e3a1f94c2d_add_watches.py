@@ -0,0 +1,64 @@
+"""add watches
+
+Revision ID: b7e3a1f94c2d
+Revises: 5c1e8a7d2b6f
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3a1f94c2d'
+down_revision: Union[str, None] = '5c1e8a7d2b6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('watches',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('q', sa.ARRAY(sa.String()), nullable=True),
+    sa.Column('geo', sa.String(), nullable=True),
+    sa.Column('cat', sa.Integer(), nullable=True),
+    # The enum type is shared with the tasks table
+    sa.Column('gprop', postgresql.ENUM(name='propertyenum', create_type=False), nullable=True),
+    sa.Column('tz', sa.Integer(), nullable=True),
+    sa.Column('interval', sa.Integer(), nullable=True),
+    sa.Column('lookback_days', sa.Integer(), nullable=True),
+    sa.Column('series', sa.JSON(), nullable=True),
+    sa.Column('error', sa.JSON(), nullable=True),
+    sa.Column('run_task_id', sa.UUID(), nullable=True),
+    sa.Column('last_run_at', sa.DateTime(), nullable=True),
+    sa.Column('next_run_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_watches_next_run_at_idle',
+        'watches',
+        ['next_run_at'],
+        unique=False,
+        postgresql_where=sa.text('run_task_id IS NULL')
+    )
+    op.create_index(
+        'ix_watches_run_task_id',
+        'watches',
+        ['run_task_id'],
+        unique=False,
+        postgresql_where=sa.text('run_task_id IS NOT NULL')
+    )
+    op.create_index('ix_watches_user_id_created_at', 'watches', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_watches_user_id_created_at', table_name='watches')
+    op.drop_index('ix_watches_run_task_id', table_name='watches', postgresql_where=sa.text('run_task_id IS NOT NULL'))
+    op.drop_index('ix_watches_next_run_at_idle', table_name='watches', postgresql_where=sa.text('run_task_id IS NULL'))
+    op.drop_table('watches')
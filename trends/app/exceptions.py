@@ -1,3 +1,19 @@
 
 class TrendRequestFailed(Exception):
     ...
+
+
+class CoalescedRequestFailed(TrendRequestFailed):
+    ...
+
+
+class RateLimitExceeded(TrendRequestFailed):
+    ...
+
+
+class InvalidCursor(ValueError):
+    message = "The pagination cursor is invalid."
+
+
+class RequestInProgress(Exception):
+    message = "A request with the same idempotency key is being applied."
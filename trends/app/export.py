@@ -0,0 +1,45 @@
+import zlib
+from typing import Any, AsyncIterator
+
+import pydantic
+
+
+# Lines are sent in chunks of about this size, rather than a chunk per row
+CHUNK_SIZE = 64 * 1024
+
+
+async def stream_ndjson(
+        rows: AsyncIterator[Any],
+        schema: type[pydantic.BaseModel],
+        compress: bool = False
+    ) -> AsyncIterator[bytes]:
+    """
+    Encode rows as newline delimited JSON, one JSON document per line, as they are read.
+
+    Only a chunk of lines is held in memory at any time, no matter how many rows are encoded.
+
+    Args:
+        - rows (AsyncIterator[Any]): The rows to encode.
+        - schema (type[BaseModel]): A Pydantic model class that defines the structure of every line.
+        - compress (bool): Whether to compress the lines with gzip.
+
+    Returns:
+        - AsyncIterator[bytes]: Chunks of the encoded lines.
+    """
+    # A gzip container rather than a raw deflate stream, selected by the window bits
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    chunk = bytearray()
+
+    async for row in rows:
+        line = schema.model_validate(row).model_dump_json(by_alias=True).encode() + b'\n'
+        chunk += compressor.compress(line) if compressor else line
+
+        if len(chunk) >= CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk.clear()
+
+    if compressor:
+        chunk += compressor.flush()
+
+    if chunk:
+        yield bytes(chunk)
@@ -2,7 +2,7 @@ import uuid
 import enum
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ARRAY, Enum ,UUID
+from sqlalchemy import Index, text, Column, Integer, String, DateTime, JSON, ARRAY, Enum ,UUID
 from shared_utils.db.base import Base
 from shared_utils.schemas.status import TaskStatus
 
@@ -17,6 +17,13 @@ class PropertyEnum(enum.Enum):
 
 class Task(Base):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # Keyset pagination of the tasks of a user, and of all the tasks, newest first
+        Index('ix_tasks_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        Index('ix_tasks_created_at_id', 'created_at', 'id'),
+        # Due tasks polled by the scheduler, which only holds the tasks scheduled for later and not dispatched yet
+        Index('ix_tasks_schedule_at_undispatched', 'schedule_at', postgresql_where=text('dispatched_at IS NULL')),
+    )
 
     id = Column(UUID(as_uuid=True), index=True, primary_key=True, default=uuid.uuid4)
     user_id = Column(Integer, index=True)
@@ -27,6 +34,7 @@ class Task(Base):
     gprop = Column(Enum(PropertyEnum), default=PropertyEnum.WEB_SEARCH)
     tz = Column(Integer, default=0)
     schedule_at = Column(DateTime, default=datetime.now)
+    dispatched_at = Column(DateTime, nullable=True)
 
     status = Column(Enum(TaskStatus), default=TaskStatus.PENDING)
     result_data = Column(JSON, nullable=True)
@@ -0,0 +1,38 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Index, text, Column, Integer, String, DateTime, JSON, ARRAY, Enum, UUID
+from shared_utils.db.base import Base
+
+from app.models.task import PropertyEnum
+
+
+class Watch(Base):
+    __tablename__ = 'watches'
+    __table_args__ = (
+        # Watches due for a run, polled by the scheduler, which only holds the watches without a run in progress
+        Index('ix_watches_next_run_at_idle', 'next_run_at', postgresql_where=text('run_task_id IS NULL')),
+        # Watches whose run is in progress, polled by the scheduler for the runs that finished
+        Index('ix_watches_run_task_id', 'run_task_id', postgresql_where=text('run_task_id IS NOT NULL')),
+        # Listing of the watches of a user
+        Index('ix_watches_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(Integer)
+    q = Column(ARRAY(String))
+    geo = Column(String)
+    cat = Column(Integer, default=0)
+    gprop = Column(Enum(PropertyEnum), default=PropertyEnum.WEB_SEARCH)
+    tz = Column(Integer, default=0)
+    interval = Column(Integer)
+    lookback_days = Column(Integer)
+
+    series = Column(JSON, nullable=True)
+    error = Column(JSON, nullable=True)
+    run_task_id = Column(UUID(as_uuid=True), nullable=True)
+    last_run_at = Column(DateTime, nullable=True)
+    next_run_at = Column(DateTime, default=datetime.now)
+
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
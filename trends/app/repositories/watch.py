@@ -0,0 +1,219 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from fastapi import Depends
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from shared_utils.db.session import get_db
+from shared_utils.exceptions import ObjAlreadyExist, ObjDoesNotExist
+from shared_utils.repository.sqlalchemy import SQLAlchemyModelRepository
+
+from app.models.task import Task
+from app.models.watch import Watch
+from app.cache import TERMINAL_STATUSES
+
+
+class WatchModelRepository(SQLAlchemyModelRepository[Watch]):
+    """
+    WatchModelRepository is a repository class for managing Watch instances.
+    It provides methods to create, retrieve, run, and delete Watch records
+    in the database using SQLAlchemy ORM.
+    """
+    async def create(self, id: str, user_id: int, q: list, **other_fields) -> Watch:
+        """
+        Create a new watch.
+
+        Args:
+            - id (str): Watch id to create.
+            - user_id (int): Watch user_id to create.
+            - q (list): Watch q to create.
+            - **other_fields: Remaining fields to create.
+
+        Returns:
+            - Watch: The created watch instance.
+
+        Raises:
+            - ObjAlreadyExist: If a watch with the same id exists.
+        """
+        statement = (
+            insert(Watch)
+            .values(id=id, user_id=user_id, q=q, **other_fields)
+            .on_conflict_do_nothing(index_elements=[Watch.id])
+            .returning(Watch)
+        )
+
+        result = await self.db.execute(statement)
+        watch = result.scalar_one_or_none()
+
+        if watch is None:
+            raise ObjAlreadyExist
+
+        # Detach the created watch, so committing does not expire the values it was returned with
+        self.db.expunge(watch)
+        await self.db.commit()
+
+        return watch
+
+    async def get_by_user_id(self, id: str, user_id: int) -> Watch:
+        """
+        Get watch by watch id & user id.
+
+        Args:
+            - id (str): Watch id to search for.
+            - user_id (int): User id to search for.
+
+        Returns:
+            - Watch: The watch instance if found.
+
+        Raises:
+            - ObjDoesNotExist: If no instance is found with the given ID.
+        """
+        results = await self.filter_by(id=id, user_id=user_id)
+
+        if not results:
+            raise ObjDoesNotExist
+
+        return results[0]
+
+    async def claim_finished_runs(
+            self,
+            now: datetime,
+            run_timeout: int,
+            limit: int
+        ) -> Sequence[Tuple[Watch, Optional[Task]]]:
+        """
+        Claim the watches whose run completed or failed, along with the task of the run.
+
+        Runs whose task was deleted, or that did not finish within the run timeout, such as when their task message
+        was lost, are claimed as well, so their watches run again.
+
+        The claimed watches stay locked until the session commits or rolls back, and the watches locked by other
+        sessions are skipped, so concurrent claims never overlap.
+
+        Args:
+            - now (datetime): The current time, which the runs time out by.
+            - run_timeout (int): Seconds after which a run that did not finish is given up.
+            - limit (int): Maximum number of watches to claim.
+
+        Returns:
+            - Sequence[Tuple[Watch, Task | None]]: The claimed watches, with the tasks of their runs, None for the
+              runs whose task was deleted.
+        """
+        statement = (
+            select(Watch, Task)
+            .outerjoin(Task, Task.id == Watch.run_task_id)
+            .where(
+                Watch.run_task_id.is_not(None),
+                or_(
+                    Task.id.is_(None),
+                    Task.status.in_(TERMINAL_STATUSES),
+                    # Runs are started along with their last run time
+                    Watch.last_run_at <= now - timedelta(seconds=run_timeout)
+                )
+            )
+            .limit(limit)
+            .with_for_update(of=Watch, skip_locked=True)
+        )
+
+        result = await self.db.execute(statement)
+        return result.tuples().all()
+
+    async def claim_due(self, now: datetime, limit: int) -> Sequence[Watch]:
+        """
+        Claim the watches due for a run, without a run in progress, earliest first.
+
+        The claimed watches stay locked until the session commits or rolls back, and the watches locked by other
+        sessions are skipped, so concurrent claims never overlap.
+
+        Args:
+            - now (datetime): The current time, which the watches are due by.
+            - limit (int): Maximum number of watches to claim.
+
+        Returns:
+            - Sequence[Watch]: The claimed watches.
+        """
+        statement = (
+            select(Watch)
+            .where(Watch.run_task_id.is_(None), Watch.next_run_at <= now)
+            .order_by(Watch.next_run_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+
+        result = await self.db.execute(statement)
+        return result.scalars().all()
+
+    def start_run(self, watch: Watch, time: str, now: datetime, next_run_at: datetime) -> Task:
+        """
+        Start a run of a claimed watch, as a task fetching the given time range, which is left to the scheduler to
+        dispatch. The run is saved once the session commits.
+
+        Args:
+            - watch (Watch): The claimed watch.
+            - time (str): Time range fetched by the run.
+            - now (datetime): The current time, which the task is scheduled at.
+            - next_run_at (datetime): Time of the following run.
+
+        Returns:
+            - Task: The task of the run.
+        """
+        task = Task(
+            id=uuid.uuid4(),
+            user_id=watch.user_id,
+            q=watch.q,
+            geo=watch.geo,
+            time=time,
+            cat=watch.cat,
+            gprop=watch.gprop,
+            tz=watch.tz,
+            schedule_at=now
+        )
+        self.db.add(task)
+
+        watch.run_task_id = task.id
+        watch.last_run_at = now
+        watch.next_run_at = next_run_at
+
+        return task
+
+    def finish_run(self, watch: Watch, series: Optional[Dict[str, Any]], error: Optional[Dict[str, Any]]) -> None:
+        """
+        Finish the run of a claimed watch. The run is saved once the session commits.
+
+        Args:
+            - watch (Watch): The claimed watch.
+            - series (Dict[str, Any] | None): The series of the watch, merged with the results of the run.
+            - error (Dict[str, Any] | None): The error of the run, None if it completed.
+        """
+        watch.series = series
+        watch.error = error
+        watch.run_task_id = None
+
+    async def delete(self, id: str) -> None:
+        """
+        Delete a watch instance.
+
+        Args:
+            - id (str): Watch id to delete.
+
+        Raises:
+            - ObjDoesNotExist: If no instance is found with the given ID.
+        """
+        await super().delete(id=id)
+
+
+def get_watch_repository(db: AsyncSession = Depends(get_db)) -> WatchModelRepository:
+    """
+    Dependency to get the WatchModelRepository instance.
+
+    Args:
+        - db (AsyncSession): The database session.
+
+    Returns:
+        - WatchModelRepository: The WatchModelRepository instance.
+    """
+    return WatchModelRepository(
+        db=db
+    )
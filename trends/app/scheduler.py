@@ -0,0 +1,295 @@
+"""
+Schedulers dispatching the tasks scheduled for later to the workers once they are due, and running the watches.
+
+Run from the trends service directory:
+
+    python -m app.scheduler
+"""
+import abc
+import signal
+import asyncio
+import logging
+import contextlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from kombu.exceptions import OperationalError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from shared_utils.schemas.status import TaskStatus
+
+from app.core.conf import settings
+from app.models.task import Task
+from app.models.watch import Watch
+from app.schemas.task import TaskCreate
+from app.repositories.task import TaskModelRepository
+from app.repositories.watch import WatchModelRepository
+from app.utils import compact_results, get_watch_timeframe, merge_series
+from app.celery.tasks import trends_search_task
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_due(schedule_at: Optional[datetime]) -> bool:
+    """
+    Check whether a task scheduled at the given time is due.
+
+    Args:
+        - schedule_at (datetime | None): Time the task is scheduled at, None if it is not scheduled.
+
+    Returns:
+        - bool: True if the task is due, False if it is scheduled for later.
+    """
+    return schedule_at is None or schedule_at <= datetime.now()
+
+
+def dispatch_task(task_id: str, task: TaskCreate) -> None:
+    """
+    Send a task to the workers.
+
+    Args:
+        - task_id (str): Unique id of the task.
+        - task (TaskCreate): The task.
+    """
+    trends_search_task.apply_async(
+        kwargs=task.custom_model_dump(exclude=['user_id', 'schedule_at']),
+        task_id=task_id
+    )
+
+
+class Scheduler(abc.ABC):
+    """
+    Base class of the schedulers, which poll the database for their due work, and handle it in batches.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker, batch_size: int = 100, poll_interval: float = 1) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            - session_maker (async_sessionmaker): Session maker of the task service database.
+            - batch_size (int): Maximum number of items handled per transaction.
+            - poll_interval (float): Seconds to wait for items to become due, once no due item is left.
+        """
+        self.session_maker = session_maker
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+    @abc.abstractmethod
+    async def dispatch_due(self) -> int:
+        """
+        Handle a batch of the due items.
+
+        Returns:
+            - int: Number of handled items.
+        """
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """
+        Handle the due items until stopped.
+
+        Args:
+            - stop (asyncio.Event): Event stopping the scheduler once set.
+        """
+        while not stop.is_set():
+            try:
+                dispatched = await self.dispatch_due()
+            except (SQLAlchemyError, OperationalError, OSError):
+                logger.warning("%s failed to dispatch the due items", type(self).__name__, exc_info=True)
+                dispatched = 0
+            else:
+                if dispatched:
+                    logger.info("%s dispatched %s due items", type(self).__name__, dispatched)
+
+            # A full batch may leave more due items behind, which are dispatched right away
+            if dispatched < self.batch_size:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+
+
+class TaskScheduler(Scheduler):
+    """
+    Scheduler dispatching the tasks scheduled for later to the workers once they are due.
+
+    Scheduled tasks wait in the database rather than in the workers, which would hold every task sent with an `eta`
+    in memory until it is due. The scheduler polls the index of the tasks waiting for dispatch, and claims the due
+    ones in batches with `FOR UPDATE SKIP LOCKED`, so schedulers can run side by side. A batch is marked as dispatched
+    in the transaction that claims it, which is committed once the batch is sent, so a restarted scheduler carries on
+    from the first task it had not sent, and at worst sends the batch it was stopped in again.
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker,
+            dispatch: Callable[[str, TaskCreate], None] = dispatch_task,
+            batch_size: int = 100,
+            poll_interval: float = 1
+        ) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            - session_maker (async_sessionmaker): Session maker of the task service database.
+            - dispatch (Callable[[str, TaskCreate], None]): Function sending a task to the workers.
+            - batch_size (int): Maximum number of tasks dispatched per transaction.
+            - poll_interval (float): Seconds to wait for tasks to become due, once no due task is left.
+        """
+        super().__init__(session_maker=session_maker, batch_size=batch_size, poll_interval=poll_interval)
+        self.dispatch = dispatch
+
+    async def dispatch_due(self) -> int:
+        """
+        Dispatch a batch of the due tasks.
+
+        Returns:
+            - int: Number of dispatched tasks.
+        """
+        async with self.session_maker() as db:
+            tasks = await TaskModelRepository(db=db).claim_due(now=datetime.now(), limit=self.batch_size)
+
+            for task in tasks:
+                self.dispatch(str(task.id), TaskCreate.model_validate(task))
+
+            await db.commit()
+
+        return len(tasks)
+
+
+def get_run_error(task: Optional[Task], run_timeout: int) -> Dict[str, Any]:
+    """
+    Get the error of a watch run that did not complete.
+
+    Args:
+        - task (Task | None): The task of the run, None if it was deleted.
+        - run_timeout (int): Seconds after which a run that did not finish is given up.
+
+    Returns:
+        - Dict[str, Any]: The error of the run.
+    """
+    if task is None:
+        return {'code': 404, 'error': 'The task of the run was deleted.'}
+
+    if task.status == TaskStatus.FAILED:
+        return task.error
+
+    return {'code': 504, 'error': f'The run did not finish within {run_timeout} seconds.'}
+
+
+class WatchScheduler(Scheduler):
+    """
+    Scheduler running the watches every interval.
+
+    Every run of a watch is a task fetching the days since the last complete point of the watch series, along with a
+    few days of overlap, which the task scheduler dispatches as any other task. Once the task completes, its results
+    are rescaled by the overlap and merged into the series. Watches are claimed with `FOR UPDATE SKIP LOCKED`, so
+    schedulers can run side by side, and have a single run in progress at a time.
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker,
+            overlap_days: int = 7,
+            run_timeout: int = 3600,
+            batch_size: int = 100,
+            poll_interval: float = 1
+        ) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            - session_maker (async_sessionmaker): Session maker of the task service database.
+            - overlap_days (int): Days the runs overlap the series by.
+            - run_timeout (int): Seconds after which a run that did not finish is given up, and the watch runs again.
+            - batch_size (int): Maximum number of watches run, and of runs merged, per transaction.
+            - poll_interval (float): Seconds to wait for watches to become due, once no due watch is left.
+        """
+        super().__init__(session_maker=session_maker, batch_size=batch_size, poll_interval=poll_interval)
+        self.overlap_days = overlap_days
+        self.run_timeout = run_timeout
+
+    @staticmethod
+    def get_next_run_at(watch: Watch, now: datetime) -> datetime:
+        # Runs keep to the schedule of the watch, unless they fell behind by a whole interval
+        next_run_at = watch.next_run_at + timedelta(seconds=watch.interval)
+        return next_run_at if next_run_at > now else now + timedelta(seconds=watch.interval)
+
+    async def dispatch_due(self) -> int:
+        """
+        Merge a batch of the finished runs, then start a batch of the due runs.
+
+        Returns:
+            - int: Number of merged and started runs.
+        """
+        async with self.session_maker() as db:
+            watch_repository = WatchModelRepository(db=db)
+            now = datetime.now()
+
+            finished_runs = await watch_repository.claim_finished_runs(
+                now=now,
+                run_timeout=self.run_timeout,
+                limit=self.batch_size
+            )
+            for watch, task in finished_runs:
+                if task is not None and task.status == TaskStatus.COMPLETED:
+                    results = task.result_data or []
+                    window = results if isinstance(results, dict) else compact_results(results)
+                    watch_repository.finish_run(watch=watch, series=merge_series(watch.series, window), error=None)
+                else:
+                    watch_repository.finish_run(
+                        watch=watch,
+                        series=watch.series,
+                        error=get_run_error(task=task, run_timeout=self.run_timeout)
+                    )
+
+            due_watches = await watch_repository.claim_due(now=now, limit=self.batch_size)
+            for watch in due_watches:
+                watch_repository.start_run(
+                    watch=watch,
+                    time=get_watch_timeframe(
+                        series=watch.series,
+                        lookback_days=watch.lookback_days,
+                        overlap_days=self.overlap_days,
+                        today=now.date()
+                    ),
+                    now=now,
+                    next_run_at=self.get_next_run_at(watch=watch, now=now)
+                )
+
+            await db.commit()
+
+        return max(len(finished_runs), len(due_watches))
+
+
+async def main() -> None:
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URL, pool_size=2, max_overflow=0, pool_pre_ping=True)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    schedulers = (
+        TaskScheduler(
+            session_maker=session_maker,
+            batch_size=settings.TASK_SCHEDULER_BATCH_SIZE,
+            poll_interval=settings.TASK_SCHEDULER_POLL_INTERVAL
+        ),
+        WatchScheduler(
+            session_maker=session_maker,
+            overlap_days=settings.WATCH_OVERLAP_DAYS,
+            run_timeout=settings.WATCH_RUN_TIMEOUT,
+            batch_size=settings.TASK_SCHEDULER_BATCH_SIZE,
+            poll_interval=settings.TASK_SCHEDULER_POLL_INTERVAL
+        ),
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop.set)
+
+    try:
+        await asyncio.gather(*(scheduler.run(stop=stop) for scheduler in schedulers))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
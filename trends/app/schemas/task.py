@@ -1,12 +1,21 @@
 import enum
+import functools
 from uuid import UUID
 
 from datetime import datetime
-from typing import Optional, List, Literal, Any
+from typing import Optional, List, Dict, FrozenSet, Literal, Any
 
 import pydantic
+from shared_utils.pagination import PageNumberPaginationQueryParams
 
 from app.models.task import PropertyEnum, TaskStatus
+from app.pagination import CursorPaginationQueryParams
+from app.utils import compact_results, expand_results
+
+
+class ResultFormatEnum(enum.Enum):
+    EXPANDED = "expanded"
+    COLUMNAR = "columnar"
 
 
 class TaskCreate(pydantic.BaseModel):
@@ -36,6 +45,13 @@ class TaskCreate(pydantic.BaseModel):
     )
     schedule_at: Optional[datetime] = pydantic.Field(default_factory=datetime.now)
 
+    @pydantic.field_validator("schedule_at")
+    def validate_schedule_at(cls, v):
+        # Dates are stored in the local time of the service, without their time zone
+        if v is not None and v.tzinfo is not None:
+            return v.astimezone().replace(tzinfo=None)
+        return v
+
     @pydantic.field_validator("time")
     def validate_time(cls, v):
         if v is None:
@@ -115,6 +131,49 @@ class TrendResponse(pydantic.BaseModel):
         from_attributes=True
 
 
+class TrendColumnarResponse(pydantic.BaseModel):
+    dates: List[str]
+    is_partial: str = pydantic.Field(
+        pattern=r'^[01]*$',
+        description="Bitmap of the partial dates, '1' for a partial date and '0' otherwise."
+    )
+    values: Dict[str, List[int]] = pydantic.Field(
+        description="Values of every search topic, in the order of the dates."
+    )
+
+    @pydantic.model_validator(mode="after")
+    def validate_lengths(self):
+        if len(self.is_partial) != len(self.dates) or any(len(v) != len(self.dates) for v in self.values.values()):
+            raise ValueError("Partial bitmap and values must have one entry per date.")
+        return self
+
+    class Config:
+        from_attributes=True
+
+
+def compact_trend_responses(results: List[Any]) -> Dict[str, Any]:
+    """
+    Compact the expanded search results into their columnar form, checking their shape first, so malformed results
+    fail the validation instead of the compaction.
+
+    Args:
+        - results (List[Any]): The expanded search results, as dicts or `TrendResponse`.
+
+    Returns:
+        - Dict[str, Any]: The columnar search results.
+
+    Raises:
+        - ValueError: If the results are malformed.
+    """
+    points = [TrendResponse.model_validate(point).model_dump() for point in results]
+
+    keywords = [item['query'] for item in points[0]['q_list']] if points else []
+    if any([item['query'] for item in point['q_list']] != keywords for point in points):
+        raise ValueError("Every date must have the values of the same search topics.")
+
+    return compact_results(points)
+
+
 class TrendError(pydantic.BaseModel):
     code: int
     error: str
@@ -132,6 +191,162 @@ class TaskRetrieve(TaskCreate):
     created_at: datetime
     updated_at: datetime
 
+    @pydantic.field_validator("result_data", mode="before")
+    def convert_result_data(cls, v):
+        # Results are stored in their columnar form, and only expanded when the expanded form is returned
+        if isinstance(v, dict):
+            return expand_results(v)
+        return v
+
+    class Config:
+        from_attributes=True
+        # Cached tasks are read back from their serialized form, which is keyed by the field names
+        populate_by_name=True
+
+
+class TaskSummary(pydantic.BaseModel):
+    """
+    Task without its results and error, for listing many tasks at once.
+    """
+    task_id: UUID = pydantic.Field(alias="id", serialization_alias="task_id")
+    user_id: int
+    q: List[str]
+    geo: Optional[str] = None
+    time: Optional[str] = None
+    cat: Optional[int] = None
+    gprop: Optional[PropertyEnum] = None
+    tz: Optional[int] = None
+    schedule_at: Optional[datetime] = None
+    status: TaskStatus
+    retry_count: int = 0
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes=True
+
+
+class TaskListQueryParams(pydantic.BaseModel):
+    include_results: bool = pydantic.Field(
+        default=True,
+        description="Whether to return the full tasks with their results, or only their summaries."
+    )
+    fields: Optional[str] = pydantic.Field(
+        default=None,
+        description="Comma separated summary fields to return, such as 'status,created_at', which implies summaries."
+    )
+
+    @pydantic.field_validator("fields")
+    def validate_fields(cls, v):
+        if v is None:
+            return v
+
+        unknown_fields = split_fields(v) - TaskSummary.model_fields.keys()
+        if unknown_fields:
+            raise ValueError(f"Unknown task summary fields: {', '.join(sorted(unknown_fields))}.")
+
+        return v
+
+    def get_summary_schema(self) -> Optional[type[pydantic.BaseModel]]:
+        """
+        Get the schema of the requested task summaries.
+
+        Returns:
+            - type[BaseModel] | None: The summary schema, restricted to the requested fields, or None if the full
+              tasks are requested.
+        """
+        if self.fields is None:
+            return None if self.include_results else TaskSummary
+
+        return get_task_summary_schema(fields=split_fields(self.fields))
+
+
+class TaskPageListQueryParams(TaskListQueryParams, PageNumberPaginationQueryParams):
+    ...
+
+
+class TaskCursorListQueryParams(TaskListQueryParams, CursorPaginationQueryParams):
+    ...
+
+
+class TaskExportQueryParams(pydantic.BaseModel):
+    status: Optional[TaskStatus] = pydantic.Field(
+        default=None,
+        description="Only export the tasks in this status."
+    )
+    created_after: Optional[datetime] = pydantic.Field(
+        default=None,
+        description="Only export the tasks created at or after this date."
+    )
+    created_before: Optional[datetime] = pydantic.Field(
+        default=None,
+        description="Only export the tasks created before this date."
+    )
+    gzip: bool = pydantic.Field(
+        default=False,
+        description="Whether to compress the export with gzip."
+    )
+
+
+def split_fields(fields: str) -> FrozenSet[str]:
+    """
+    Split comma separated field names.
+
+    Args:
+        - fields (str): Comma separated field names, such as 'status,created_at'.
+
+    Returns:
+        - FrozenSet[str]: The field names.
+    """
+    return frozenset(filter(None, map(str.strip, fields.split(','))))
+
+
+@functools.lru_cache(maxsize=128)
+def get_task_summary_schema(fields: FrozenSet[str]) -> type[pydantic.BaseModel]:
+    """
+    Build a task summary schema restricted to the given fields, the task id is always kept.
+
+    Args:
+        - fields (FrozenSet[str]): Names of the `TaskSummary` fields to keep.
+
+    Returns:
+        - type[BaseModel]: The restricted summary schema.
+    """
+    return pydantic.create_model(
+        'TaskSummary',
+        __config__=pydantic.ConfigDict(from_attributes=True),
+        **{
+            name: (field.annotation, field)
+            for name, field in TaskSummary.model_fields.items()
+            if name in fields or name == 'task_id'
+        }
+    )
+
+
+def get_summary_columns(summary_schema: type[pydantic.BaseModel]) -> List[str]:
+    """
+    Get the task columns a summary schema is read from.
+
+    Args:
+        - summary_schema (type[BaseModel]): `TaskSummary` or one of its restricted schemas.
+
+    Returns:
+        - List[str]: Names of the task columns.
+    """
+    return [field.alias or name for name, field in summary_schema.model_fields.items()]
+
+
+class TaskColumnarRetrieve(TaskRetrieve):
+    result_data: Optional[TrendColumnarResponse] = None
+
+    @pydantic.field_validator("result_data", mode="before")
+    def convert_result_data(cls, v):
+        # Tasks completed before the columnar form was introduced store the expanded form, and cached tasks hold the
+        # expanded results already validated
+        if isinstance(v, list):
+            return compact_trend_responses(v)
+        return v
+
     class Config:
         from_attributes=True
 
@@ -167,10 +382,49 @@ class TaskUpdate(pydantic.BaseModel):
 
 class TrendTaskUpdate(pydantic.BaseModel):
     status: Optional[TaskStatus] = None
-    result_data: Optional[List[TrendResponse]] = None
+    result_data: Optional[TrendColumnarResponse] = None
     error: Optional[TrendError] = None
-    increment_retry_count: Optional[bool] = False
+    increment_retry_count: Optional[int] = pydantic.Field(
+        default=0,
+        ge=0,
+        description="Amount to increment the retry count by, coalesced callbacks add up their increments."
+    )
     updated_at: Optional[datetime] = pydantic.Field(default_factory=datetime.now)
 
+    @pydantic.field_validator("result_data", mode="before")
+    def convert_result_data(cls, v):
+        # Results are always stored in their columnar form, even when a worker sends the expanded form
+        if isinstance(v, list):
+            return compact_trend_responses(v)
+        return v
+
+    class Config:
+        from_attributes=True
+
+
+class TrendTaskBulkUpdateItem(TrendTaskUpdate):
+    task_id: UUID
+
+
+class TrendTaskBulkUpdate(pydantic.BaseModel):
+    items: List[TrendTaskBulkUpdateItem] = pydantic.Field(max_length=500)
+
+    class Config:
+        from_attributes=True
+
+
+class TaskCallbackResult(pydantic.BaseModel):
+    task_id: UUID
+    updated: bool = pydantic.Field(
+        description="Whether the callback was applied, it is not when the task does not exist."
+    )
+
+    class Config:
+        from_attributes=True
+
+
+class TaskBulkCallbackResponse(pydantic.BaseModel):
+    results: List[TaskCallbackResult]
+
     class Config:
         from_attributes=True
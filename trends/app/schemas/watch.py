@@ -0,0 +1,90 @@
+from uuid import UUID
+from datetime import datetime
+from typing import Optional, List, Dict
+
+import pydantic
+
+from app.core.conf import settings
+from app.models.task import PropertyEnum
+from app.utils import MAX_DAILY_TIMEFRAME_DAYS
+from app.schemas.task import TrendColumnarResponse, TrendError
+
+
+# Shortcuts of the common intervals, in seconds
+INTERVAL_SHORTCUTS = {
+    '@hourly': 60 * 60,
+    '@daily': 24 * 60 * 60,
+    '@weekly': 7 * 24 * 60 * 60,
+}
+
+
+class WatchCreate(pydantic.BaseModel):
+    user_id: int
+    q: List[str] = pydantic.Field(
+        min_length=1,
+        max_length=5,
+        description="Search topic(s), up to five. List of strings."
+    )
+    geo: Optional[str] = pydantic.Field(
+        default="Worldwide",
+        description="Geographical region (e.g., 'US', 'DE', 'Worldwide')."
+    )
+    cat: Optional[int] = pydantic.Field(
+        default=0,
+        description="Category ID (e.g., 0 for all categories, 7 for Arts & Entertainment)."
+    )
+    gprop: Optional[PropertyEnum] = pydantic.Field(
+        default=PropertyEnum.WEB_SEARCH,
+        description="Google property (Web Search, YouTube Search, Image Search)."
+    )
+    tz: Optional[int] = pydantic.Field(
+        default=0,
+        description="Time zone offset in minutes."
+    )
+    interval: int = pydantic.Field(
+        default=INTERVAL_SHORTCUTS['@daily'],
+        ge=settings.WATCH_MIN_INTERVAL,
+        description="Seconds between the runs of the watch, or one of '@hourly', '@daily' and '@weekly'."
+    )
+    lookback_days: int = pydantic.Field(
+        default=90,
+        ge=1,
+        le=MAX_DAILY_TIMEFRAME_DAYS,
+        description="Days fetched by the first run of the watch, the later runs only fetch the days since."
+    )
+
+    @pydantic.field_validator("interval", mode="before")
+    def validate_interval(cls, v):
+        if isinstance(v, str) and v.startswith('@'):
+            if v not in INTERVAL_SHORTCUTS:
+                raise ValueError(f"Interval must be a number of seconds or one of {', '.join(INTERVAL_SHORTCUTS)}.")
+            return INTERVAL_SHORTCUTS[v]
+        return v
+
+    class Config:
+        from_attributes=True
+
+
+class WatchSeries(TrendColumnarResponse):
+    values: Dict[str, List[float]] = pydantic.Field(
+        description="Values of every search topic, in the order of the dates, on the scale of the first run."
+    )
+
+
+class WatchSummary(WatchCreate):
+    watch_id: UUID = pydantic.Field(alias="id", serialization_alias="watch_id")
+    error: Optional[TrendError] = None
+    last_run_at: Optional[datetime] = None
+    next_run_at: datetime
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes=True
+
+
+class WatchRetrieve(WatchSummary):
+    series: Optional[WatchSeries] = None
+
+    class Config:
+        from_attributes=True
@@ -1,10 +1,20 @@
-from typing import Generic, Sequence
+import json
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Generic, Optional, Sequence, List
 
 from fastapi import Depends
 from pydantic import BaseModel
 from shared_utils.pagination import Paginator
+from shared_utils.exceptions import ObjDoesNotExist
 
 from app.models.task import Task
+from app.events import TaskEvent, TaskEventBroker, task_event_broker
+from app.exceptions import RequestInProgress
+from app.cache import (TERMINAL_STATUSES, TaskDetailCache, IdempotencyCache, task_detail_cache,
+                       callback_idempotency_cache)
+from app.schemas.task import TaskRetrieve, TrendTaskBulkUpdateItem
+from app.pagination import CursorPaginationQueryParams, CursorPaginationResponse
 from app.repositories.task import TaskModelRepository, get_task_repository
 
 
@@ -15,14 +25,27 @@ class TaskService:
     It interacts with a task repository to perform database operations.
     """
 
-    def __init__(self, task_repository: TaskModelRepository) -> None:
+    def __init__(
+            self,
+            task_repository: TaskModelRepository,
+            task_cache: Optional[TaskDetailCache] = None,
+            task_events: Optional[TaskEventBroker] = None,
+            idempotency_cache: Optional[IdempotencyCache] = None
+        ) -> None:
         """
         Initialize the TaskService with a task repository.
 
         Args:
             - task_repository (TaskModelRepository): The repository used to interact with task data.
+            - task_cache (TaskDetailCache | None): The cache of the task details, a disabled cache is used if None.
+            - task_events (TaskEventBroker | None): The broker of the task updates, a disabled broker is used if None.
+            - idempotency_cache (IdempotencyCache | None): The cache of the callback responses by idempotency key, a
+              disabled cache is used if None.
         """
         self.task_repository = task_repository
+        self.task_cache = task_cache or TaskDetailCache(schema=TaskRetrieve, enabled=False)
+        self.task_events = task_events or TaskEventBroker(schema=TaskRetrieve, enabled=False)
+        self.idempotency_cache = idempotency_cache or IdempotencyCache(enabled=False)
 
     async def create(self, id: str, user_id: str, q: str, **other_fields):
         """
@@ -78,27 +101,103 @@ class TaskService:
         """
         return await self.task_repository.get_by_id(id=id)
 
-    async def get_by_user_id(self, id: str, user_id: str) -> Task:
+    async def get_by_user_id(self, id: str, user_id: str) -> TaskRetrieve:
         """
-        Get task by task id & user id.
+        Get task by task id & user id, through the cache of the task details.
 
         Args:
             - id (str): Task id to search for.
             - user_id (str): User id to search for.
 
         Returns:
-            - Task: The task instance if found.
+            - TaskRetrieve: The task if found.
+
+        Raises:
+            - ObjDoesNotExist: If no instance is found with the given ID.
+        """
+        task = await self.task_cache.get(task_id=id)
+
+        if task is None:
+            task = TaskRetrieve.model_validate(await self.task_repository.get_by_user_id(id=id, user_id=user_id))
+            await self.task_cache.set(task=task)
+        elif task.user_id != user_id:
+            raise ObjDoesNotExist
+
+        return task
+
+    async def watch(
+            self,
+            id: str,
+            user_id: str,
+            timeout: float,
+            heartbeat_interval: Optional[float] = None
+        ) -> AsyncIterator[Optional[TaskRetrieve]]:
+        """
+        Get a task, then every update of it until it completes or fails, without polling the database in between.
+
+        The database is only read for the task itself, and for the updates published without the updated task. The
+        connection is released after every read, so waiting holds none.
+
+        Args:
+            - id (str): Task id to watch.
+            - user_id (str): User id of the task.
+            - timeout (float): Seconds to wait for the updates.
+            - heartbeat_interval (float | None): Seconds after which None is yielded if the task was not updated.
+
+        Returns:
+            - AsyncIterator[TaskRetrieve | None]: The task, then its updates, with None on every heartbeat.
 
         Raises:
             - ObjDoesNotExist: If no instance is found with the given ID.
         """
-        return await self.task_repository.get_by_user_id(id=id, user_id=user_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        # Subscribe before reading the task, so no update is missed in between
+        async with self.task_events.subscribe(task_id=id) as events:
+            task = await self._get_and_release(id=id, user_id=user_id)
+            yield task
+
+            while events is not None and task.status not in TERMINAL_STATUSES:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+
+                try:
+                    event = await asyncio.wait_for(
+                        events.get(),
+                        timeout=min(remaining, heartbeat_interval or remaining)
+                    )
+                except asyncio.TimeoutError:
+                    if loop.time() < deadline:
+                        yield None
+                    continue
+
+                # The subscription is down, waiting any longer may miss the updates
+                if event is None:
+                    return
+
+                task = event.task or await self._get_and_release(id=id, user_id=user_id)
+                yield task
+
+    async def _get_and_release(self, id: str, user_id: str) -> TaskRetrieve:
+        try:
+            return await self.get_by_user_id(id=id, user_id=user_id)
+        finally:
+            await self.task_repository.close()
+
+    async def _publish_update(self, task: Task) -> None:
+        # Refresh the cached task and wake the requests waiting for it up, with the task at hand
+        task = TaskRetrieve.model_validate(task)
+        await self.task_cache.set(task=task)
+        await self.task_events.publish(TaskEvent(task_id=str(task.task_id), status=task.status, task=task))
 
     async def get_paginated[Schema: BaseModel](
         self,
         paginator: Paginator,
         query_params: BaseModel,
         response_schema: Schema,
+        columns: Optional[Sequence[str]] = None,
         **filters
     ) -> Generic[Schema]:
         """
@@ -111,6 +210,7 @@ class TaskService:
             - paginator (Paginator): A paginator class responsible for applying pagination logic to the query and response.
             - query_params (BaseModel): A Pydantic model containing query parameters for filtering.
             - response_schema (Schema): A Pydantic model class that defines the structure of the response items.
+            - columns (Sequence[str] | None): Names of the only task columns to load, all the columns are loaded if None.
             - **filters: Additional keyword arguments that will be passed as filters to the repository.
 
         Returns:
@@ -120,9 +220,58 @@ class TaskService:
             paginator=paginator,
             query_params=query_params,
             response_schema=response_schema,
+            columns=columns,
             **filters
         )
 
+    async def get_cursor_paginated(
+            self,
+            query_params: CursorPaginationQueryParams,
+            response_schema: type[BaseModel],
+            columns: Optional[Sequence[str]] = None,
+            **filters
+        ) -> CursorPaginationResponse:
+        """
+        Retrieve a page of tasks from the task repository, paginated by cursor rather than page number.
+
+        Args:
+            - query_params (CursorPaginationQueryParams): Cursor and size of the page.
+            - response_schema (type[BaseModel]): A Pydantic model class that defines the structure of the response items.
+            - columns (Sequence[str] | None): Names of the only task columns to load, all the columns are loaded if None.
+            - **filters: Additional keyword arguments that will be passed as filters to the repository.
+
+        Returns:
+            - CursorPaginationResponse: The page of tasks, with the cursor of the next page.
+
+        Raises:
+            - InvalidCursor: If the cursor is invalid.
+        """
+        return await self.task_repository.get_cursor_paginated(
+            query_params=query_params,
+            response_schema=response_schema,
+            columns=columns,
+            **filters
+        )
+
+    def stream(
+            self,
+            created_after: Optional[datetime] = None,
+            created_before: Optional[datetime] = None,
+            **filters
+        ) -> AsyncIterator[Task]:
+        """
+        Stream tasks from the task repository, oldest first, fetching them in batches as they are consumed.
+
+        Args:
+            - created_after (datetime | None): Only stream tasks created at or after this date.
+            - created_before (datetime | None): Only stream tasks created before this date.
+            - **filters: Additional keyword arguments that will be passed as filters to the repository.
+
+        Returns:
+            - AsyncIterator[Task]: The tasks.
+        """
+        return self.task_repository.stream(created_after=created_after, created_before=created_before, **filters)
+
     async def update(self, id: str, **kwargs) -> Task:
         """
         Update a task instance.
@@ -134,7 +283,10 @@ class TaskService:
         Returns:
             - Task: The updated task instance.
         """
-        return await self.task_repository.update(id=id, **kwargs)
+        task = await self.task_repository.update(id=id, **kwargs)
+        await self._publish_update(task=task)
+
+        return task
 
     async def increment_retry_count(self, id: str, increment_by: int = 1) -> Task:
         """
@@ -150,7 +302,91 @@ class TaskService:
         Raises:
             - ObjDoesNotExist: If no instance is found with the given ID.
         """
-        return await self.task_repository.increment_retry_count(id=id, increment_by=increment_by)
+        task = await self.task_repository.increment_retry_count(id=id, increment_by=increment_by)
+        await self._publish_update(task=task)
+
+        return task
+
+    async def update_and_increment_retry_count(self, id: str, increment_by: int = 0, **kwargs) -> Task:
+        """
+        Update a task instance and increment its retry count at once.
+
+        Args:
+            - id (str): Task id to update.
+            - increment_by (int): The amount to increment the retry count by.
+            - **kwargs: Fields to update.
+
+        Returns:
+            - Task: The updated task instance.
+
+        Raises:
+            - ObjDoesNotExist: If no instance is found with the given ID.
+        """
+        task = await self.task_repository.update_and_increment_retry_count(
+            id=id,
+            increment_by=increment_by,
+            **kwargs
+        )
+        await self._publish_update(task=task)
+
+        return task
+
+    async def bulk_update(
+            self,
+            items: List[TrendTaskBulkUpdateItem],
+            idempotency_key: Optional[str] = None
+        ) -> List[Dict[str, Any]]:
+        """
+        Apply the callbacks of many tasks in a single statement.
+
+        Callbacks of the same task are merged first, the latest value of every field wins and the retry count
+        increments add up. Callbacks sent again with the same idempotency key, once the response to the first ones was
+        lost, are not applied again, since the retry count increments are not idempotent.
+
+        Args:
+            - items (List[TrendTaskBulkUpdateItem]): The callback of every task.
+            - idempotency_key (str | None): Key of the callbacks, shared by the requests sending them again.
+
+        Returns:
+            - List[Dict[str, Any]]: Whether every callback was applied, callbacks of tasks that do not exist are not.
+
+        Raises:
+            - RequestInProgress: If the callbacks of the same idempotency key are being applied.
+        """
+        if idempotency_key is None:
+            return await self._bulk_update(items=items)
+
+        claimed, response = await self.idempotency_cache.claim(key=idempotency_key)
+        if not claimed:
+            if response is None:
+                raise RequestInProgress
+            return json.loads(response)
+
+        try:
+            results = await self._bulk_update(items=items)
+        except BaseException:
+            await self.idempotency_cache.release(key=idempotency_key)
+            raise
+
+        await self.idempotency_cache.complete(key=idempotency_key, response=json.dumps(results, default=str))
+        return results
+
+    async def _bulk_update(self, items: List[TrendTaskBulkUpdateItem]) -> List[Dict[str, Any]]:
+        updates = {}
+        for item in items:
+            task_update = updates.setdefault(item.task_id, {'id': item.task_id, 'increment_retry_count': 0})
+            task_update['increment_retry_count'] += item.increment_retry_count or 0
+            task_update.update(item.model_dump(exclude_unset=True, include={"status", "result_data", "error"}))
+
+        updated_ids = await self.task_repository.bulk_update(updates=list(updates.values()))
+        await self.task_cache.invalidate(task_ids=updated_ids)
+
+        # The updated tasks are not returned, so the waiting requests read them through the cache
+        for task_id in updated_ids:
+            if updates[task_id].get('status') is not None:
+                await self.task_events.publish(TaskEvent(task_id=str(task_id), status=updates[task_id]['status']))
+
+        return [{'task_id': item.task_id, 'updated': item.task_id in updated_ids} for item in items]
 
     async def delete(self, id: str) -> None:
         """
@@ -163,6 +399,7 @@ class TaskService:
             - ObjDoesNotExist: If no instance is found with the given ID.
         """
         await self.task_repository.delete(id=id)
+        await self.task_cache.invalidate(task_ids=[id])
 
 
 def get_task_service(task_repository: TaskModelRepository = Depends(get_task_repository)) -> TaskService:
@@ -176,5 +413,8 @@ def get_task_service(task_repository: TaskModelRepository = Depends(get_task_rep
         - TaskService: The TaskService instance.
     """
     return TaskService(
-        task_repository=task_repository
+        task_repository=task_repository,
+        task_cache=task_detail_cache,
+        task_events=task_event_broker,
+        idempotency_cache=callback_idempotency_cache
     )
@@ -0,0 +1,119 @@
+from datetime import datetime
+from typing import Generic
+
+from fastapi import Depends
+from pydantic import BaseModel
+from shared_utils.pagination import Paginator
+
+from app.models.watch import Watch
+from app.repositories.watch import WatchModelRepository, get_watch_repository
+
+
+class WatchService:
+    """
+    Service class for managing watch-related operations.
+    This class provides asynchronous methods to create, retrieve, and delete watch records, which the scheduler runs.
+    It interacts with a watch repository to perform database operations.
+    """
+
+    def __init__(self, watch_repository: WatchModelRepository) -> None:
+        """
+        Initialize the WatchService with a watch repository.
+
+        Args:
+            - watch_repository (WatchModelRepository): The repository used to interact with watch data.
+        """
+        self.watch_repository = watch_repository
+
+    async def create(self, id: str, user_id: int, q: list, **other_fields) -> Watch:
+        """
+        Create a new watch, which is due for its first run right away.
+
+        Args:
+            - id (str): Watch id to create.
+            - user_id (int): Watch user_id to create.
+            - q (list): Watch q to create.
+            - **other_fields: Remaining fields to create.
+
+        Returns:
+            - Watch: The created watch instance.
+
+        Raises:
+            - ObjAlreadyExist: If a watch with the same id exists.
+        """
+        return await self.watch_repository.create(
+            id=id,
+            user_id=user_id,
+            q=q,
+            next_run_at=datetime.now(),
+            **other_fields
+        )
+
+    async def get_by_user_id(self, id: str, user_id: int) -> Watch:
+        """
+        Retrieve a watch by its id and user id.
+
+        Args:
+            - id (str): Watch id to search for.
+            - user_id (int): User id to search for.
+
+        Returns:
+            - Watch: The watch instance if found.
+
+        Raises:
+            - ObjDoesNotExist: If no instance is found with the given ID.
+        """
+        return await self.watch_repository.get_by_user_id(id=id, user_id=user_id)
+
+    async def get_paginated[Schema: BaseModel](
+        self,
+        paginator: Paginator,
+        query_params: BaseModel,
+        response_schema: Schema,
+        **filters
+    ) -> Generic[Schema]:
+        """
+        Retrieve paginated results from the watch repository based on provided parameters.
+
+        Args:
+            - paginator (Paginator): A paginator class responsible for applying pagination logic to the query and response.
+            - query_params (BaseModel): A Pydantic model containing query parameters for filtering.
+            - response_schema (Schema): A Pydantic model class that defines the structure of the response items.
+            - **filters: Additional keyword arguments that will be passed as filters to the repository.
+
+        Returns:
+            - Generic[Schema]: Paginated results that conform to the provided response schema.
+        """
+        return await self.watch_repository.get_paginated(
+            paginator=paginator,
+            query_params=query_params,
+            response_schema=response_schema,
+            **filters
+        )
+
+    async def delete(self, id: str) -> None:
+        """
+        Delete a watch, a run in progress completes without being merged.
+
+        Args:
+            - id (str): Watch id to delete.
+
+        Raises:
+            - ObjDoesNotExist: If no instance is found with the given ID.
+        """
+        await self.watch_repository.delete(id=id)
+
+
+def get_watch_service(watch_repository: WatchModelRepository = Depends(get_watch_repository)) -> WatchService:
+    """
+    Dependency to get the WatchService instance.
+
+    Args:
+        - watch_repository (WatchModelRepository): The watch repository.
+
+    Returns:
+        - WatchService: The WatchService instance.
+    """
+    return WatchService(
+        watch_repository=watch_repository
+    )
@@ -0,0 +1,221 @@
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.models.task import PropertyEnum
+
+
+# Google Trends returns daily points for time ranges of up to 269 days, and coarser points beyond
+MAX_DAILY_TIMEFRAME_DAYS = 269
+
+
+def build_payload_params(
+        keywords: List[str],
+        geo: str | None = None,
+        time: str | None = None,
+        cat: int | None = None,
+        gprop: PropertyEnum | None = None
+    ) -> Dict[str, Any]:
+    """
+    Build the pytrends `build_payload` parameters of a search, resolving the defaults of the optional ones.
+
+    Args:
+        - keywords (List[str]): Search terms.
+        - geo (str, optional): Geographic location (e.g., 'US').
+        - time (str, optional): Time range for the search.
+        - cat (int, optional): Category ID for more specific searches.
+        - gprop (PropertyEnum, optional): Google property to search.
+
+    Returns:
+        - Dict[str, Any]: The `build_payload` keyword arguments.
+    """
+    payload_params = {
+        'kw_list': keywords,
+        'geo': '',
+        'timeframe': 'today 5-y',  # Default to 5 years if not specified
+        'cat': 0,
+        'gprop': ''
+    }
+
+    # Add optional parameters
+    if geo:
+        payload_params['geo'] = geo
+    if time:
+        payload_params['timeframe'] = time
+    if cat:
+        payload_params['cat'] = cat
+    if gprop and gprop != 'web':  # Default is 'web', so only set if not 'web'
+        payload_params['gprop'] = gprop
+
+    return payload_params
+
+
+def convert_interest_over_time(interest_over_time_df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Convert the pytrends interest over time DataFrame into the search results.
+
+    The conversion is columnar, the dates are formatted and the columns are extracted to python objects at once, so
+    only the assembly of the result dictionaries remains per row.
+
+    Args:
+        - interest_over_time_df (pd.DataFrame): Interest over time indexed by date, with a column per keyword and the
+          `isPartial` column.
+
+    Returns:
+        - List[Dict[str, Any]]: Google Trends search results
+    """
+    if interest_over_time_df.empty:
+        return []
+
+    keywords = [column for column in interest_over_time_df.columns if column != 'isPartial']
+
+    dates = np.datetime_as_string(interest_over_time_df.index.to_numpy(dtype='datetime64[s]'), unit='s').tolist()
+    is_partial = interest_over_time_df['isPartial'].to_numpy(dtype=bool).tolist()
+    values = interest_over_time_df[keywords].to_numpy().tolist()
+
+    return [
+        {
+            "date": date,
+            "is_partial": partial,
+            "q_list": [{"query": keyword, "value": value} for keyword, value in zip(keywords, row)]
+        }
+        for date, partial, row in zip(dates, is_partial, values)
+    ]
+
+
+def compact_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compact the search results into their columnar form.
+
+    The columnar form holds the dates once, the partial flags as a bitmap string of '0' and '1', and a single array of
+    values per keyword, instead of repeating every keyword in every date.
+
+    Args:
+        - results (List[Dict[str, Any]]): Google Trends search results
+
+    Returns:
+        - Dict[str, Any]: The columnar search results.
+    """
+    keywords = [item["query"] for item in results[0]["q_list"]] if results else []
+
+    return {
+        "dates": [point["date"] for point in results],
+        "is_partial": ''.join('1' if point["is_partial"] else '0' for point in results),
+        "values": {
+            keyword: [point["q_list"][index]["value"] for point in results] for index, keyword in enumerate(keywords)
+        }
+    }
+
+
+def expand_results(columnar_results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Expand the columnar search results back into the search results.
+
+    Args:
+        - columnar_results (Dict[str, Any]): The columnar search results.
+
+    Returns:
+        - List[Dict[str, Any]]: Google Trends search results
+    """
+    keywords = list(columnar_results["values"])
+    values = zip(*columnar_results["values"].values()) if keywords else ([] for _ in columnar_results["dates"])
+
+    return [
+        {
+            "date": date,
+            "is_partial": partial == '1',
+            "q_list": [{"query": keyword, "value": value} for keyword, value in zip(keywords, row)]
+        }
+        for date, partial, row in zip(columnar_results["dates"], columnar_results["is_partial"], values)
+    ]
+
+
+def get_watch_timeframe(
+        series: Optional[Dict[str, Any]],
+        lookback_days: int,
+        overlap_days: int,
+        today: date
+    ) -> str:
+    """
+    Get the time range of the next run of a watch, which starts shortly before the last complete point of its series,
+    so the window overlaps the series, or goes back by the lookback of the watch on its first run.
+
+    Args:
+        - series (Dict[str, Any] | None): The columnar series of the watch, None before its first run.
+        - lookback_days (int): Days fetched by the first run.
+        - overlap_days (int): Days the window overlaps the series by.
+        - today (date): The current date, which the window ends at.
+
+    Returns:
+        - str: The time range, in the 'YYYY-MM-DD YYYY-MM-DD' format.
+    """
+    complete_dates = [
+        point_date for point_date, partial in zip(series['dates'], series['is_partial']) if partial == '0'
+    ] if series else []
+
+    if complete_dates:
+        start = date.fromisoformat(complete_dates[-1][:10]) - timedelta(days=overlap_days)
+    else:
+        start = today - timedelta(days=lookback_days)
+
+    # Longer windows come at a coarser resolution than the series, so a watch idle for that long leaves a gap instead
+    start = max(start, today - timedelta(days=MAX_DAILY_TIMEFRAME_DAYS))
+
+    return f'{start:%Y-%m-%d} {today:%Y-%m-%d}'
+
+
+def merge_series(series: Optional[Dict[str, Any]], window: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge the columnar results of a window into the columnar series of a watch.
+
+    Google normalizes every request to its own peak of 100, so the window is rescaled to the series by the ratio of
+    their values over the complete dates they overlap on, then the window dates past the last complete date of the
+    series are appended. The partial points of the series, which Google revises, are replaced by the window.
+
+    Args:
+        - series (Dict[str, Any] | None): The columnar series of the watch, None before its first run.
+        - window (Dict[str, Any]): The columnar results of the window.
+
+    Returns:
+        - Dict[str, Any]: The merged columnar series.
+    """
+    keywords = list(series['values']) if series else list(window['values'])
+    series = series or {'dates': [], 'is_partial': '', 'values': {keyword: [] for keyword in keywords}}
+
+    complete = [index for index, partial in enumerate(series['is_partial']) if partial == '0']
+    merged = {
+        'dates': [series['dates'][index] for index in complete],
+        'is_partial': '0' * len(complete),
+        'values': {keyword: [series['values'][keyword][index] for index in complete] for keyword in keywords}
+    }
+
+    def get_window_values(keyword: str) -> List[float]:
+        return window['values'].get(keyword) or [0] * len(window['dates'])
+
+    # Values of both over the overlapping complete dates, summed over the keywords, which are normalized together
+    series_indexes = {point_date: index for index, point_date in enumerate(merged['dates'])}
+    overlap = [
+        (series_indexes[point_date], index)
+        for index, (point_date, partial) in enumerate(zip(window['dates'], window['is_partial']))
+        if partial == '0' and point_date in series_indexes
+    ]
+    series_total = sum(merged['values'][keyword][i] for keyword in keywords for i, _ in overlap)
+    window_total = sum(get_window_values(keyword)[j] for keyword in keywords for _, j in overlap)
+
+    # Without overlapping interest, the window is kept on its own scale
+    ratio = series_total / window_total if series_total and window_total else 1
+
+    last_date = merged['dates'][-1] if merged['dates'] else None
+    new_points = [
+        index for index, point_date in enumerate(window['dates']) if last_date is None or point_date > last_date
+    ]
+
+    merged['dates'] += [window['dates'][index] for index in new_points]
+    merged['is_partial'] += ''.join(window['is_partial'][index] for index in new_points)
+    for keyword in keywords:
+        window_values = get_window_values(keyword)
+        merged['values'][keyword] += [round(window_values[index] * ratio, 2) for index in new_points]
+
+    return merged
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of the conversion of the pytrends interest over time DataFrame into the search results.
+
+Run from the trends service directory:
+
+    python -m benchmarks.conversion
+"""
+import timeit
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.utils import convert_interest_over_time
+
+
+FRAMES = {
+    # Hourly points of the past 7 days ('now 7-d')
+    'hourly': pd.date_range('2025-01-01', periods=168, freq='h'),
+    # Weekly points of the past 5 years ('today 5-y')
+    '5-year': pd.date_range('2020-01-05', periods=261, freq='W'),
+}
+
+
+def build_interest_over_time_df(dates: pd.DatetimeIndex, keywords: List[str]) -> pd.DataFrame:
+    """
+    Build a DataFrame shaped like the one returned by pytrends `interest_over_time`.
+    """
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {keyword: rng.integers(0, 101, size=len(dates)) for keyword in keywords},
+        index=pd.DatetimeIndex(dates, name='date')
+    )
+    df['isPartial'] = False
+    df.iloc[-1, df.columns.get_loc('isPartial')] = True
+    return df
+
+
+def convert_interest_over_time_rows(interest_over_time_df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Row by row conversion, as the trends task performed it before the columnar conversion.
+    """
+    results = []
+    for interest in interest_over_time_df.reset_index().to_dict('records'):
+        results.append({
+            "date": interest["date"].isoformat(),
+            "is_partial": interest["isPartial"],
+            "q_list": [
+                {"query": ky, "value": interest[ky]} for ky in interest.keys() if ky not in ["date", "isPartial"]
+            ]
+        })
+    return results
+
+
+def main(number: int = 200) -> None:
+    print(f"{'frame':<10}{'keywords':>10}{'rows (ms)':>14}{'columnar (ms)':>16}{'speedup':>10}")
+
+    for frame, dates in FRAMES.items():
+        for keywords_count in (1, 5):
+            df = build_interest_over_time_df(dates, keywords=[f'keyword {i}' for i in range(keywords_count)])
+            assert convert_interest_over_time(df) == convert_interest_over_time_rows(df)
+
+            rows = min(timeit.repeat(lambda: convert_interest_over_time_rows(df), number=number, repeat=5)) / number
+            columnar = min(timeit.repeat(lambda: convert_interest_over_time(df), number=number, repeat=5)) / number
+
+            print(f"{frame:<10}{keywords_count:>10}{rows * 1000:>14.3f}{columnar * 1000:>16.3f}{rows / columnar:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
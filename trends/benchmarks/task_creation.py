@@ -0,0 +1,120 @@
+"""
+Benchmark of the throughput of the task creation route, creating tasks with an existence check before the insert
+against the single `INSERT ... ON CONFLICT DO NOTHING RETURNING` statement.
+
+The route runs in process against the Postgres database at `BENCHMARK_DATABASE_URL` (falls back to
+`SQLALCHEMY_DATABASE_URL`), whose `tasks` table is created if missing. Authentication and the celery task are stubbed
+out, so the database round trips dominate.
+
+Run from the trends service directory:
+
+    python -m benchmarks.task_creation
+"""
+import os
+import time
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from shared_utils.db.base import Base
+from shared_utils.db.session import get_db
+from shared_utils.exceptions import ObjAlreadyExist, ObjDoesNotExist
+from shared_utils.api.deps.user import get_current_user
+from shared_utils.repository.sqlalchemy import SQLAlchemyModelRepository
+
+from app.core.conf import settings
+from app.models.task import Task
+from app.api.v1 import v1_api_router
+from app.celery.tasks import trends_search_task
+from app.repositories.task import TaskModelRepository, get_task_repository
+
+
+# Tasks are created for a user that does not exist, so they can be told apart and deleted afterwards
+BENCHMARK_USER_ID = -1
+
+
+class PreCheckTaskModelRepository(TaskModelRepository):
+    """
+    Task repository creating tasks as before the single statement insert, looking the id up before inserting.
+    """
+
+    async def create(self, id: str, user_id: str, q: str, **other_fields) -> Task:
+        try:
+            await self.get_by_id(id=id)
+        except ObjDoesNotExist:
+            return await SQLAlchemyModelRepository.create(self, id=id, user_id=user_id, q=q, **other_fields)
+
+        raise ObjAlreadyExist
+
+
+def build_app(session_maker: async_sessionmaker, repository_class: type[TaskModelRepository]) -> FastAPI:
+    app = FastAPI()
+    app.include_router(v1_api_router, prefix='/api')
+
+    async def get_benchmark_db():
+        async with session_maker() as db:
+            yield db
+
+    def get_benchmark_task_repository(db: AsyncSession = Depends(get_db)) -> TaskModelRepository:
+        return repository_class(db=db)
+
+    app.dependency_overrides[get_db] = get_benchmark_db
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=BENCHMARK_USER_ID, is_admin=True)
+    app.dependency_overrides[get_task_repository] = get_benchmark_task_repository
+
+    return app
+
+
+async def measure(app: FastAPI, requests_count: int, concurrency: int) -> float:
+    payload = {'user_id': BENCHMARK_USER_ID, 'q': ['python'], 'geo': 'US'}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://benchmark') as client:
+
+        async def create_task():
+            async with semaphore:
+                response = await client.post('/api/v1/search/task/', json=payload)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(create_task() for _ in range(requests_count)))
+        return requests_count / (time.perf_counter() - started)
+
+
+async def run(database_url: str, requests_count: int, concurrency: int) -> None:
+    engine = create_async_engine(database_url, pool_size=concurrency, max_overflow=0)
+    session_maker = async_sessionmaker(engine)
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all, tables=[Task.__table__])
+
+    print(f"{'create':<14}{'requests':>10}{'concurrency':>13}{'requests/s':>13}")
+
+    try:
+        for name, repository_class in (('pre-check', PreCheckTaskModelRepository), ('single', TaskModelRepository)):
+            app = build_app(session_maker=session_maker, repository_class=repository_class)
+
+            # Warm up the connection pool before measuring
+            await measure(app, requests_count=concurrency, concurrency=concurrency)
+            throughput = await measure(app, requests_count=requests_count, concurrency=concurrency)
+
+            print(f"{name:<14}{requests_count:>10}{concurrency:>13}{throughput:>13.1f}")
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(delete(Task).where(Task.user_id == BENCHMARK_USER_ID))
+        await engine.dispose()
+
+
+def main(requests_count: int = 2000, concurrency: int = 10) -> None:
+    # Skip the broker, the benchmark measures the route and the database only
+    trends_search_task.apply_async = lambda *args, **kwargs: None
+
+    database_url = os.environ.get('BENCHMARK_DATABASE_URL', settings.SQLALCHEMY_DATABASE_URL)
+    asyncio.run(run(database_url=database_url, requests_count=requests_count, concurrency=concurrency))
+
+
+if __name__ == '__main__':
+    main()
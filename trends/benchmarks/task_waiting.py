@@ -0,0 +1,177 @@
+"""
+Benchmark of the database queries spent on clients waiting for their tasks to complete, polling the task detail route
+against waiting on the long-poll route.
+
+Every task is awaited by a few clients, while a stand-in worker moves it to in progress and then completes it through
+the task service, as the callback route does. The routes run in process against the Postgres database at
+`BENCHMARK_DATABASE_URL` (falls back to `SQLALCHEMY_DATABASE_URL`), whose `tasks` table is created if missing, and the
+redis instance at `REDIS_URL`. Authentication is stubbed out.
+
+Run from the trends service directory:
+
+    python -m benchmarks.task_waiting
+"""
+import os
+import time
+import uuid
+import asyncio
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from shared_utils.db.base import Base
+from shared_utils.schemas.status import TaskStatus
+
+from app.core.conf import settings
+from app.models.task import Task
+from app.cache import TERMINAL_STATUSES, task_detail_cache
+from app.events import task_event_broker
+from app.services.task import TaskService, get_task_service
+from app.repositories.task import TaskModelRepository, get_task_repository
+from benchmarks.task_creation import BENCHMARK_USER_ID, build_app
+
+
+class QueryCounter:
+    """
+    Counter of the select statements executed by an engine.
+    """
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.count = 0
+        event.listen(engine.sync_engine, 'before_cursor_execute', self.on_execute)
+
+    def on_execute(self, connection, cursor, statement, parameters, context, executemany) -> None:
+        if statement.lstrip().upper().startswith('SELECT'):
+            self.count += 1
+
+
+def build_polling_app(session_maker: async_sessionmaker) -> FastAPI:
+    app = build_app(session_maker=session_maker, repository_class=TaskModelRepository)
+
+    # Polling as before the task detail cache
+    def get_uncached_task_service(task_repository: TaskModelRepository = Depends(get_task_repository)) -> TaskService:
+        return TaskService(task_repository=task_repository)
+
+    app.dependency_overrides[get_task_service] = get_uncached_task_service
+    return app
+
+
+async def complete_tasks(session_maker: async_sessionmaker, task_ids: list, delay: float) -> None:
+    async def complete(task_id):
+        for status in (TaskStatus.IN_PROGRESS, TaskStatus.COMPLETED):
+            await asyncio.sleep(delay / 2)
+            async with session_maker() as db:
+                task_service = TaskService(
+                    task_repository=TaskModelRepository(db=db),
+                    task_cache=task_detail_cache,
+                    task_events=task_event_broker
+                )
+                await task_service.update_and_increment_retry_count(id=task_id, status=status)
+
+    await asyncio.gather(*(complete(task_id) for task_id in task_ids))
+
+
+async def poll(client: httpx.AsyncClient, task_id: uuid.UUID, interval: float) -> None:
+    while True:
+        response = await client.get(f'/api/v1/search/{BENCHMARK_USER_ID}/task/{task_id}/')
+        response.raise_for_status()
+        if TaskStatus(response.json()['status']) in TERMINAL_STATUSES:
+            return
+        await asyncio.sleep(interval)
+
+
+async def wait(client: httpx.AsyncClient, task_id: uuid.UUID, interval: float) -> None:
+    while True:
+        response = await client.get(f'/api/v1/search/{BENCHMARK_USER_ID}/task/{task_id}/wait/', params={'timeout': 30})
+        response.raise_for_status()
+        if TaskStatus(response.json()['status']) in TERMINAL_STATUSES:
+            return
+
+
+async def measure(
+        app: FastAPI,
+        session_maker: async_sessionmaker,
+        queries: QueryCounter,
+        client_method,
+        tasks_count: int,
+        clients_per_task: int,
+        delay: float,
+        poll_interval: float
+    ) -> float:
+    task_ids = [uuid.uuid4() for _ in range(tasks_count)]
+    async with session_maker() as db:
+        db.add_all([Task(id=task_id, user_id=BENCHMARK_USER_ID, q=['python']) for task_id in task_ids])
+        await db.commit()
+
+    queries.count = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://benchmark') as client:
+        await asyncio.gather(
+            complete_tasks(session_maker=session_maker, task_ids=task_ids, delay=delay),
+            *(
+                client_method(client, task_id, poll_interval)
+                for task_id in task_ids
+                for _ in range(clients_per_task)
+            )
+        )
+
+    # The stand-in worker updates the tasks with `UPDATE ... RETURNING` statements, so only the clients are counted
+    return queries.count / tasks_count
+
+
+async def run(
+        database_url: str,
+        tasks_count: int,
+        clients_per_task: int,
+        delay: float,
+        poll_interval: float
+    ) -> None:
+    engine = create_async_engine(database_url, pool_size=10, max_overflow=0)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    queries = QueryCounter(engine)
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all, tables=[Task.__table__])
+
+    print(f"{'clients':<22}{'tasks':>7}{'clients/task':>14}{'queries/task':>14}{'seconds':>10}")
+
+    try:
+        cases = (
+            ('polling', build_polling_app(session_maker), poll),
+            ('polling (cached)', build_app(session_maker, TaskModelRepository), poll),
+            ('waiting', build_app(session_maker, TaskModelRepository), wait),
+        )
+        for name, app, client_method in cases:
+            started = time.perf_counter()
+            queries_per_task = await measure(
+                app=app,
+                session_maker=session_maker,
+                queries=queries,
+                client_method=client_method,
+                tasks_count=tasks_count,
+                clients_per_task=clients_per_task,
+                delay=delay,
+                poll_interval=poll_interval
+            )
+            elapsed = time.perf_counter() - started
+
+            print(f"{name:<22}{tasks_count:>7}{clients_per_task:>14}{queries_per_task:>14.1f}{elapsed:>10.2f}")
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(delete(Task).where(Task.user_id == BENCHMARK_USER_ID))
+        await engine.dispose()
+
+
+def main(tasks_count: int = 50, clients_per_task: int = 4, delay: float = 3, poll_interval: float = 0.25) -> None:
+    database_url = os.environ.get('BENCHMARK_DATABASE_URL', settings.SQLALCHEMY_DATABASE_URL)
+    asyncio.run(run(
+        database_url=database_url,
+        tasks_count=tasks_count,
+        clients_per_task=clients_per_task,
+        delay=delay,
+        poll_interval=poll_interval
+    ))
+
+
+if __name__ == '__main__':
+    main()
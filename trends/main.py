@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from prometheus_client import REGISTRY
 from prometheus_fastapi_instrumentator import Instrumentator
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
@@ -12,6 +13,7 @@ from shared_utils.core.lifespan import lifespan
 from shared_utils.db.session import engine
 
 from app.core.conf import settings
+from app.core.metrics import WorkerMetricsCollector
 from app.api.v1 import v1_api_router
 
 
@@ -44,6 +46,9 @@ app.include_router(v1_api_router, prefix='/api')
 # Instrument Prometheus
 Instrumentator().instrument(app).expose(app, endpoint='/api/search/metrics')
 
+# Expose the metrics recorded by the celery workers
+REGISTRY.register(WorkerMetricsCollector())
+
 # Instrument FastAPI
 EXCLUDED_URLS = [
     "/api/search/metrics",
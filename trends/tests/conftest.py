@@ -0,0 +1,112 @@
+import dotenv
+import pytest
+from testcontainers.redis import RedisContainer
+from testcontainers.postgres import PostgresContainer
+
+from tests.utils.proxy import StandInProxy
+from tests.utils.trends_server import FakeTrendsServer
+
+
+@pytest.fixture(scope="session")
+def redis_container():
+    redis = RedisContainer(
+        image="redis:7.4-alpine"
+    ).with_exposed_ports(
+        6379
+    )
+
+    redis.start()
+
+    yield redis
+
+    redis.stop()
+
+
+@pytest.fixture(scope="session")
+def postgres_container():
+    postgres = PostgresContainer(
+        image="postgres:16-alpine",
+        driver="asyncpg"
+    )
+
+    postgres.start()
+
+    yield postgres
+
+    postgres.stop()
+
+
+@pytest.fixture(scope="session")
+def app_setup_and_teardown(redis_container):
+    dotenv.load_dotenv('.env.test')
+
+    import os
+    host, port = redis_container.get_container_host_ip(), redis_container.get_exposed_port(6379)
+    os.environ['REDIS_URL'] = f'redis://{host}:{port}/0'
+
+    yield
+
+
+@pytest.fixture(scope="function")
+def redis_client(app_setup_and_teardown):
+    from app.core.redis import get_redis_client
+
+    client = get_redis_client()
+
+    yield client
+
+    client.flushdb()
+
+
+@pytest.fixture(scope="function")
+def database_url(app_setup_and_teardown, postgres_container):
+    import asyncio
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from shared_utils.db.base import Base
+    from app.models.task import Task  # noqa: F401, registers the tasks table
+    from app.models.watch import Watch  # noqa: F401, registers the watches table
+
+    url = postgres_container.get_connection_url()
+
+    async def run_sync(method):
+        engine = create_async_engine(url)
+        async with engine.begin() as connection:
+            await connection.run_sync(method)
+        await engine.dispose()
+
+    asyncio.run(run_sync(Base.metadata.create_all))
+
+    yield url
+
+    asyncio.run(run_sync(Base.metadata.drop_all))
+
+
+@pytest.fixture(scope="function")
+def trends_server(monkeypatch):
+    from pytrends import request
+
+    server = FakeTrendsServer()
+    server.start()
+
+    # Point pytrends at the fake server
+    monkeypatch.setattr(request, 'BASE_TRENDS_URL', server.url)
+    monkeypatch.setattr(request.TrendReq, 'GENERAL_URL', f'{server.url}/api/explore')
+    monkeypatch.setattr(request.TrendReq, 'INTEREST_OVER_TIME_URL', f'{server.url}/api/widgetdata/multiline')
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="function")
+def proxies():
+    servers = [StandInProxy(), StandInProxy()]
+    for server in servers:
+        server.start()
+
+    yield servers
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,109 @@
+import json
+import time
+import threading
+
+import redis
+import pytest
+
+
+def build_results(series):
+    return [
+        {
+            'date': f'2025-01-0{i + 1}',
+            'is_partial': False,
+            'q_list': [{'query': keyword, 'value': values[i]} for keyword, values in series.items()]
+        }
+        for i in range(len(next(iter(series.values()))))
+    ]
+
+
+def get_values(outcome):
+    return [point['q_list'][0]['value'] for point in outcome['result']]
+
+
+def test_split_batch_results_rescales_every_keyword_to_its_own_peak(app_setup_and_teardown):
+    from app.celery.batching import split_batch_results
+
+    results = build_results({'python': [50, 100], 'java': [10, 20]})
+
+    outcomes = split_batch_results(results=results, keywords=['python', 'java'], min_peak=10)
+
+    assert get_values(outcomes['python']) == [50, 100]
+    assert get_values(outcomes['java']) == [50, 100]
+    assert outcomes['java']['result'][0]['date'] == '2025-01-01'
+    assert outcomes['java']['result'][0]['q_list'][0]['query'] == 'java'
+
+
+def test_split_batch_results_flags_keywords_below_the_min_peak(app_setup_and_teardown):
+    from app.celery.batching import UNBATCHED_MARKER, split_batch_results
+
+    results = build_results({'python': [50, 100], 'java': [3, 5]})
+
+    outcomes = split_batch_results(results=results, keywords=['python', 'java'], min_peak=10)
+
+    assert outcomes['java'] == UNBATCHED_MARKER
+    assert get_values(outcomes['python']) == [50, 100]
+
+
+def test_split_batch_results_of_a_keyword_without_interest(app_setup_and_teardown):
+    from app.celery.batching import UNBATCHED_MARKER, split_batch_results
+
+    results = build_results({'python': [50, 100], 'java': [0, 0]})
+
+    assert split_batch_results(results=results, keywords=['python', 'java'], min_peak=10)['java'] == UNBATCHED_MARKER
+    assert get_values(split_batch_results(results=results, keywords=['python', 'java'], min_peak=0)['java']) == [0, 0]
+
+
+def test_split_batch_results_of_a_single_keyword(app_setup_and_teardown):
+    from app.celery.batching import split_batch_results
+
+    results = build_results({'python': [5, 10]})
+
+    assert split_batch_results(results=results, keywords=['python'], min_peak=10) == {'python': {'result': results}}
+
+
+def test_lease_is_renewed_while_the_packed_request_is_slow(redis_client):
+    from app.celery.batching import KeywordBatcher
+
+    # The request outlasts the lease, as it does when the lease holder waits for the rate limit
+    batcher = KeywordBatcher(prefix='test:batch', window=0.5, lease_timeout=1, wait_timeout=5, poll_interval=0.05)
+    fetches = []
+    results = {}
+
+    def fetch(keywords):
+        fetches.append(sorted(keywords))
+        time.sleep(2)
+        return build_results({keyword: [50, 100] for keyword in keywords})
+
+    def run(keyword):
+        results[keyword] = batcher.run(key='search', keyword=keyword, fetch=fetch)
+
+    threads = [threading.Thread(target=run, args=(keyword,)) for keyword in ('python', 'java')]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.1)
+    for thread in threads:
+        thread.join()
+
+    assert fetches == [['java', 'python']]
+    assert get_values({'result': results['python']}) == get_values({'result': results['java']}) == [50, 100]
+
+
+def test_failed_collect_releases_the_lease_and_the_taken_keywords(redis_client):
+    from app.celery.batching import UNBATCHED_MARKER, KeywordBatcher
+
+    class FailingKeywordBatcher(KeywordBatcher):
+
+        def _collect(self, client, key, keywords):
+            super()._collect(client=client, key=key, keywords=keywords)
+            raise redis.ConnectionError("Connection lost")
+
+    batcher = FailingKeywordBatcher(prefix='test:batch', window=0.1, poll_interval=0.05)
+    # The keyword of another worker waiting for the batch
+    redis_client.sadd('test:batch:pending:search', 'java')
+
+    results = batcher.run(key='search', keyword='python', fetch=pytest.fail)
+
+    assert results is None
+    assert redis_client.get('test:batch:lease:search') is None
+    assert json.loads(redis_client.get('test:batch:result:search:java')) == UNBATCHED_MARKER
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from tests.utils.task_service import FakeTaskService
+
+
+@pytest.fixture(scope="function")
+def task_service():
+    server = FakeTaskService()
+    server.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="function")
+def dispatcher(redis_client, task_service):
+    from app.celery.callbacks import CallbackDispatcher
+
+    dispatcher = CallbackDispatcher(base_url=task_service.url, batch_size=10, flush_interval=0.1, backoff=0.01)
+
+    yield dispatcher
+
+    dispatcher.close()
+
+
+def test_merge_callback_payloads(app_setup_and_teardown):
+    from app.celery.callbacks import merge_callback_payloads
+
+    pending = {'status': 'retry', 'error': {'code': 500, 'error': 'timeout'}, 'increment_retry_count': True}
+    payload = {'status': 'in_progress', 'increment_retry_count': True}
+
+    assert merge_callback_payloads(pending, payload) == {
+        'status': 'in_progress',
+        'error': {'code': 500, 'error': 'timeout'},
+        'increment_retry_count': 2
+    }
+
+
+def test_callbacks_are_coalesced_and_batched(dispatcher, task_service):
+    from app.core.security import create_task_signature
+
+    dispatcher.dispatch(task_id='task-1', payload={'status': 'in_progress', 'increment_retry_count': True})
+    dispatcher.dispatch(task_id='task-2', payload={'status': 'in_progress', 'increment_retry_count': True})
+    dispatcher.dispatch(task_id='task-1', payload={'status': 'completed', 'result_data': None})
+    dispatcher.close()
+
+    assert len(task_service.requests) == 1
+
+    path, signature, body = task_service.requests[0]
+    assert path == '/tasks/callback/'
+    assert body == {
+        'items': [
+            {'task_id': 'task-1', 'status': 'completed', 'result_data': None, 'increment_retry_count': 1},
+            {'task_id': 'task-2', 'status': 'in_progress', 'increment_retry_count': True},
+        ]
+    }
+    assert signature == create_task_signature(message=json.dumps(body))
+
+
+def test_callbacks_are_retried(dispatcher, task_service):
+    task_service.status_codes = [503, 503]
+
+    dispatcher.dispatch(task_id='task-1', payload={'status': 'completed'})
+    dispatcher.close()
+
+    assert len(task_service.requests) == 3
+    assert task_service.requests[-1][2] == {'items': [{'task_id': 'task-1', 'status': 'completed'}]}
+
+
+def test_callbacks_retried_after_a_timeout_share_the_idempotency_key(redis_client, task_service):
+    from app.celery.callbacks import CallbackDispatcher
+
+    # The first request is applied, but its response arrives after the dispatcher gave up on it
+    task_service.delays = [0.5]
+    dispatcher = CallbackDispatcher(base_url=task_service.url, flush_interval=0.1, backoff=0.01, timeout=0.2)
+
+    dispatcher.dispatch(task_id='task-1', payload={'status': 'in_progress', 'increment_retry_count': True})
+    dispatcher.close()
+
+    assert len(task_service.requests) == 2
+    assert task_service.requests[0] == task_service.requests[1]
+    assert len(set(task_service.idempotency_keys)) == 1
+
+
+def test_callbacks_fall_back_to_the_task_endpoint(dispatcher, task_service):
+    from app.core.security import create_task_signature
+
+    task_service.bulk_enabled = False
+
+    dispatcher.dispatch(task_id='task-1', payload={'status': 'completed'})
+    dispatcher.close()
+
+    assert task_service.requests == [
+        ('/task/task-1/callback/', create_task_signature(message='task-1'), {'status': 'completed'})
+    ]
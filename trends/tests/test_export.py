@@ -0,0 +1,77 @@
+import gzip
+import json
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+
+async def collect(chunks):
+    return b''.join([chunk async for chunk in chunks])
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_stream_ndjson(app_setup_and_teardown, monkeypatch, compress):
+    import pydantic
+    from app import export
+
+    class Row(pydantic.BaseModel):
+        id: int
+        name: str = pydantic.Field(serialization_alias='title')
+
+    async def rows():
+        for i in range(1000):
+            yield {'id': i, 'name': f'row {i}'}
+
+    # Small chunks, so the rows span many of them
+    monkeypatch.setattr(export, 'CHUNK_SIZE', 256)
+
+    content = asyncio.run(collect(export.stream_ndjson(rows(), schema=Row, compress=compress)))
+    if compress:
+        content = gzip.decompress(content)
+
+    lines = content.decode().splitlines()
+    assert [json.loads(line) for line in lines] == [{'id': i, 'title': f'row {i}'} for i in range(1000)]
+
+
+def test_stream_tasks(database_url):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from shared_utils.schemas.status import TaskStatus
+    from app.models.task import Task
+    from app.repositories.task import TaskModelRepository
+
+    created_at = datetime(2025, 1, 1)
+    tasks = [
+        Task(
+            id=uuid.uuid4(),
+            user_id=4,
+            q=['python'],
+            status=TaskStatus.COMPLETED if i % 2 else TaskStatus.FAILED,
+            created_at=created_at + timedelta(days=i)
+        )
+        for i in range(10)
+    ]
+    expected_ids = [task.id for task in tasks[3:8] if task.status == TaskStatus.COMPLETED]
+
+    async def run():
+        engine = create_async_engine(database_url)
+
+        async with AsyncSession(engine) as db:
+            db.add_all(tasks)
+            await db.commit()
+
+        async with AsyncSession(engine) as db:
+            stream = TaskModelRepository(db=db).stream(
+                created_after=created_at + timedelta(days=3),
+                created_before=created_at + timedelta(days=8),
+                batch_size=2,
+                user_id=4,
+                status=TaskStatus.COMPLETED
+            )
+            ids = [task.id async for task in stream]
+
+        await engine.dispose()
+        return ids
+
+    assert asyncio.run(run()) == expected_ids
@@ -0,0 +1,18 @@
+def test_rate_limit_rate_is_reported_by_scope(redis_client):
+    from app.core.metrics import WorkerMetricsCollector
+    from app.celery.rate_limit import AdaptiveRateLimiter
+
+    rate_limiter = AdaptiveRateLimiter(key='test:rate_limit', initial_rate=1, additive_increase=0.5)
+    rate_limiter.record_success()
+    rate_limiter.record_success(scope='proxy-1')
+    rate_limiter.record_success(scope='proxy-1')
+
+    metric_family, = [
+        metric_family for metric_family in WorkerMetricsCollector().collect()
+        if metric_family.name == 'trends_rate_limit_rate'
+    ]
+
+    assert {sample.labels['scope']: sample.value for sample in metric_family.samples} == {
+        'default': 1.5,
+        'proxy-1': 2
+    }
@@ -0,0 +1,134 @@
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def test_cursor_round_trip(app_setup_and_teardown):
+    from app.pagination import decode_cursor, encode_cursor
+
+    created_at, id = datetime(2025, 3, 22, 23, 53, 48, 275961), uuid.uuid4()
+
+    assert decode_cursor(encode_cursor(created_at=created_at, id=id), id_type=uuid.UUID) == (created_at, id)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not a cursor', 'WyIyMDI1Il0'])
+def test_decode_invalid_cursor(app_setup_and_teardown, cursor):
+    from app.exceptions import InvalidCursor
+    from app.pagination import decode_cursor
+
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, id_type=uuid.UUID)
+
+
+def test_cursor_pagination_walks_every_task_once(database_url):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.models.task import Task
+    from app.schemas.task import TaskRetrieve
+    from app.pagination import CursorPaginationQueryParams
+    from app.repositories.task import TaskModelRepository
+
+    created_at = datetime(2025, 1, 1)
+    # Tasks created at the same time are ordered by their id
+    tasks = [
+        Task(id=uuid.uuid4(), user_id=1, q=['python'], created_at=created_at + timedelta(minutes=i // 2))
+        for i in range(25)
+    ]
+    other_user_task = Task(id=uuid.uuid4(), user_id=2, q=['java'], created_at=created_at)
+    expected_ids = [task.id for task in sorted(tasks, key=lambda task: (task.created_at, task.id), reverse=True)]
+
+    async def run():
+        engine = create_async_engine(database_url)
+
+        async with AsyncSession(engine) as db:
+            db.add_all([*tasks, other_user_task])
+            await db.commit()
+
+        pages, cursor = [], None
+        async with AsyncSession(engine) as db:
+            repository = TaskModelRepository(db=db)
+            while True:
+                page = await repository.get_cursor_paginated(
+                    query_params=CursorPaginationQueryParams(cursor=cursor, page_size=10, include_total=not pages),
+                    response_schema=TaskRetrieve,
+                    user_id=1
+                )
+                pages.append(page)
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+
+        await engine.dispose()
+        return pages
+
+    pages = asyncio.run(run())
+
+    assert [task.task_id for page in pages for task in page.results] == expected_ids
+    assert [len(page.results) for page in pages] == [10, 10, 5]
+    assert [page.total for page in pages] == [25, None, None]
+
+
+@pytest.mark.parametrize('query, expected_fields', [
+    ({}, None),
+    ({'include_results': False}, 'all'),
+    ({'fields': 'status, created_at'}, {'task_id', 'status', 'created_at'}),
+])
+def test_task_list_summary_schema(app_setup_and_teardown, query, expected_fields):
+    from app.schemas.task import TaskCursorListQueryParams, TaskSummary
+
+    summary_schema = TaskCursorListQueryParams(**query).get_summary_schema()
+
+    if expected_fields is None:
+        assert summary_schema is None
+    elif expected_fields == 'all':
+        assert summary_schema is TaskSummary
+    else:
+        assert set(summary_schema.model_fields) == expected_fields
+
+
+def test_task_list_unknown_summary_field(app_setup_and_teardown):
+    import pydantic
+    from app.schemas.task import TaskPageListQueryParams
+
+    with pytest.raises(pydantic.ValidationError):
+        TaskPageListQueryParams(fields='status,result_data')
+
+
+def test_cursor_pagination_of_summaries_skips_results(database_url):
+    from sqlalchemy import inspect
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from shared_utils.schemas.status import TaskStatus
+    from app.models.task import Task
+    from app.pagination import CursorPaginationQueryParams
+    from app.repositories.task import TaskModelRepository
+    from app.schemas.task import get_summary_columns, get_task_summary_schema
+
+    summary_schema = get_task_summary_schema(fields=frozenset({'status'}))
+    task_id = uuid.uuid4()
+
+    async def run():
+        engine = create_async_engine(database_url)
+
+        async with AsyncSession(engine) as db:
+            db.add(Task(id=task_id, user_id=3, q=['python'], result_data={'python': [1, 2, 3]}))
+            await db.commit()
+
+        async with AsyncSession(engine) as db:
+            page = await TaskModelRepository(db=db).get_cursor_paginated(
+                query_params=CursorPaginationQueryParams(),
+                response_schema=summary_schema,
+                columns=get_summary_columns(summary_schema),
+                user_id=3
+            )
+            unloaded = inspect(await db.get(Task, task_id)).unloaded
+
+        await engine.dispose()
+        return page, unloaded
+
+    page, unloaded = asyncio.run(run())
+
+    assert [summary.model_dump(by_alias=True) for summary in page.results] == [
+        {'task_id': task_id, 'status': TaskStatus.PENDING}
+    ]
+    assert {'result_data', 'error', 'q'} <= unloaded
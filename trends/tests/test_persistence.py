@@ -0,0 +1,87 @@
+import uuid
+import asyncio
+
+import pytest
+
+
+class RecordingDispatcher:
+
+    def __init__(self):
+        self.dispatched = []
+
+    def is_pending(self, task_id):
+        return False
+
+    def dispatch(self, task_id, payload):
+        self.dispatched.append((task_id, payload))
+
+
+async def create_task(url, task_id):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.models.task import Task
+
+    engine = create_async_engine(url)
+    async with AsyncSession(engine) as db:
+        db.add(Task(id=task_id, user_id=1, q=['python'], retry_count=0))
+        await db.commit()
+    await engine.dispose()
+
+
+async def get_task(url, task_id):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.models.task import Task
+
+    engine = create_async_engine(url)
+    async with AsyncSession(engine) as db:
+        task = await db.get(Task, task_id)
+    await engine.dispose()
+    return task
+
+
+@pytest.fixture(scope="function")
+def dispatcher():
+    return RecordingDispatcher()
+
+
+@pytest.fixture(scope="function")
+def result_store(redis_client, database_url, dispatcher):
+    from app.celery.persistence import TaskResultStore
+
+    store = TaskResultStore(database_url=database_url, dispatcher=dispatcher)
+
+    yield store
+
+    store.close()
+
+
+def test_update_is_written_to_the_database(result_store, dispatcher, database_url):
+    from shared_utils.schemas.status import TaskStatus
+
+    task_id = uuid.uuid4()
+    asyncio.run(create_task(database_url, task_id))
+
+    result_store.persist(task_id=str(task_id), payload={'status': 'in_progress', 'increment_retry_count': True})
+    result_store.persist(task_id=str(task_id), payload={'status': 'completed', 'result_data': {'python': [1, 2]}})
+
+    task = asyncio.run(get_task(database_url, task_id))
+
+    assert task.status == TaskStatus.COMPLETED
+    assert task.result_data == {'python': [1, 2]}
+    assert task.retry_count == 1
+    assert dispatcher.dispatched == []
+
+
+def test_failed_write_falls_back_to_the_dispatcher(result_store, dispatcher, monkeypatch):
+    from sqlalchemy.exc import SQLAlchemyError
+    from app.repositories.task import TaskModelRepository
+
+    async def bulk_update(self, updates):
+        raise SQLAlchemyError("Database is unavailable")
+
+    monkeypatch.setattr(TaskModelRepository, 'bulk_update', bulk_update)
+
+    task_id = str(uuid.uuid4())
+    payload = {'status': 'completed', 'result_data': {'python': [1, 2]}}
+    result_store.persist(task_id=task_id, payload=payload)
+
+    assert dispatcher.dispatched == [(task_id, payload)]
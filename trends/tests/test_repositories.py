@@ -0,0 +1,243 @@
+import uuid
+import asyncio
+
+import pytest
+
+
+CONCURRENT_CALLBACKS = 20
+
+
+async def create_task(engine, task_id):
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from app.models.task import Task
+
+    async with AsyncSession(engine) as db:
+        db.add(Task(id=task_id, user_id=1, q=['python'], retry_count=0))
+        await db.commit()
+
+
+async def get_task(engine, task_id):
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from app.models.task import Task
+
+    async with AsyncSession(engine) as db:
+        return await db.get(Task, task_id)
+
+
+def test_update_and_increment_retry_count(database_url):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from shared_utils.schemas.status import TaskStatus
+    from app.repositories.task import TaskModelRepository
+
+    task_id = uuid.uuid4()
+
+    async def run():
+        engine = create_async_engine(database_url)
+        await create_task(engine, task_id)
+
+        async with AsyncSession(engine) as db:
+            task = await TaskModelRepository(db=db).update_and_increment_retry_count(
+                id=str(task_id),
+                increment_by=2,
+                status=TaskStatus.RETRY,
+                error={'code': 500, 'error': 'timeout'}
+            )
+
+        stored_task = await get_task(engine, task_id)
+        await engine.dispose()
+        return task, stored_task
+
+    task, stored_task = asyncio.run(run())
+
+    # The returned task holds the updated values, even after the commit
+    assert (task.status, task.retry_count) == (TaskStatus.RETRY, 2)
+    assert (stored_task.status, stored_task.retry_count) == (TaskStatus.RETRY, 2)
+    assert stored_task.error == {'code': 500, 'error': 'timeout'}
+
+
+def test_update_and_increment_retry_count_of_missing_task(database_url):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from shared_utils.exceptions import ObjDoesNotExist
+    from app.repositories.task import TaskModelRepository
+
+    async def run():
+        engine = create_async_engine(database_url)
+
+        try:
+            async with AsyncSession(engine) as db:
+                await TaskModelRepository(db=db).update_and_increment_retry_count(id=str(uuid.uuid4()), increment_by=1)
+        finally:
+            await engine.dispose()
+
+    with pytest.raises(ObjDoesNotExist):
+        asyncio.run(run())
+
+
+def test_concurrent_callbacks_lose_no_retry_count_increment(database_url):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from shared_utils.schemas.status import TaskStatus
+    from app.repositories.task import TaskModelRepository
+
+    task_id = uuid.uuid4()
+
+    async def callback(engine, status):
+        async with AsyncSession(engine) as db:
+            await TaskModelRepository(db=db).update_and_increment_retry_count(
+                id=str(task_id),
+                increment_by=1,
+                status=status
+            )
+
+    async def run():
+        engine = create_async_engine(database_url, pool_size=CONCURRENT_CALLBACKS, max_overflow=0)
+        await create_task(engine, task_id)
+
+        # Every callback runs on its own connection, racing the others on the same row
+        await asyncio.gather(*(
+            callback(engine, TaskStatus.IN_PROGRESS if i % 2 else TaskStatus.RETRY)
+            for i in range(CONCURRENT_CALLBACKS)
+        ))
+
+        task = await get_task(engine, task_id)
+        await engine.dispose()
+        return task
+
+    task = asyncio.run(run())
+
+    assert task.retry_count == CONCURRENT_CALLBACKS
+
+
+def test_concurrent_service_callbacks_lose_no_retry_count_increment(database_url):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from shared_utils.schemas.status import TaskStatus
+    from app.services.task import TaskService
+    from app.schemas.task import TrendTaskBulkUpdateItem
+    from app.repositories.task import TaskModelRepository
+
+    task_ids = [uuid.uuid4(), uuid.uuid4()]
+
+    async def bulk_callback(engine):
+        # The callbacks of the same task are merged into a single row of the statement
+        items = [
+            TrendTaskBulkUpdateItem(task_id=task_id, status=status, increment_retry_count=1)
+            for status in (TaskStatus.RETRY, TaskStatus.IN_PROGRESS)
+            for task_id in task_ids
+        ]
+        async with AsyncSession(engine) as db:
+            await TaskService(task_repository=TaskModelRepository(db=db)).bulk_update(items=items)
+
+    async def callback(engine):
+        async with AsyncSession(engine) as db:
+            await TaskService(task_repository=TaskModelRepository(db=db)).update_and_increment_retry_count(
+                id=str(task_ids[0]),
+                increment_by=1,
+                status=TaskStatus.IN_PROGRESS
+            )
+
+    async def run():
+        engine = create_async_engine(database_url, pool_size=CONCURRENT_CALLBACKS, max_overflow=0)
+        for task_id in task_ids:
+            await create_task(engine, task_id)
+
+        # Bulk and single callbacks race each other on the same rows, every one on its own connection
+        await asyncio.gather(*(
+            bulk_callback(engine) if i % 2 else callback(engine)
+            for i in range(CONCURRENT_CALLBACKS)
+        ))
+
+        tasks = [await get_task(engine, task_id) for task_id in task_ids]
+        await engine.dispose()
+        return tasks
+
+    first_task, second_task = asyncio.run(run())
+
+    bulk_callbacks = CONCURRENT_CALLBACKS // 2
+    assert first_task.retry_count == bulk_callbacks * 2 + (CONCURRENT_CALLBACKS - bulk_callbacks)
+    assert second_task.retry_count == bulk_callbacks * 2
+    assert second_task.status == TaskStatus.IN_PROGRESS
+
+
+def test_create_task_conflict(database_url):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from shared_utils.exceptions import ObjAlreadyExist
+    from app.repositories.task import TaskModelRepository
+
+    task_id = uuid.uuid4()
+
+    async def run():
+        engine = create_async_engine(database_url)
+
+        try:
+            async with AsyncSession(engine) as db:
+                task = await TaskModelRepository(db=db).create(id=str(task_id), user_id=1, q=['python'], geo='US')
+
+            # The returned task holds its defaults, even after the commit
+            assert (task.id, task.q, task.geo, task.retry_count) == (task_id, ['python'], 'US', 0)
+
+            async with AsyncSession(engine) as db:
+                await TaskModelRepository(db=db).create(id=str(task_id), user_id=2, q=['java'])
+        finally:
+            await engine.dispose()
+
+    with pytest.raises(ObjAlreadyExist):
+        asyncio.run(run())
+
+
+def test_bulk_update(database_url):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from shared_utils.schemas.status import TaskStatus
+    from app.repositories.task import TaskModelRepository
+
+    completed_id, failed_id, retried_id, missing_id = (uuid.uuid4() for _ in range(4))
+    result_data = {'dates': ['2025-01-05T00:00:00'], 'is_partial': '0', 'values': {'python': [40]}}
+    error = {'code': 429, 'error': 'Too many requests'}
+
+    async def run():
+        engine = create_async_engine(database_url)
+        for task_id in (completed_id, failed_id, retried_id):
+            await create_task(engine, task_id)
+
+        # Every task is updated by the same statement
+        async with AsyncSession(engine) as db:
+            updated_ids = await TaskModelRepository(db=db).bulk_update(updates=[
+                {'id': completed_id, 'status': TaskStatus.COMPLETED, 'result_data': result_data},
+                {'id': failed_id, 'status': TaskStatus.FAILED, 'error': error, 'increment_retry_count': 1},
+                {'id': retried_id, 'status': TaskStatus.RETRY, 'increment_retry_count': 2},
+                {'id': missing_id, 'status': TaskStatus.COMPLETED},
+            ])
+
+        # A missing status leaves the current one, and the increments add up to the current count
+        async with AsyncSession(engine) as db:
+            second_updated_ids = await TaskModelRepository(db=db).bulk_update(updates=[
+                {'id': retried_id, 'status': None, 'increment_retry_count': 3},
+            ])
+
+        tasks = [await get_task(engine, task_id) for task_id in (completed_id, failed_id, retried_id)]
+        await engine.dispose()
+        return updated_ids, second_updated_ids, tasks
+
+    updated_ids, second_updated_ids, (completed, failed, retried) = asyncio.run(run())
+
+    # The missing task is left out of the updated ones
+    assert updated_ids == {completed_id, failed_id, retried_id}
+    assert second_updated_ids == {retried_id}
+
+    assert (completed.status, completed.result_data, completed.error, completed.retry_count) == (
+        TaskStatus.COMPLETED, result_data, None, 0
+    )
+    assert (failed.status, failed.result_data, failed.error, failed.retry_count) == (TaskStatus.FAILED, None, error, 1)
+    assert (retried.status, retried.retry_count) == (TaskStatus.RETRY, 5)
+
+
+def test_bulk_update_of_empty_updates(database_url):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.repositories.task import TaskModelRepository
+
+    async def run():
+        engine = create_async_engine(database_url)
+        async with AsyncSession(engine) as db:
+            updated_ids = await TaskModelRepository(db=db).bulk_update(updates=[])
+        await engine.dispose()
+        return updated_ids
+
+    assert asyncio.run(run()) == set()
@@ -0,0 +1,93 @@
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def build_tasks(now):
+    from app.models.task import Task
+
+    return [
+        # Due, most overdue last
+        *(Task(id=uuid.uuid4(), user_id=5, q=['python'], schedule_at=now - timedelta(minutes=i)) for i in range(1, 4)),
+        # Scheduled for later
+        Task(id=uuid.uuid4(), user_id=5, q=['python'], schedule_at=now + timedelta(hours=1)),
+        # Due and already dispatched
+        Task(id=uuid.uuid4(), user_id=5, q=['python'], schedule_at=now - timedelta(hours=1), dispatched_at=now),
+    ]
+
+
+def test_dispatch_due_tasks_in_batches(database_url):
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.scheduler import TaskScheduler
+
+    tasks = build_tasks(now=datetime.now())
+    dispatched = []
+
+    async def run():
+        engine = create_async_engine(database_url)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+        async with session_maker() as db:
+            db.add_all(tasks)
+            await db.commit()
+
+        scheduler = TaskScheduler(
+            session_maker=session_maker,
+            dispatch=lambda task_id, task: dispatched.append((task_id, task.q)),
+            batch_size=2
+        )
+        batches = [await scheduler.dispatch_due() for _ in range(3)]
+
+        await engine.dispose()
+        return batches
+
+    assert asyncio.run(run()) == [2, 1, 0]
+    assert dispatched == [(str(task.id), ['python']) for task in reversed(tasks[:3])]
+
+
+def test_claim_due_skips_tasks_claimed_by_another_scheduler(database_url):
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.repositories.task import TaskModelRepository
+
+    now = datetime.now()
+    tasks = build_tasks(now=now)
+
+    async def run():
+        engine = create_async_engine(database_url)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+        async with session_maker() as db:
+            db.add_all(tasks)
+            await db.commit()
+
+        async with session_maker() as db, session_maker() as other_db:
+            claimed = [task.id for task in await TaskModelRepository(db=db).claim_due(now=now, limit=2)]
+            other_claimed = [task.id for task in await TaskModelRepository(db=other_db).claim_due(now=now, limit=2)]
+            # Rolling back leaves the tasks to be claimed again
+            await db.rollback()
+            await other_db.commit()
+
+        async with session_maker() as db:
+            reclaimed = [task.id for task in await TaskModelRepository(db=db).claim_due(now=now, limit=10)]
+            await db.commit()
+
+        await engine.dispose()
+        return claimed, other_claimed, reclaimed
+
+    claimed, other_claimed, reclaimed = asyncio.run(run())
+
+    assert claimed == [tasks[2].id, tasks[1].id]
+    assert other_claimed == [tasks[0].id]
+    assert reclaimed == claimed
+
+
+def test_scheduler_without_dispatch_due_cannot_be_created(app_setup_and_teardown):
+    from app.scheduler import Scheduler
+
+    class IncompleteScheduler(Scheduler):
+        ...
+
+    with pytest.raises(TypeError):
+        IncompleteScheduler(session_maker=None)
@@ -0,0 +1,78 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import pydantic
+
+
+RESULTS = [
+    {'date': '2025-01-05T00:00:00', 'is_partial': False, 'q_list': [{'query': 'python', 'value': 40}]},
+    {'date': '2025-01-12T00:00:00', 'is_partial': True, 'q_list': [{'query': 'python', 'value': 100}]},
+]
+
+COLUMNAR_RESULTS = {
+    'dates': ['2025-01-05T00:00:00', '2025-01-12T00:00:00'],
+    'is_partial': '01',
+    'values': {'python': [40, 100]}
+}
+
+
+def build_task(result_data):
+    from app.models.task import TaskStatus
+
+    return SimpleNamespace(
+        id='5d0c5a0e-4f6e-4a3a-9d47-6f7b2f1d8c11', user_id=1, q=['python'], geo='', time=None, cat=0, gprop=None,
+        tz=0, schedule_at=datetime.now(), status=TaskStatus.COMPLETED, result_data=result_data, error=None,
+        retry_count=1, created_at=datetime.now(), updated_at=datetime.now()
+    )
+
+
+@pytest.mark.parametrize('result_data', [RESULTS, COLUMNAR_RESULTS])
+def test_task_retrieve_expands_results(result_data):
+    from app.schemas.task import TaskRetrieve
+
+    task = TaskRetrieve.model_validate(build_task(result_data))
+
+    assert task.model_dump(mode='json')['result_data'] == RESULTS
+
+
+@pytest.mark.parametrize('result_data', [RESULTS, COLUMNAR_RESULTS])
+def test_task_columnar_retrieve_compacts_results(result_data):
+    from app.schemas.task import TaskColumnarRetrieve
+
+    task = TaskColumnarRetrieve.model_validate(build_task(result_data))
+
+    assert task.model_dump(mode='json')['result_data'] == COLUMNAR_RESULTS
+
+
+def test_trend_task_update_stores_columnar_results():
+    from app.schemas.task import TrendTaskUpdate
+
+    assert TrendTaskUpdate(result_data=RESULTS).model_dump()['result_data'] == COLUMNAR_RESULTS
+    assert TrendTaskUpdate(result_data=COLUMNAR_RESULTS).model_dump()['result_data'] == COLUMNAR_RESULTS
+
+    with pytest.raises(pydantic.ValidationError):
+        TrendTaskUpdate(result_data={**COLUMNAR_RESULTS, 'is_partial': '0'})
+
+
+@pytest.mark.parametrize('result_data', [
+    [{'is_partial': False, 'q_list': [{'query': 'python', 'value': 40}]}],
+    [{'date': '2025-01-05T00:00:00', 'is_partial': False}],
+    [
+        {'date': '2025-01-05T00:00:00', 'is_partial': False, 'q_list': [{'query': 'python', 'value': 40}]},
+        {'date': '2025-01-12T00:00:00', 'is_partial': True, 'q_list': []},
+    ],
+    [
+        {'date': '2025-01-05T00:00:00', 'is_partial': False, 'q_list': [{'query': 'python', 'value': 40}]},
+        {'date': '2025-01-12T00:00:00', 'is_partial': True, 'q_list': [{'query': 'java', 'value': 100}]},
+    ],
+    ['2025-01-05T00:00:00'],
+])
+def test_malformed_results_fail_the_validation(result_data):
+    from app.schemas.task import TaskColumnarRetrieve, TrendTaskUpdate
+
+    with pytest.raises(pydantic.ValidationError):
+        TrendTaskUpdate(result_data=result_data)
+
+    with pytest.raises(pydantic.ValidationError):
+        TaskColumnarRetrieve.model_validate(build_task(result_data))
@@ -0,0 +1,49 @@
+import pytest
+import requests
+
+
+def test_failed_cookie_refresh_closes_the_session(redis_client, trends_server, monkeypatch):
+    from app.celery.sessions import PooledTrendReq, TrendReqPool
+
+    pool = TrendReqPool(cookie_max_age=0)
+    with pool.session(hl='en-US', tz=360) as trend_req:
+        ...
+
+    closed = []
+    monkeypatch.setattr(trend_req, 'close', lambda: closed.append(trend_req))
+
+    def fail_to_get_cookie(self):
+        raise requests.Timeout("Cookie request timed out")
+
+    monkeypatch.setattr(PooledTrendReq, 'GetGoogleCookie', fail_to_get_cookie)
+
+    # The idle session has an expired cookie, whose refresh fails
+    with pytest.raises(requests.Timeout):
+        with pool.session(hl='en-US', tz=360):
+            pytest.fail("A session without a cookie was checked out")
+
+    assert closed == [trend_req]
+    assert pool._pop_idle(hl='en-US', tz=360, proxy=None) is None
+
+
+def test_failed_cookie_fetch_closes_the_new_session(redis_client, trends_server, monkeypatch):
+    from app.celery.sessions import PooledTrendReq, TrendReqPool
+
+    closed = []
+    close_session = requests.Session.close
+
+    def record_close(self):
+        closed.append(self)
+        close_session(self)
+
+    def fail_to_get_cookie(self):
+        raise requests.Timeout("Cookie request timed out")
+
+    monkeypatch.setattr(requests.Session, 'close', record_close)
+    monkeypatch.setattr(PooledTrendReq, 'GetGoogleCookie', fail_to_get_cookie)
+
+    with pytest.raises(requests.Timeout):
+        with TrendReqPool().session(hl='en-US', tz=360):
+            pytest.fail("A session without a cookie was checked out")
+
+    assert len(closed) == 1
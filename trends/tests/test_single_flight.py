@@ -0,0 +1,30 @@
+import time
+import threading
+
+
+def test_lease_is_renewed_while_the_request_is_slow(redis_client):
+    from app.celery.single_flight import SingleFlight
+
+    # The request outlasts the lease, as it does when the lease holder waits for the rate limit
+    single_flight = SingleFlight(prefix='test:flight', lease_timeout=1, wait_timeout=5, poll_interval=0.05)
+    fetches = []
+    results = []
+
+    def fetch():
+        fetches.append(1)
+        time.sleep(2)
+        return {'python': [1, 2, 3]}
+
+    def run():
+        results.append(single_flight.run(key='search', fetch=fetch))
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.1)
+    for thread in threads:
+        thread.join()
+
+    assert len(fetches) == 1
+    assert results == [{'python': [1, 2, 3]}] * 3
+    assert redis_client.get('test:flight:lease:search') is None
@@ -0,0 +1,266 @@
+import uuid
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+
+class FakeTaskRepository:
+
+    def __init__(self, task):
+        self.task = task
+        self.reads = 0
+        self.bulk_updates = 0
+
+    async def get_by_user_id(self, id, user_id):
+        from shared_utils.exceptions import ObjDoesNotExist
+
+        self.reads += 1
+        if str(id) != str(self.task.id) or user_id != self.task.user_id:
+            raise ObjDoesNotExist
+        return self.task
+
+    async def update_and_increment_retry_count(self, id, increment_by=0, **kwargs):
+        self.task = SimpleNamespace(**{**vars(self.task), **kwargs, 'retry_count': self.task.retry_count + increment_by})
+        return self.task
+
+    async def bulk_update(self, updates):
+        self.bulk_updates += 1
+        return {task_update['id'] for task_update in updates}
+
+    async def close(self):
+        ...
+
+
+def build_task(status):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        user_id=1,
+        q=['python'],
+        geo=None,
+        time=None,
+        cat=None,
+        gprop=None,
+        tz=None,
+        schedule_at=None,
+        status=status,
+        result_data=None,
+        error=None,
+        retry_count=0,
+        created_at=datetime(2025, 1, 1),
+        updated_at=datetime(2025, 1, 1)
+    )
+
+
+def build_service(task, **cache_options):
+    from app.cache import TaskDetailCache
+    from app.schemas.task import TaskRetrieve
+    from app.services.task import TaskService
+
+    repository = FakeTaskRepository(task)
+    task_cache = TaskDetailCache(schema=TaskRetrieve, prefix='trends:task', **cache_options)
+    return TaskService(task_repository=repository, task_cache=task_cache), repository
+
+
+def test_get_by_user_id_reads_through(redis_client):
+    from shared_utils.schemas.status import TaskStatus
+
+    task = build_task(TaskStatus.IN_PROGRESS)
+    service, repository = build_service(task, active_ttl=5, local_ttl=0)
+
+    async def run():
+        return [await service.get_by_user_id(id=task.id, user_id=1) for _ in range(3)]
+
+    tasks = asyncio.run(run())
+
+    # The local tier is disabled by its time to live, so the later lookups are served from redis
+    assert repository.reads == 1
+    assert {cached_task.task_id for cached_task in tasks} == {task.id}
+    assert 0 < redis_client.ttl(f'trends:task:{task.id}') <= 5
+
+
+def test_get_by_user_id_in_columnar_form(redis_client):
+    from shared_utils.schemas.status import TaskStatus
+    from app.schemas.task import TaskColumnarRetrieve
+
+    task = build_task(TaskStatus.COMPLETED)
+    task.result_data = {'dates': ['2025-01-05T00:00:00'], 'is_partial': '0', 'values': {'python': [40]}}
+    service, repository = build_service(task)
+
+    async def run():
+        return [await service.get_by_user_id(id=task.id, user_id=1) for _ in range(2)]
+
+    # Read from the database first, then from the cache, both already expanded
+    for cached_task in asyncio.run(run()):
+        columnar_task = TaskColumnarRetrieve.model_validate(cached_task)
+        assert columnar_task.model_dump(mode='json')['result_data'] == task.result_data
+
+    assert repository.reads == 1
+
+
+def test_get_by_user_id_of_another_user(redis_client):
+    from shared_utils.exceptions import ObjDoesNotExist
+    from shared_utils.schemas.status import TaskStatus
+
+    task = build_task(TaskStatus.COMPLETED)
+    service, _ = build_service(task)
+
+    async def run():
+        await service.get_by_user_id(id=task.id, user_id=1)
+        await service.get_by_user_id(id=task.id, user_id=2)
+
+    with pytest.raises(ObjDoesNotExist):
+        asyncio.run(run())
+
+
+def test_callback_refreshes_cached_task(redis_client):
+    from shared_utils.schemas.status import TaskStatus
+
+    task = build_task(TaskStatus.IN_PROGRESS)
+    service, repository = build_service(task, terminal_ttl=600, active_ttl=5)
+
+    async def run():
+        await service.get_by_user_id(id=task.id, user_id=1)
+        await service.update_and_increment_retry_count(id=task.id, status=TaskStatus.COMPLETED)
+        return await service.get_by_user_id(id=task.id, user_id=1)
+
+    cached_task = asyncio.run(run())
+
+    assert repository.reads == 1
+    assert cached_task.status == TaskStatus.COMPLETED
+    # Completed tasks do not change anymore, so they are cached for long
+    assert redis_client.ttl(f'trends:task:{task.id}') > 5
+
+
+def test_bulk_callback_invalidates_cached_task(redis_client):
+    from shared_utils.schemas.status import TaskStatus
+    from app.schemas.task import TrendTaskBulkUpdateItem
+
+    task = build_task(TaskStatus.IN_PROGRESS)
+    service, repository = build_service(task)
+
+    async def run():
+        await service.get_by_user_id(id=task.id, user_id=1)
+        await service.bulk_update(items=[TrendTaskBulkUpdateItem(task_id=task.id, status=TaskStatus.COMPLETED)])
+        await service.get_by_user_id(id=task.id, user_id=1)
+
+    asyncio.run(run())
+
+    assert repository.reads == 2
+
+
+def test_bulk_callback_sent_again_is_applied_once(redis_client):
+    from shared_utils.schemas.status import TaskStatus
+    from app.cache import IdempotencyCache
+    from app.exceptions import RequestInProgress
+    from app.services.task import TaskService
+    from app.schemas.task import TrendTaskBulkUpdateItem
+
+    task = build_task(TaskStatus.PENDING)
+    repository = FakeTaskRepository(task)
+    service = TaskService(task_repository=repository, idempotency_cache=IdempotencyCache())
+    items = [TrendTaskBulkUpdateItem(task_id=task.id, status=TaskStatus.IN_PROGRESS, increment_retry_count=1)]
+
+    async def run():
+        first = await service.bulk_update(items=items, idempotency_key='batch-1')
+        # The response to the first request was lost, and the batch is sent again
+        second = await service.bulk_update(items=items, idempotency_key='batch-1')
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert repository.bulk_updates == 1
+    assert second == [{'task_id': str(task.id), 'updated': True}]
+    assert first[0]['updated'] is True
+
+    async def run_in_progress():
+        await IdempotencyCache().claim(key='batch-2')
+        await service.bulk_update(items=items, idempotency_key='batch-2')
+
+    with pytest.raises(RequestInProgress):
+        asyncio.run(run_in_progress())
+
+    assert repository.bulk_updates == 1
+
+
+def build_watched_service(task):
+    from app.cache import TaskDetailCache
+    from app.events import TaskEventBroker
+    from app.schemas.task import TaskRetrieve
+    from app.services.task import TaskService
+
+    repository = FakeTaskRepository(task)
+    service = TaskService(
+        task_repository=repository,
+        task_cache=TaskDetailCache(schema=TaskRetrieve),
+        task_events=TaskEventBroker(schema=TaskRetrieve)
+    )
+    return service, repository
+
+
+def test_watch_waits_for_the_published_update(redis_client):
+    from shared_utils.schemas.status import TaskStatus
+
+    task = build_task(TaskStatus.IN_PROGRESS)
+    service, repository = build_watched_service(task)
+
+    async def complete():
+        # Lets the waiter subscribe and read the task first
+        await asyncio.sleep(0.2)
+        await service.update_and_increment_retry_count(id=task.id, status=TaskStatus.COMPLETED)
+
+    async def run():
+        updates = asyncio.create_task(complete())
+        tasks = [task async for task in service.watch(id=task.id, user_id=1, timeout=5)]
+        await updates
+        return tasks
+
+    tasks = asyncio.run(run())
+
+    assert [task.status for task in tasks] == [TaskStatus.IN_PROGRESS, TaskStatus.COMPLETED]
+    # The completed task comes with its update, it is not read again
+    assert repository.reads == 1
+
+
+def test_watch_times_out_with_heartbeats(redis_client):
+    from shared_utils.schemas.status import TaskStatus
+
+    task = build_task(TaskStatus.PENDING)
+    service, _ = build_watched_service(task)
+
+    async def run():
+        return [task async for task in service.watch(id=task.id, user_id=1, timeout=0.5, heartbeat_interval=0.2)]
+
+    tasks = asyncio.run(run())
+
+    assert tasks[0].status == TaskStatus.PENDING
+    # Only heartbeats follow, their number depends on how long subscribing and reading the task took
+    assert tasks[1:] and all(task is None for task in tasks[1:])
+
+
+def test_only_the_events_of_subscribed_tasks_are_parsed(redis_client, monkeypatch):
+    from shared_utils.schemas.status import TaskStatus
+    from app.schemas.task import TaskRetrieve
+    from app.events import TaskEvent, TaskEventBroker
+
+    broker = TaskEventBroker(schema=TaskRetrieve)
+    parsed = []
+    loads = TaskEvent.loads
+
+    def recording_loads(message, schema):
+        parsed.append(message)
+        return loads(message, schema=schema)
+
+    monkeypatch.setattr(TaskEvent, 'loads', recording_loads)
+
+    async def run():
+        async with broker.subscribe(task_id='task-1') as queue:
+            await broker.publish(TaskEvent(task_id='task-2', status=TaskStatus.COMPLETED))
+            await broker.publish(TaskEvent(task_id='task-1', status=TaskStatus.COMPLETED))
+            return await asyncio.wait_for(queue.get(), timeout=5)
+
+    event = asyncio.run(run())
+
+    assert event.task_id == 'task-1'
+    assert len(parsed) == 1
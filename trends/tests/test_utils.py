@@ -0,0 +1,67 @@
+import pandas as pd
+
+
+def build_interest_over_time_df(keywords):
+    df = pd.DataFrame(
+        {keyword: [index * 10 + position for position in range(3)] for index, keyword in enumerate(keywords)},
+        index=pd.DatetimeIndex(['2025-01-05', '2025-01-12 06:00', '2025-01-19'], name='date')
+    )
+    df['isPartial'] = [False, False, True]
+    return df
+
+
+def test_convert_interest_over_time():
+    from app.utils import convert_interest_over_time
+
+    results = convert_interest_over_time(build_interest_over_time_df(['python', 'rust']))
+
+    assert results == [
+        {
+            'date': '2025-01-05T00:00:00',
+            'is_partial': False,
+            'q_list': [{'query': 'python', 'value': 0}, {'query': 'rust', 'value': 10}]
+        },
+        {
+            'date': '2025-01-12T06:00:00',
+            'is_partial': False,
+            'q_list': [{'query': 'python', 'value': 1}, {'query': 'rust', 'value': 11}]
+        },
+        {
+            'date': '2025-01-19T00:00:00',
+            'is_partial': True,
+            'q_list': [{'query': 'python', 'value': 2}, {'query': 'rust', 'value': 12}]
+        },
+    ]
+    assert type(results[0]['is_partial']) is bool
+    assert type(results[0]['q_list'][0]['value']) is int
+
+
+def test_convert_interest_over_time_matches_row_conversion():
+    from app.utils import convert_interest_over_time
+    from benchmarks.conversion import FRAMES, build_interest_over_time_df, convert_interest_over_time_rows
+
+    for dates in FRAMES.values():
+        for keywords in (['python'], ['python', 'rust', 'go', 'java', 'kotlin']):
+            df = build_interest_over_time_df(dates, keywords=keywords)
+            assert convert_interest_over_time(df) == convert_interest_over_time_rows(df)
+
+
+def test_convert_empty_interest_over_time():
+    from app.utils import convert_interest_over_time
+
+    assert convert_interest_over_time(pd.DataFrame()) == []
+
+
+def test_compact_and_expand_results():
+    from app.utils import compact_results, expand_results, convert_interest_over_time
+
+    results = convert_interest_over_time(build_interest_over_time_df(['python', 'rust']))
+    columnar_results = compact_results(results)
+
+    assert columnar_results == {
+        'dates': ['2025-01-05T00:00:00', '2025-01-12T06:00:00', '2025-01-19T00:00:00'],
+        'is_partial': '001',
+        'values': {'python': [0, 1, 2], 'rust': [10, 11, 12]}
+    }
+    assert expand_results(columnar_results) == results
+    assert expand_results(compact_results([])) == []
@@ -0,0 +1,187 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+
+def build_window(dates, partial, values):
+    return {
+        'dates': [f'{point_date}T00:00:00' for point_date in dates],
+        'is_partial': partial,
+        'values': values
+    }
+
+
+def test_merge_series_rescales_by_overlap():
+    from app.utils import merge_series
+
+    series = build_window(
+        ['2025-01-01', '2025-01-02', '2025-01-03'],
+        '001',
+        {'python': [50, 100, 40], 'rust': [10, 20, 8]}
+    )
+    # Google rescaled the window to its own peak, the overlapping dates are halved
+    window = build_window(
+        ['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-04'],
+        '0001',
+        {'python': [25, 50, 100, 30], 'rust': [5, 10, 20, 6]}
+    )
+
+    merged = merge_series(series, window)
+
+    # The partial point of the series is replaced by the complete point of the window
+    assert merged['dates'] == window['dates']
+    assert merged['is_partial'] == '0001'
+    assert merged['values'] == {'python': [50, 100, 200, 60], 'rust': [10, 20, 40, 12]}
+
+
+def test_merge_series_without_series():
+    from app.utils import merge_series
+
+    window = build_window(['2025-01-01', '2025-01-02'], '01', {'python': [100, 50]})
+
+    assert merge_series(None, window) == window
+
+
+def test_get_watch_timeframe():
+    from app.utils import get_watch_timeframe
+
+    series = build_window(['2025-03-01', '2025-03-02', '2025-03-03'], '001', {'python': [1, 2, 3]})
+
+    assert get_watch_timeframe(None, lookback_days=90, overlap_days=7, today=date(2025, 3, 3)) == '2024-12-03 2025-03-03'
+    assert get_watch_timeframe(series, lookback_days=90, overlap_days=7, today=date(2025, 3, 3)) == '2025-02-23 2025-03-03'
+    # A watch idle for longer than the daily resolution allows starts with a gap
+    assert get_watch_timeframe(series, lookback_days=90, overlap_days=7, today=date(2026, 3, 3)) == '2025-06-07 2026-03-03'
+
+
+def test_watch_runs_fetch_incremental_windows(database_url):
+    from sqlalchemy import update
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from shared_utils.schemas.status import TaskStatus
+    from app.models.task import Task
+    from app.models.watch import Watch
+    from app.repositories.watch import WatchModelRepository
+    from app.scheduler import TaskScheduler, WatchScheduler
+
+    today = date.today()
+    dispatched = []
+
+    async def run():
+        engine = create_async_engine(database_url)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        watch_scheduler = WatchScheduler(session_maker=session_maker, overlap_days=2)
+        task_scheduler = TaskScheduler(session_maker=session_maker, dispatch=lambda task_id, task: dispatched.append(task))
+
+        async def complete_run(values):
+            dates = [(today - timedelta(days=days)).isoformat() for days in range(len(values) - 1, -1, -1)]
+            partial = '0' * (len(values) - 1) + '1'
+
+            async with session_maker() as db:
+                watch = await db.get(Watch, watch_id)
+                await db.execute(
+                    update(Task)
+                    .where(Task.id == watch.run_task_id)
+                    .values(status=TaskStatus.COMPLETED, result_data=build_window(dates, partial, {'python': values}))
+                )
+                # Lets the watch run again right away
+                watch.next_run_at = datetime.now()
+                await db.commit()
+
+        async with session_maker() as db:
+            watch = await WatchModelRepository(db=db).create(
+                id=watch_id, user_id=6, q=['python'], geo='US', interval=3600, lookback_days=4, next_run_at=datetime.now()
+            )
+
+        # The first run fetches the lookback of the watch
+        await watch_scheduler.dispatch_due()
+        await task_scheduler.dispatch_due()
+        await complete_run([10, 20, 40, 80, 30])
+
+        # The second run overlaps the last complete point by two days, on a scale halved by Google
+        await watch_scheduler.dispatch_due()
+        await task_scheduler.dispatch_due()
+        await complete_run([20, 40, 100])
+        await watch_scheduler.dispatch_due()
+
+        async with session_maker() as db:
+            watch = await db.get(Watch, watch_id)
+
+        await engine.dispose()
+        return watch
+
+    import uuid
+    watch_id = uuid.uuid4()
+    watch = asyncio.run(run())
+
+    assert [task.time for task in dispatched] == [
+        f'{today - timedelta(days=4)} {today}',
+        f'{today - timedelta(days=3)} {today}',
+    ]
+    assert watch.series['values'] == {'python': [10, 20, 40, 80, 200]}
+    assert watch.series['is_partial'] == '00001'
+    assert watch.error is None
+
+
+def run_watch_with_lost_task(database_url, lose_task):
+    import uuid
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.models.watch import Watch
+    from app.repositories.watch import WatchModelRepository
+    from app.scheduler import WatchScheduler
+
+    watch_id = uuid.uuid4()
+
+    async def run():
+        engine = create_async_engine(database_url)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        watch_scheduler = WatchScheduler(session_maker=session_maker, run_timeout=600)
+
+        async with session_maker() as db:
+            await WatchModelRepository(db=db).create(
+                id=watch_id, user_id=6, q=['python'], geo='US', interval=3600, lookback_days=4, next_run_at=datetime.now()
+            )
+
+        await watch_scheduler.dispatch_due()
+        async with session_maker() as db:
+            lost_task_id = (await db.get(Watch, watch_id)).run_task_id
+
+        # The run in progress is left alone
+        assert await watch_scheduler.dispatch_due() == 0
+
+        async with session_maker() as db:
+            watch = await db.get(Watch, watch_id)
+            await lose_task(db, watch)
+            # Lets the watch run again right away
+            watch.next_run_at = datetime.now()
+            await db.commit()
+
+        await watch_scheduler.dispatch_due()
+
+        async with session_maker() as db:
+            watch = await db.get(Watch, watch_id)
+
+        await engine.dispose()
+        return lost_task_id, watch
+
+    return asyncio.run(run())
+
+
+def test_watch_run_whose_task_was_deleted_runs_again(database_url):
+    from app.models.task import Task
+
+    async def delete_task(db, watch):
+        await db.delete(await db.get(Task, watch.run_task_id))
+
+    lost_task_id, watch = run_watch_with_lost_task(database_url, delete_task)
+
+    assert watch.error == {'code': 404, 'error': 'The task of the run was deleted.'}
+    assert watch.run_task_id not in (None, lost_task_id)
+
+
+def test_watch_run_that_timed_out_runs_again(database_url):
+    async def lose_task_message(db, watch):
+        # The task stays pending, as if its message never reached the workers
+        watch.last_run_at = datetime.now() - timedelta(seconds=601)
+
+    lost_task_id, watch = run_watch_with_lost_task(database_url, lose_task_message)
+
+    assert watch.error == {'code': 504, 'error': 'The run did not finish within 600 seconds.'}
+    assert watch.run_task_id not in (None, lost_task_id)
@@ -0,0 +1,60 @@
+import threading
+import http.client
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StandInProxy(ThreadingHTTPServer):
+    """
+    Local forward proxy standing in for an egress endpoint, which can be told to answer every request with a status
+    code of its own, like a throttled egress IP does.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), StandInProxyHandler)
+        self.requests = 0
+        self.status_code = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+class StandInProxyHandler(BaseHTTPRequestHandler):
+    server: StandInProxy
+
+    def _forward(self) -> None:
+        self.server.requests += 1
+
+        if self.server.status_code is not None:
+            self.send_response(self.server.status_code)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        headers = {name: value for name, value in self.headers.items() if name.lower() != 'proxy-connection'}
+
+        connection = http.client.HTTPConnection(url.netloc)
+        connection.request(self.command, url._replace(scheme='', netloc='').geturl(), body=body, headers=headers)
+        response = connection.getresponse()
+        content = response.read()
+        connection.close()
+
+        self.send_response(response.status)
+        for name, value in response.getheaders():
+            if name.lower() not in ('content-length', 'transfer-encoding', 'connection'):
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = _forward
+    do_POST = _forward
+
+    def log_message(self, format, *args) -> None:
+        ...
@@ -0,0 +1,50 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTaskService(ThreadingHTTPServer):
+    """
+    Stand-in for the task service callback endpoints, recording every callback request it receives.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), FakeTaskServiceHandler)
+        self.requests = []
+        self.status_codes = []
+        self.idempotency_keys = []
+        # Seconds to wait before responding to every request, once it is recorded
+        self.delays = []
+        self.bulk_enabled = True
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+class FakeTaskServiceHandler(BaseHTTPRequestHandler):
+    server: FakeTaskService
+
+    def do_PUT(self) -> None:
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+
+        if self.path == '/tasks/callback/' and not self.server.bulk_enabled:
+            status_code = 404
+        else:
+            status_code = self.server.status_codes.pop(0) if self.server.status_codes else 204
+            self.server.requests.append((self.path, self.headers['X-Signature'], json.loads(body)))
+            self.server.idempotency_keys.append(self.headers['Idempotency-Key'])
+
+        if self.server.delays:
+            time.sleep(self.server.delays.pop(0))
+
+        self.send_response(status_code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args) -> None:
+        ...
@@ -0,0 +1,65 @@
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTrendsServer(ThreadingHTTPServer):
+    """
+    Stand-in for the Google Trends endpoints used by pytrends `interest_over_time`.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), FakeTrendsHandler)
+        self.requests = 0
+        self.status_code = 200
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_port}/trends'
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+class FakeTrendsHandler(BaseHTTPRequestHandler):
+    server: FakeTrendsServer
+
+    def _send(self, body: str, headers: dict = None) -> None:
+        self.server.requests += 1
+        status_code = self.server.status_code
+
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        content = body.encode() if status_code == 200 else b''
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        if url.path.endswith('/explore/'):
+            return self._send('', headers={'Set-Cookie': 'NID=fake-cookie; Path=/'})
+
+        # Interest over time of the keywords of the widget, one weekly point per keyword index
+        keywords = [item['keyword'] for item in json.loads(params['req'][0])['comparisonItem']]
+        timeline = [
+            {
+                'time': str(1704067200 + week * 604800),
+                'value': [(week + 1) * (index + 1) for index in range(len(keywords))]
+            }
+            for week in range(5)
+        ]
+        return self._send(")]}'," + json.dumps({'default': {'timelineData': timeline}}))
+
+    def do_POST(self) -> None:
+        params = parse_qs(urlparse(self.path).query)
+        widget = {'id': 'TIMESERIES', 'token': 'fake-token', 'request': json.loads(params['req'][0])}
+        return self._send(")]}'" + json.dumps({'widgets': [widget]}))
+
+    def log_message(self, format, *args) -> None:
+        ...
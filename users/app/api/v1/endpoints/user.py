@@ -6,6 +6,8 @@ from shared_utils.exceptions import ObjDoesNotExist, ObjAlreadyExist
 from shared_utils.pagination import PageNumberPaginationQueryParams, PageNumberPaginationResponse, PageNumberPaginator
 
 from app.models.user import User
+from app.exceptions import InvalidCursor
+from app.pagination import CursorPaginationQueryParams, CursorPaginationResponse
 from app.schemas.user import UserCreate, UserUpdate, UserRetrieve
 from app.services.user import UserService, get_user_service
 from app.producer.api import UserMessageProducer, get_producer
@@ -86,6 +88,43 @@ async def create_user_route(
     return ret_user
 
 
+# Declared before '/{user_id}/', which would otherwise match it
+@user_router.get('/cursor/', status_code=status.HTTP_200_OK, response_model=CursorPaginationResponse[UserRetrieve])
+async def get_users_cursor_route(
+        current_user: User = Depends(get_current_admin_user),
+        query_params: Annotated[CursorPaginationQueryParams, Query()] = None,
+        user_service: UserService = Depends(get_user_service),
+    ):
+    """
+    Retrieve a list of all users, newest first, paginated by cursor.
+
+    Every page is read past the last user of the previous page, so deep pages are as fast as the first one.
+    It requires the requesting user to be an admin.
+
+    Args:
+        - current_user (User): The authenticated user, validated as an admin, who is requesting the list.
+        - query_params (CursorPaginationQueryParams): Pagination parameters including the cursor and page size.
+        - user_service (UserService): Service used to retrieve the users from the database.
+
+    Returns:
+        - CursorPaginationResponse[UserRetrieve]: A page of users` data, with the cursor of the next page.
+
+    Raises:
+        - HTTPException: 403 Forbidden if the requesting user is not an admin.
+        - HTTPException: 400 Bad Request if the cursor is invalid.
+    """
+    try:
+        return await user_service.get_cursor_paginated(
+            query_params=query_params,
+            response_schema=UserRetrieve
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=exc.message
+        )
+
+
 @user_router.get('/{user_id}/', status_code=status.HTTP_200_OK, response_model=UserRetrieve)
 async def get_user_route(
         user_id: int,
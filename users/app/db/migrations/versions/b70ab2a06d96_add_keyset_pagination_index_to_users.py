@@ -0,0 +1,26 @@
+"""add keyset pagination index to users
+
+Revision ID: b70ab2a06d96
+Revises: 8185496d18b0
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b70ab2a06d96'
+down_revision: Union[str, None] = '8185496d18b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_date_created_id', 'users', ['date_created', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_date_created_id', table_name='users')
@@ -15,3 +15,7 @@ class InvalidTokenError(TokenError):
 
 class TokenExpiredError(TokenError):
     message = messages.EXPIRED_TOKEN_MESSAGE
+
+
+class InvalidCursor(ValueError):
+    message = "The pagination cursor is invalid."
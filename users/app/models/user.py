@@ -1,10 +1,14 @@
 from datetime import datetime
-from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from sqlalchemy import Index, Boolean, Column, Integer, String, DateTime
 from shared_utils.db.base import Base
 
 
 class User(Base):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Keyset pagination of the users, newest first
+        Index('ix_users_date_created_id', 'date_created', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(200), unique=True, index=True)
@@ -0,0 +1,156 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Generic, List, Optional, Tuple, TypeVar
+
+import pydantic
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.exceptions import InvalidCursor
+
+
+Schema = TypeVar('Schema', bound=pydantic.BaseModel)
+
+
+class CursorPaginationQueryParams(pydantic.BaseModel):
+    cursor: Optional[str] = pydantic.Field(
+        default=None,
+        description="Opaque cursor of the page, as returned in the `next_cursor` of the previous page."
+    )
+    page_size: int = pydantic.Field(
+        default=10,
+        ge=1,
+        le=100,
+        description="Number of results per page."
+    )
+    include_total: bool = pydantic.Field(
+        default=False,
+        description="Whether to count all the results, which scans every matching row."
+    )
+
+
+class CursorPaginationResponse(pydantic.BaseModel, Generic[Schema]):
+    results: List[Schema]
+    next_cursor: Optional[str] = pydantic.Field(
+        default=None,
+        description="Cursor of the next page, None on the last page."
+    )
+    page_size: int
+    total: Optional[int] = pydantic.Field(
+        default=None,
+        description="Number of all the results, only counted when requested."
+    )
+
+
+def encode_cursor(created_at: datetime, id: Any) -> str:
+    """
+    Encode the position of a row into an opaque cursor.
+
+    Args:
+        - created_at (datetime): Creation date of the row.
+        - id (Any): Primary key of the row.
+
+    Returns:
+        - str: The cursor of the rows after the given one.
+    """
+    position = json.dumps([created_at.isoformat(), str(id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, id_type: type) -> Tuple[datetime, Any]:
+    """
+    Decode the position of a row from its cursor.
+
+    Args:
+        - cursor (str): The cursor to decode.
+        - id_type (type): Python type of the primary key.
+
+    Returns:
+        - Tuple[datetime, Any]: Creation date and primary key of the row.
+
+    Raises:
+        - InvalidCursor: If the cursor was not issued by `encode_cursor`.
+    """
+    try:
+        position = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, id = json.loads(position)
+        return datetime.fromisoformat(created_at), id_type(id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise InvalidCursor from exc
+
+
+class CursorPaginator:
+    """
+    Keyset paginator, which orders the rows by creation date and primary key, newest first, and seeks every page past
+    the last row of the previous page.
+
+    Unlike page numbers, which make the database scan and skip all the rows of the previous pages, every page is read
+    straight from an index over the creation date and primary key, no matter how deep it is. Counting all the rows is
+    left optional for the same reason.
+    """
+
+    def __init__(self, created_at: InstrumentedAttribute, id: InstrumentedAttribute) -> None:
+        """
+        Initialize the paginator.
+
+        Args:
+            - created_at (InstrumentedAttribute): Creation date column of the model.
+            - id (InstrumentedAttribute): Primary key column of the model.
+        """
+        self.created_at = created_at
+        self.id = id
+
+    async def paginate(
+            self,
+            db: AsyncSession,
+            statement: Select,
+            query_params: CursorPaginationQueryParams,
+            response_schema: type[Schema]
+        ) -> CursorPaginationResponse[Schema]:
+        """
+        Get a page of the rows selected by a statement.
+
+        Args:
+            - db (AsyncSession): The database session.
+            - statement (Select): Statement selecting the rows of the model, filtered but not ordered.
+            - query_params (CursorPaginationQueryParams): Cursor and size of the page.
+            - response_schema (type[Schema]): A Pydantic model class that defines the structure of the response items.
+
+        Returns:
+            - CursorPaginationResponse[Schema]: The page of results, with the cursor of the next page.
+
+        Raises:
+            - InvalidCursor: If the cursor is invalid.
+        """
+        query_params = query_params or CursorPaginationQueryParams()
+
+        page_statement = statement.order_by(self.created_at.desc(), self.id.desc())
+        if query_params.cursor is not None:
+            created_at, id = decode_cursor(query_params.cursor, id_type=self.id.type.python_type)
+            page_statement = page_statement.where(tuple_(self.created_at, self.id) < tuple_(created_at, id))
+
+        # One extra row tells whether there is a next page
+        rows = (await db.execute(page_statement.limit(query_params.page_size + 1))).scalars().all()
+        page = rows[:query_params.page_size]
+
+        next_cursor = None
+        if len(rows) > query_params.page_size:
+            last_row = page[-1]
+            next_cursor = encode_cursor(
+                created_at=getattr(last_row, self.created_at.key),
+                id=getattr(last_row, self.id.key)
+            )
+
+        total = None
+        if query_params.include_total:
+            total = await db.scalar(select(func.count()).select_from(statement.subquery()))
+
+        return CursorPaginationResponse[response_schema](
+            results=[response_schema.model_validate(row) for row in page],
+            next_cursor=next_cursor,
+            page_size=query_params.page_size,
+            total=total
+        )
@@ -1,6 +1,7 @@
 from typing import Sequence, Optional
 
 from fastapi import Depends
+from pydantic import BaseModel
 from sqlalchemy.sql import select, exists, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from shared_utils.db.session import get_db
@@ -8,6 +9,7 @@ from shared_utils.exceptions import ObjDoesNotExist, ObjAlreadyExist
 from shared_utils.repository.sqlalchemy import SQLAlchemyModelRepository
 
 from app.models.user import User
+from app.pagination import CursorPaginationQueryParams, CursorPaginationResponse, CursorPaginator
 from app.core.security import hash_password
 
 
@@ -171,6 +173,33 @@ class UserModelRepository(SQLAlchemyModelRepository[User]):
             is_admin=False
         )
 
+    async def get_cursor_paginated(
+            self,
+            query_params: CursorPaginationQueryParams,
+            response_schema: type[BaseModel],
+            **filters
+        ) -> CursorPaginationResponse:
+        """
+        Get a page of users, newest first, seeking past the user of the cursor.
+
+        Args:
+            - query_params (CursorPaginationQueryParams): Cursor and size of the page.
+            - response_schema (type[BaseModel]): A Pydantic model class that defines the structure of the response items.
+            - **filters: Fields to filter the users by.
+
+        Returns:
+            - CursorPaginationResponse: The page of users, with the cursor of the next page.
+
+        Raises:
+            - InvalidCursor: If the cursor is invalid.
+        """
+        return await CursorPaginator(created_at=User.date_created, id=User.id).paginate(
+            db=self.db,
+            statement=select(User).filter_by(**filters),
+            query_params=query_params,
+            response_schema=response_schema
+        )
+
     async def update(self, id: int, **fields) -> User:
         """
         Update user details. Does not allow password update through this method.
@@ -5,6 +5,7 @@ from pydantic import BaseModel
 from shared_utils.pagination import Paginator
 
 from app.models.user import User
+from app.pagination import CursorPaginationQueryParams, CursorPaginationResponse
 from app.repositories.user import UserModelRepository, get_user_repository
 
 
@@ -132,6 +133,32 @@ class UserService:
             **filters
         )
     
+    async def get_cursor_paginated(
+            self,
+            query_params: CursorPaginationQueryParams,
+            response_schema: type[BaseModel],
+            **filters
+        ) -> CursorPaginationResponse:
+        """
+        Retrieve a page of users from the user repository, paginated by cursor rather than page number.
+
+        Args:
+            - query_params (CursorPaginationQueryParams): Cursor and size of the page.
+            - response_schema (type[BaseModel]): A Pydantic model class that defines the structure of the response items.
+            - **filters: Additional keyword arguments that will be passed as filters to the repository.
+
+        Returns:
+            - CursorPaginationResponse: The page of users, with the cursor of the next page.
+
+        Raises:
+            - InvalidCursor: If the cursor is invalid.
+        """
+        return await self.user_repository.get_cursor_paginated(
+            query_params=query_params,
+            response_schema=response_schema,
+            **filters
+        )
+
     async def update(self, id: int, **update_data: Dict[str, Any]) -> User:
         """
         Update an existing user's information.